@@ -0,0 +1,105 @@
+# analysis/excursion_labels.py - ETIQUETADO VECTORIZADO DE EXCURSIONES (MFE/MAE) POR SEÑAL
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Resultado de cada señal
+OUTCOME_TP = 1
+OUTCOME_SL = -1
+OUTCOME_NONE = 0
+
+
+def first_hit(hits):
+    """Barras (1..N) hasta el primer True de cada fila; -1 si no hay"""
+    found = hits.any(axis=1)
+    return np.where(found, hits.argmax(axis=1) + 1, -1)
+
+
+def label_excursions(high, low, close, entry_index, side, stop_loss, take_profit, horizon=48):
+    """Excursion maxima favorable/adversa y primer toque de SL/TP para cada señal.
+
+    La entrada es el cierre de la barra de la señal y la ventana son las
+    ``horizon`` barras siguientes. Las ventanas se toman con
+    ``sliding_window_view`` sobre toda la serie (una vista, sin copiar) y se
+    evaluan todas las señales a la vez. Si SL y TP caen en la misma barra no
+    se puede saber el orden con barras OHLC: se cuenta como SL (conservador)
+    y se marca ``ambiguous``. Las distancias se dan tambien en R (multiplos
+    del riesgo entrada-SL).
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    entry_index = np.asarray(entry_index, dtype=np.int64)
+    direction = np.where(np.asarray(side) > 0, 1.0, -1.0)
+    stop_loss = np.asarray(stop_loss, dtype=float)
+    take_profit = np.asarray(take_profit, dtype=float)
+
+    # Relleno con NaN para que las ultimas señales tengan ventana completa
+    pad = np.full(horizon, np.nan)
+    high_windows = sliding_window_view(np.concatenate((high[1:], pad)), horizon)
+    low_windows = sliding_window_view(np.concatenate((low[1:], pad)), horizon)
+    forward_high = high_windows[entry_index]
+    forward_low = low_windows[entry_index]
+    available = np.sum(~np.isnan(forward_high), axis=1)
+
+    entry = close[entry_index]
+    is_buy = direction > 0
+    with np.errstate(invalid='ignore'):
+        max_high = np.nanmax(np.where(available[:, None] > 0, forward_high, entry[:, None]), axis=1)
+        min_low = np.nanmin(np.where(available[:, None] > 0, forward_low, entry[:, None]), axis=1)
+    mfe = np.where(is_buy, max_high - entry, entry - min_low)
+    mae = np.where(is_buy, entry - min_low, max_high - entry)
+
+    # Toques: comparaciones con NaN dan False, asi que el relleno nunca toca
+    with np.errstate(invalid='ignore'):
+        sl_hits = np.where(is_buy[:, None], forward_low <= stop_loss[:, None], forward_high >= stop_loss[:, None])
+        tp_hits = np.where(is_buy[:, None], forward_high >= take_profit[:, None], forward_low <= take_profit[:, None])
+    tp_hits &= (take_profit > 0)[:, None]
+    bars_to_sl = first_hit(sl_hits)
+    bars_to_tp = first_hit(tp_hits)
+
+    sl_first = (bars_to_sl > 0) & ((bars_to_tp < 0) | (bars_to_sl <= bars_to_tp))
+    tp_first = (bars_to_tp > 0) & ~sl_first
+    outcome = np.where(tp_first, OUTCOME_TP, np.where(sl_first, OUTCOME_SL, OUTCOME_NONE)).astype(np.int8)
+    ambiguous = (bars_to_sl > 0) & (bars_to_sl == bars_to_tp)
+
+    # Resultado en R: TP = recompensa/riesgo, SL = -1, sin toque = cierre al final de la ventana
+    risk = np.abs(entry - stop_loss)
+    risk = np.where(risk > 0, risk, np.nan)
+    open_r = (close[entry_index + available] - entry) * direction / risk
+    reward_r = np.abs(take_profit - entry) / risk
+    result_r = np.where(outcome == OUTCOME_TP, reward_r, np.where(outcome == OUTCOME_SL, -1.0, open_r))
+
+    return pd.DataFrame({
+        'index': entry_index,
+        'side': direction.astype(np.int8),
+        'entry': entry,
+        'mfe': mfe,
+        'mae': mae,
+        'mfe_r': mfe / risk,
+        'mae_r': mae / risk,
+        'bars_to_sl': bars_to_sl,
+        'bars_to_tp': bars_to_tp,
+        'outcome': outcome,
+        'ambiguous': ambiguous,
+        'result_r': result_r,
+        'bars_available': available,
+    })
+
+
+def summarize_labels(labels):
+    """Resumen de calidad de las señales etiquetadas"""
+    if labels.empty:
+        return {}
+    tp_bars = labels.loc[labels['outcome'] == OUTCOME_TP, 'bars_to_tp']
+    return {
+        'signals': len(labels),
+        'tp_first_pct': float((labels['outcome'] == OUTCOME_TP).mean() * 100),
+        'sl_first_pct': float((labels['outcome'] == OUTCOME_SL).mean() * 100),
+        'no_hit_pct': float((labels['outcome'] == OUTCOME_NONE).mean() * 100),
+        'ambiguous_pct': float(labels['ambiguous'].mean() * 100),
+        'avg_mfe_r': float(labels['mfe_r'].mean()),
+        'avg_mae_r': float(labels['mae_r'].mean()),
+        'expectancy_r': float(labels['result_r'].mean()),
+        'median_bars_to_tp': float(tp_bars.median()) if len(tp_bars) else None,
+    }
@@ -0,0 +1,131 @@
+# analysis/result_cache.py - CACHE EN DISCO DIRECCIONADA POR CONTENIDO
+import hashlib
+import json
+import logging
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    """Memoizacion en disco de indicadores y resultados de backtest.
+
+    La clave es un hash de la clase y parametros de la estrategia, el rango
+    de datos y un digest del contenido de los datos, asi que cualquier cambio
+    en cualquiera de ellos produce una clave nueva. Los ficheros se expulsan
+    por LRU cuando el total supera ``max_bytes``.
+    """
+
+    def __init__(self, directory='.cache/results', max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('ResultCache')
+        self.hits = 0
+        self.misses = 0
+
+        # Orden de acceso reconstruido desde la fecha de modificacion; el
+        # directorio se crea con la primera escritura
+        entries = []
+        for name in (os.listdir(directory) if os.path.isdir(directory) else ()):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        self.index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.total_bytes = sum(self.index.values())
+
+    @staticmethod
+    def data_digest(*arrays):
+        """Digest del contenido de uno o varios arrays / DataFrames"""
+        digest = hashlib.sha1()
+        for array in arrays:
+            if hasattr(array, 'to_numpy'):
+                array = array.to_numpy()
+            array = np.ascontiguousarray(array)
+            digest.update(str(array.dtype).encode())
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes() if array.dtype != object else pickle.dumps(array))
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(kind, strategy, params, data_range, data_digest):
+        """Clave estable a partir de estrategia, parametros y datos"""
+        if isinstance(strategy, str):
+            strategy_id = strategy
+        else:
+            cls = strategy if isinstance(strategy, type) else strategy.__class__
+            strategy_id = f"{cls.__module__}.{cls.__qualname__}"
+
+        payload = json.dumps({
+            'kind': kind,
+            'strategy': strategy_id,
+            'params': params,
+            'range': [str(value) for value in data_range],
+            'data': data_digest,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """Devuelve (encontrado, valor)"""
+        if key not in self.index:
+            self.misses += 1
+            return False, None
+        try:
+            with open(self.path(key), 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.discard(key)
+            self.misses += 1
+            return False, None
+
+        os.utime(self.path(key))
+        self.index.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        """Guarda un resultado (escritura atomica) y aplica el presupuesto"""
+        tmp_path = self.path(key) + '.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except OSError as e:
+            self.logger.error(f"Error guardando en cache: {e}")
+            return
+
+        if key in self.index:
+            self.total_bytes -= self.index[key]
+        size = os.path.getsize(self.path(key))
+        self.index[key] = size
+        self.index.move_to_end(key)
+        self.total_bytes += size
+        self.evict()
+
+    def discard(self, key):
+        size = self.index.pop(key, 0)
+        self.total_bytes -= size
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Expulsa los menos usados hasta cumplir el presupuesto"""
+        while self.total_bytes > self.max_bytes and len(self.index) > 1:
+            oldest = next(iter(self.index))
+            self.discard(oldest)
+
+    def get_or_compute(self, key, compute):
+        """Devuelve el resultado cacheado o lo calcula y lo guarda"""
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
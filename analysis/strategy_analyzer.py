@@ -5,10 +5,45 @@ from datetime import datetime, timedelta
 import MetaTrader5 as mt5
 from typing import Dict, List
 import logging
+from analysis.result_cache import ResultCache
+from analysis.vector_signals import strategy_signals
+from analysis.excursion_labels import label_excursions, summarize_labels
+from core.trade_types import Side
+from strategies.base import BaseStrategy
 
 class StrategyAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: ResultCache = None):
         self.logger = logging.getLogger('StrategyAnalyzer')
+        self.cache = cache if cache is not None else ResultCache()
+
+    @staticmethod
+    def strategy_params(strategy_instance) -> Dict:
+        """Parametros simples de la instancia (para la clave de cache)"""
+        params = {k: v for k, v in vars(strategy_instance).items()
+                  if isinstance(v, (int, float, str, bool, list, tuple))}
+        # Requisitos declarados a nivel de clase (BaseStrategy)
+        for name in ('timeframe', 'lookback', 'min_bars', 'max_signals'):
+            if hasattr(strategy_instance, name):
+                params[name] = getattr(strategy_instance, name)
+        return params
+
+    def data_key(self, kind: str, strategy, params: Dict, data: pd.DataFrame) -> str:
+        """Clave de cache para una estrategia sobre un DataFrame OHLC"""
+        digest = ResultCache.data_digest(data['time'], data[['open', 'high', 'low', 'close']])
+        return ResultCache.make_key(kind, strategy, params,
+                                    (data['time'].iloc[0], data['time'].iloc[-1]), digest)
+
+    def compute_signals(self, strategy_name: str, data: pd.DataFrame, params: Dict = None) -> np.ndarray:
+        """Señales vectorizadas (+1/-1/0 por barra), cacheadas en disco"""
+        params = params or {}
+        key = self.data_key('signals', strategy_name, params, data)
+        return self.cache.get_or_compute(key, lambda: strategy_signals(
+            strategy_name,
+            data['high'].to_numpy(dtype=float),
+            data['low'].to_numpy(dtype=float),
+            data['close'].to_numpy(dtype=float),
+            params
+        ))
     
     def test_strategy_performance(self, strategy_instance, symbol: str, timeframe: str, days: int = 30):
         """Analiza el performance de una estrategia en datos recientes"""
@@ -21,43 +56,85 @@ class StrategyAnalyzer:
             print("❌ No se pudieron obtener datos")
             return
             
-        # Probar la estrategia en datos recientes
-        signals = []
-        for i in range(55, len(data)):  # Necesitamos datos suficientes para indicadores
-            try:
-                current_data = data.iloc[:i+1]
-                if hasattr(strategy_instance, 'generate_signals'):
-                    strategy_signals = strategy_instance.generate_signals(current_data, symbol)
-                else:
-                    strategy_signals = strategy_instance.analyze()
-                    
-                if strategy_signals:
-                    signals.extend(strategy_signals)
-            except Exception as e:
-                continue
+        # Mismos parametros sobre los mismos datos: resultado desde cache. Solo
+        # si las señales salen de ``data``; analyze() lee el terminal en vivo
+        if self.uses_data(strategy_instance):
+            key = self.data_key('indexed_signals', strategy_instance,
+                                dict(self.strategy_params(strategy_instance), symbol=symbol), data)
+            signals = self.cache.get_or_compute(key, lambda: self.scan_signals(strategy_instance, symbol, data))
+        else:
+            signals = self.scan_signals(strategy_instance, symbol, data)
                 
         # Mostrar resultados
         if signals:
             print(f"✅ Señales generadas: {len(signals)}")
             
             # Analizar tipos de señales
-            buy_signals = [s for s in signals if s.get('action') in ['buy', 'BUY']]
-            sell_signals = [s for s in signals if s.get('action') in ['sell', 'SELL']]
+            buy_signals = [s for _, s in signals if s.side is Side.BUY]
+            sell_signals = [s for _, s in signals if s.side is Side.SELL]
             
             print(f"   📈 Compras: {len(buy_signals)}")
             print(f"   📉 Ventas: {len(sell_signals)}")
             
-            # Verificar calidad de señales
-            avg_confidence = np.mean([s.get('confidence', 0.5) for s in signals])
-            print(f"   🎯 Confianza promedio: {avg_confidence:.2f}")
+            # Verificar calidad de señales: excursiones y primer toque de SL/TP
+            summary = summarize_labels(self.label_signals(data, signals))
+            print(f"   🎯 TP primero: {summary['tp_first_pct']:.1f}% | SL primero: {summary['sl_first_pct']:.1f}% "
+                  f"| Sin toque: {summary['no_hit_pct']:.1f}%")
+            print(f"   📐 MFE medio: {summary['avg_mfe_r']:.2f}R | MAE medio: {summary['avg_mae_r']:.2f}R "
+                  f"| Expectativa: {summary['expectancy_r']:+.2f}R")
             
         else:
             print("❌ No se generaron señales")
             
         return len(signals)
     
+    def label_signals(self, data: pd.DataFrame, signals: List, horizon: int = 48) -> pd.DataFrame:
+        """MFE/MAE y primer toque de SL/TP de cada señal en las ``horizon`` barras siguientes"""
+        return label_excursions(
+            data['high'].to_numpy(), data['low'].to_numpy(), data['close'].to_numpy(),
+            entry_index=[i for i, _ in signals],
+            side=[s.side.sign for _, s in signals],
+            stop_loss=[s.stop_loss for _, s in signals],
+            take_profit=[s.take_profit for _, s in signals],
+            horizon=horizon
+        )
+
+    @staticmethod
+    def uses_data(strategy_instance) -> bool:
+        """Indica si la estrategia genera señales a partir del DataFrame recibido"""
+        method = getattr(type(strategy_instance), 'generate_signals', None)
+        if method is None:
+            return False
+        return method is not BaseStrategy.generate_signals
+
+    def scan_signals(self, strategy_instance, symbol: str, data: pd.DataFrame) -> List:
+        """Recorre el historico barra a barra generando (indice de barra, señal)"""
+        signals = []
+        start = getattr(strategy_instance, 'min_bars', 55)  # Datos suficientes para indicadores
+        uses_data = self.uses_data(strategy_instance)
+        for i in range(start, len(data)):
+            current_data = data.iloc[:i+1]
+            try:
+                if uses_data:
+                    strategy_signals = strategy_instance.generate_signals(current_data, symbol)
+                else:
+                    strategy_signals = strategy_instance.analyze()
+            except Exception as e:
+                # Un error de la estrategia invalida el analisis: no se oculta
+                self.logger.error(f"{strategy_instance.__class__.__name__} fallo en la barra {i} de {symbol}: {e}")
+                raise
+
+            if strategy_signals:
+                signals.extend((i, signal) for signal in strategy_signals)
+        return signals
+
     def get_recent_data(self, symbol: str, timeframe: str, days: int) -> pd.DataFrame:
-        """Obtiene datos recientes del mercado"""
+        """Obtiene datos recientes del mercado (todas las barras de los ultimos ``days`` dias)"""
+        end = datetime.now()
+        return self.get_range_data(symbol, timeframe, end - timedelta(days=days), end)
+
+    def get_range_data(self, symbol: str, timeframe: str, start: datetime, end: datetime) -> pd.DataFrame:
+        """Obtiene barras de un rango de fechas"""
         try:
             tf_map = {
                 'M5': mt5.TIMEFRAME_M5,
@@ -65,21 +142,39 @@ class StrategyAnalyzer:
                 'H1': mt5.TIMEFRAME_H1,
                 'H4': mt5.TIMEFRAME_H4
             }
-            
+
             mt5_timeframe = tf_map.get(timeframe, mt5.TIMEFRAME_H1)
-            rates = mt5.copy_rates_from(symbol, mt5_timeframe, datetime.now() - timedelta(days=days), days * 24)
-            
-            if rates is None:
+            rates = mt5.copy_rates_range(symbol, mt5_timeframe, start, end)
+
+            if rates is None or len(rates) == 0:
                 return pd.DataFrame()
-                
+
             df = pd.DataFrame(rates)
             df['time'] = pd.to_datetime(df['time'], unit='s')
             return df
-            
+
         except Exception as e:
             self.logger.error(f"Error obteniendo datos: {e}")
             return pd.DataFrame()
 
+    def walk_forward(self, configs, days: int = 730, **kwargs) -> Dict:
+        """Walk-forward fuera de muestra para (estrategia, simbolo, timeframe)"""
+        from analysis.walk_forward import WalkForwardAnalyzer
+
+        end = datetime.now()
+        start = end - timedelta(days=days)
+
+        datasets = []
+        for strategy, symbol, timeframe in configs:
+            data = self.get_range_data(symbol, timeframe, start, end)
+            if data.empty:
+                print(f"❌ Sin datos para {symbol} {timeframe}")
+                continue
+            datasets.append((strategy, symbol, data))
+
+        kwargs.setdefault('cache', self.cache)
+        return WalkForwardAnalyzer(**kwargs).run(datasets)
+
 def analyze_current_strategies():
     """Analiza todas tus estrategias actuales"""
     print("🚀 ANALIZANDO ESTRATEGIAS EXISTENTES")
@@ -117,5 +212,29 @@ def analyze_current_strategies():
     else:
         print("🎯 RECOMENDACIÓN: Estrategias activas - verificar calidad de señales")
 
+def analyze_walk_forward(days: int = 730):
+    """Walk-forward de las estrategias actuales"""
+    print("🚀 WALK-FORWARD DE ESTRATEGIAS")
+    print("=" * 60)
+
+    analyzer = StrategyAnalyzer()
+    configs = [
+        ('scalper', 'EURUSD', 'M5'),
+        ('scalper', 'GBPUSD', 'M5'),
+        ('turtle', 'EURUSD', 'H1'),
+        ('turtle', 'XAUUSD', 'H1'),
+        ('gold_trend', 'XAUUSD', 'H1')
+    ]
+
+    results = analyzer.walk_forward(configs, days=days)
+
+    print("\n📊 RESULTADOS FUERA DE MUESTRA:")
+    print("-" * 40)
+    for (strategy, symbol), summary in results.items():
+        print(f"{strategy} {symbol}: {summary['folds']} folds | "
+              f"Retorno {summary['total_return_pct']:+.2f}% | "
+              f"DD max {summary['max_drawdown_pct']:.2f}% | "
+              f"Score OOS {summary['oos_score']:.2f}")
+
 if __name__ == "__main__":
     analyze_current_strategies()
\ No newline at end of file
@@ -0,0 +1,365 @@
+# analysis/synthetic_market.py - GENERADOR VECTORIZADO DE BARRAS Y TICKS SINTETICOS ESTILO MT5
+from collections import namedtuple
+
+import numpy as np
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+WEEK = 7 * 86400
+# Cierre viernes 22:00 UTC, apertura domingo 22:00 UTC (segundos desde el lunes 00:00)
+WEEK_CLOSE = 4 * 86400 + 22 * 3600
+WEEK_OPEN = 6 * 86400 + 22 * 3600
+EPOCH_MONDAY = 4 * 86400  # 1970-01-05 fue lunes
+
+# Actividad por hora UTC (volatilidad y volumen) y multiplicador de spread
+SESSION_ACTIVITY = np.array([0.6, 0.6, 0.7, 0.7, 0.6, 0.6, 0.8, 1.1, 1.4, 1.4, 1.3, 1.2,
+                             1.4, 1.6, 1.7, 1.6, 1.4, 1.1, 0.9, 0.8, 0.7, 0.5, 0.4, 0.5])
+SESSION_SPREAD = np.array([1.6, 1.5, 1.4, 1.3, 1.3, 1.3, 1.2, 1.0, 0.9, 0.9, 0.9, 0.9,
+                           0.9, 0.8, 0.8, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 2.5, 4.0, 2.0])
+
+# (volatilidad relativa, duracion media en barras) de cada regimen
+REGIMES = ((0.6, 4000), (1.0, 6000), (2.2, 1500))
+
+
+def symbol_defaults(symbol):
+    """(precio inicial, point, volatilidad por barra M1, spread base en points)"""
+    if symbol.startswith('XAU'):
+        return 1950.0, 0.01, 0.00035, 25
+    if 'JPY' in symbol:
+        return 150.0, 0.001, 0.00025, 15
+    return 1.10, 0.00001, 0.00025, 12
+
+
+def trading_times(start, count, bar_seconds=60):
+    """``count`` aperturas de barra desde ``start`` (epoch) saltando el fin de semana"""
+    start = int(start) - int(start) % bar_seconds
+    # Candidatos con margen para cubrir los fines de semana
+    span = int(count * 7 / 5 * 1.05) + 2 * WEEK // bar_seconds
+    times = start + np.arange(span, dtype=np.int64) * bar_seconds
+    in_week = (times - EPOCH_MONDAY) % WEEK
+    open_market = (in_week < WEEK_CLOSE) | (in_week >= WEEK_OPEN)
+    return times[open_market][:count]
+
+
+def ar1_fft(noise, phi):
+    """Proceso AR(1) x_t = phi*x_{t-1} + e_t mediante convolucion FFT con kernel truncado"""
+    kernel_length = int(np.ceil(np.log(1e-4) / np.log(phi)))
+    kernel = phi ** np.arange(kernel_length)
+    size = 1 << int(np.ceil(np.log2(len(noise) + kernel_length)))
+    spectrum = np.fft.rfft(noise, size) * np.fft.rfft(kernel, size)
+    return np.fft.irfft(spectrum, size)[:len(noise)] * np.sqrt(1 - phi ** 2)
+
+
+class SyntheticMarket:
+    """Barras y ticks sinteticos compatibles con ``copy_rates_*`` / ``copy_ticks_*``.
+
+    Rentabilidades log-normales con regimenes de volatilidad (duraciones
+    geometricas), agrupamiento de volatilidad (AR(1) sobre la log-volatilidad
+    por FFT), actividad y spread por sesion, huecos de fin de semana y
+    shocks comunes a los simbolos de un mismo grupo (por defecto la divisa
+    cotizada). Todo se calcula con operaciones vectoriales por simbolo, sin
+    bucles por barra.
+    """
+
+    def __init__(self, seed=None, bar_seconds=60, correlation=0.6, vol_persistence=0.995,
+                 vol_of_vol=0.35, weekend_gap_vol=8.0, groups=None):
+        self.rng = np.random.default_rng(seed)
+        self.bar_seconds = bar_seconds
+        self.correlation = correlation
+        self.vol_persistence = vol_persistence
+        self.vol_of_vol = vol_of_vol
+        self.weekend_gap_vol = weekend_gap_vol
+        self.groups = groups or {}
+
+    def group_of(self, symbol):
+        return self.groups.get(symbol, symbol[3:6] or symbol)
+
+    def regime_path(self, count):
+        """Volatilidad relativa por barra segun una cadena de regimenes"""
+        levels = np.array([level for level, _ in REGIMES])
+        durations = np.array([duration for _, duration in REGIMES], dtype=float)
+        n_spells = int(count / durations.min()) + 2
+        states = self.rng.integers(0, len(REGIMES), n_spells)
+        lengths = np.maximum(1, self.rng.geometric(1 / durations[states]))
+        path = np.repeat(levels[states], lengths)
+        while len(path) < count:  # improbable: rellenar con otra tanda
+            path = np.concatenate((path, self.regime_path(count - len(path))))
+        return path[:count]
+
+    def group_factors(self, group_names, count, hours):
+        """Shock comun y volatilidad compartida por grupo"""
+        factors = {}
+        scale = np.sqrt(self.bar_seconds / 60)
+        for group in group_names:
+            log_vol = self.vol_of_vol * ar1_fft(self.rng.standard_normal(count), self.vol_persistence)
+            volatility = self.regime_path(count) * np.exp(log_vol) * SESSION_ACTIVITY[hours] * scale
+            factors[group] = (self.rng.standard_normal(count), volatility)
+        return factors
+
+    def iter_rates(self, symbols, start, count):
+        """Genera (simbolo, rates) uno a uno para no retener todo en memoria"""
+        times = trading_times(start, count, self.bar_seconds)
+        count = len(times)
+        hours = ((times // 3600) % 24).astype(np.intp)
+        gaps = np.concatenate(([False], np.diff(times) > self.bar_seconds))
+        factors = self.group_factors({self.group_of(s) for s in symbols}, count, hours)
+        rho = self.correlation
+
+        for symbol in symbols:
+            price, point, base_vol, base_spread = symbol_defaults(symbol)
+            common, volatility = factors[self.group_of(symbol)]
+            sigma = base_vol * volatility
+
+            shocks = np.sqrt(rho) * common + np.sqrt(1 - rho) * self.rng.standard_normal(count)
+            gap_moves = np.where(gaps, self.rng.standard_normal(count) * sigma * self.weekend_gap_vol, 0.0)
+            log_close = np.log(price) + np.cumsum(sigma * shocks + gap_moves)
+            close = np.exp(log_close)
+            previous = np.concatenate(([price], close[:-1]))
+            open_ = previous * np.exp(gap_moves)
+
+            # Rango intrabarra proporcional a la volatilidad de la barra
+            wick = np.abs(self.rng.standard_normal((2, count))) * sigma * 0.8
+            high = np.maximum(open_, close) * np.exp(wick[0])
+            low = np.minimum(open_, close) * np.exp(-wick[1])
+
+            rates = np.empty(count, dtype=RATES_DTYPE)
+            rates['time'] = times
+            rates['open'] = np.round(open_ / point) * point
+            rates['close'] = np.round(close / point) * point
+            rates['high'] = np.maximum(np.round(high / point) * point, np.maximum(rates['open'], rates['close']))
+            rates['low'] = np.minimum(np.round(low / point) * point, np.minimum(rates['open'], rates['close']))
+            rates['tick_volume'] = self.rng.poisson(40 * volatility * (self.bar_seconds / 60)) + 1
+            rates['spread'] = np.round(base_spread * SESSION_SPREAD[hours] * np.sqrt(volatility)).astype(np.int32)
+            rates['real_volume'] = 0
+            yield symbol, rates
+
+    def rates(self, symbols, start, count):
+        """Dict simbolo -> array de barras"""
+        return dict(self.iter_rates(symbols, start, count))
+
+    def ticks(self, rates, symbol, max_ticks_per_bar=200):
+        """Ticks coherentes con las barras: abren en open, cierran en close y tocan high/low"""
+        point = symbol_defaults(symbol)[1]
+        per_bar = np.minimum(np.maximum(rates['tick_volume'].astype(np.int64), 4), max_ticks_per_bar)
+        bar = np.repeat(np.arange(len(rates)), per_bar)
+        starts = np.concatenate(([0], np.cumsum(per_bar)[:-1]))
+        position = np.arange(len(bar)) - starts[bar]
+        last = per_bar[bar] - 1
+
+        # Puente lineal open->close con ruido, acotado al rango de la barra
+        fraction = position / last
+        open_, close = rates['open'][bar], rates['close'][bar]
+        high, low = rates['high'][bar], rates['low'][bar]
+        noise = self.rng.standard_normal(len(bar)) * (high - low) * 0.25
+        bid = np.clip(open_ + (close - open_) * fraction + noise, low, high)
+
+        # Un tick interior en el maximo y otro en el minimo de cada barra
+        slots = per_bar - 2
+        at_high = starts + 1 + (self.rng.random(len(rates)) * slots).astype(np.int64)
+        at_low = starts + 1 + (self.rng.random(len(rates)) * slots).astype(np.int64)
+        at_low = np.where(at_low == at_high, starts + 1 + (at_high - starts) % slots, at_low)
+        bid[at_high] = rates['high']
+        bid[at_low] = rates['low']
+        bid[position == 0] = rates['open']
+        bid[position == last] = rates['close']
+        bid = np.round(bid / point) * point
+
+        # Marcas de tiempo crecientes dentro de cada barra
+        time_msc = rates['time'][bar] * 1000 + (fraction * (self.bar_seconds * 1000 - 1)).astype(np.int64)
+
+        ticks = np.zeros(len(bar), dtype=TICKS_DTYPE)
+        ticks['time_msc'] = time_msc
+        ticks['time'] = time_msc // 1000
+        ticks['bid'] = bid
+        ticks['ask'] = bid + rates['spread'][bar] * point
+        ticks['flags'] = 6  # TICK_FLAG_BID | TICK_FLAG_ASK
+        return ticks
+
+
+SymbolInfo = namedtuple('SymbolInfo', 'name point digits spread trade_mode trade_contract_size '
+                                      'filling_mode visible currency_base currency_profit path')
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+BookInfo = namedtuple('BookInfo', 'type price volume volume_dbl')
+AccountInfo = namedtuple('AccountInfo', 'login balance equity profit margin margin_free margin_level '
+                                        'leverage currency server')
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed ping_last community_account')
+
+
+class SyntheticTerminal:
+    """Sustituto de datos de MetaTrader5 sobre barras sinteticas.
+
+    Cubre las llamadas de datos e informacion de simbolos que usan las
+    estrategias, ``StrategyAnalyzer`` y el motor de exposicion; no ejecuta
+    ordenes (``order_send`` devuelve None). La cuenta es plana y coherente:
+    sin posiciones ni deals, equity = balance y margen 0, asi que el
+    ``RiskManager``, el watchdog y ``DealSync`` funcionan sin activarse. El
+    reloj arranca tras ``warmup`` barras M1 (por defecto la mitad) y
+    ``advance`` va haciendo visibles las siguientes. Se instala como el
+    replay, con ``terminal_recorder._swap_module``. Las constantes son las
+    de MT5.
+    """
+
+    TIMEFRAME_M1, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30 = 1, 5, 15, 30
+    TIMEFRAME_H1, TIMEFRAME_H4, TIMEFRAME_D1 = 16385, 16388, 16408
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL = 0, 1
+    ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+    ORDER_TIME_GTC = 0
+    TRADE_ACTION_DEAL, TRADE_ACTION_SLTP, TRADE_ACTION_CLOSE_BY = 1, 6, 10
+    TRADE_RETCODE_REQUOTE, TRADE_RETCODE_DONE = 10004, 10009
+    TRADE_RETCODE_PRICE_CHANGED, TRADE_RETCODE_PRICE_OFF, TRADE_RETCODE_INVALID_FILL = 10020, 10021, 10030
+    SYMBOL_TRADE_MODE_FULL = 4
+
+    MINUTES = {1: 1, 5: 5, 15: 15, 30: 30, 16385: 60, 16388: 240, 16408: 1440}
+
+    def __init__(self, symbols, start, count, seed=None, warmup=None, balance=10000.0, leverage=100):
+        self.market = SyntheticMarket(seed=seed, bar_seconds=60)
+        self.m1 = self.market.rates(symbols, start, count)
+        warmup = count // 2 if warmup is None else warmup
+        self.cursor = {symbol: max(1, min(warmup, len(rates))) for symbol, rates in self.m1.items()}
+        self.balance = float(balance)
+        self.leverage = leverage
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def login(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, 'Success')
+
+    def terminal_info(self):
+        return TerminalInfo(True, True, 0, False)
+
+    def account_info(self):
+        return AccountInfo(0, self.balance, self.balance, 0.0, 0.0, self.balance, 0.0,
+                           self.leverage, 'USD', 'Synthetic')
+
+    def resample(self, symbol, timeframe):
+        """Barras del timeframe pedido agregando las M1 con ``reduceat``"""
+        rates = self.m1[symbol][:self.cursor[symbol]]
+        minutes = self.MINUTES[timeframe]
+        if minutes == 1:
+            return rates
+        bucket = rates['time'] // (minutes * 60)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        ends = np.append(starts[1:], len(rates))
+        out = np.empty(len(starts), dtype=RATES_DTYPE)
+        out['time'] = bucket[starts] * minutes * 60
+        out['open'] = rates['open'][starts]
+        out['high'] = np.maximum.reduceat(rates['high'], starts)
+        out['low'] = np.minimum.reduceat(rates['low'], starts)
+        out['close'] = rates['close'][ends - 1]
+        out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+        out['spread'] = rates['spread'][ends - 1]
+        out['real_volume'] = 0
+        return out
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        if symbol not in self.m1:
+            return None
+        rates = self.resample(symbol, timeframe)
+        end = len(rates) - start_pos
+        return rates[max(0, end - count):end].copy()
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        if symbol not in self.m1:
+            return None
+        rates = self.resample(symbol, timeframe)
+        start, end = int(date_from.timestamp()), int(date_to.timestamp())
+        return rates[(rates['time'] >= start) & (rates['time'] <= end)].copy()
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        if symbol not in self.m1:
+            return None
+        rates = self.resample(symbol, timeframe)
+        end = np.searchsorted(rates['time'], int(date_from.timestamp()), side='right')
+        return rates[max(0, end - count):end].copy()
+
+    def copy_ticks_range(self, symbol, date_from, date_to, flags=None):
+        if symbol not in self.m1:
+            return None
+        rates = self.m1[symbol][:self.cursor[symbol]]
+        start, end = int(date_from.timestamp()), int(date_to.timestamp())
+        ticks = self.market.ticks(rates[(rates['time'] >= start - 59) & (rates['time'] <= end)], symbol)
+        return ticks[(ticks['time'] >= start) & (ticks['time'] <= end)]
+
+    def symbol_info(self, symbol):
+        if symbol not in self.m1:
+            return None
+        _, point, _, spread = symbol_defaults(symbol)
+        return SymbolInfo(symbol, point, int(round(-np.log10(point))), spread, self.SYMBOL_TRADE_MODE_FULL,
+                          100 if symbol.startswith('XAU') else 100000, 3, True, symbol[:3], symbol[3:6],
+                          f"Synthetic\\{symbol}")
+
+    def symbols_get(self, group='*'):
+        return tuple(self.symbol_info(symbol) for symbol in self.m1)
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self.m1
+
+    def symbol_info_tick(self, symbol):
+        if symbol not in self.m1:
+            return None
+        bar = self.m1[symbol][self.cursor[symbol] - 1]
+        point = symbol_defaults(symbol)[1]
+        ask = bar['close'] + bar['spread'] * point
+        return Tick(int(bar['time']), float(bar['close']), float(ask), float(bar['close']), 0,
+                    int(bar['time']) * 1000, 6, 0.0)
+
+    def market_book_add(self, symbol):
+        return symbol in self.m1
+
+    def market_book_release(self, symbol):
+        return symbol in self.m1
+
+    def market_book_get(self, symbol, depth=10):
+        """Escalera de niveles alrededor del ultimo cierre; mas volumen lejos del precio"""
+        if symbol not in self.m1:
+            return None
+        bar = self.m1[symbol][self.cursor[symbol] - 1]
+        point = symbol_defaults(symbol)[1]
+        step = max(1, int(bar['spread']) // 2) * point
+        bid, ask = float(bar['close']), float(bar['close']) + int(bar['spread']) * point
+        volumes = np.round(self.market.rng.gamma(2.0, 1.0 + np.arange(depth) * 0.5), 2) + 0.01
+        asks = [BookInfo(1, ask + i * step, int(v) or 1, float(v)) for i, v in enumerate(volumes)]
+        bids = [BookInfo(2, bid - i * step, int(v) or 1, float(v)) for i, v in enumerate(volumes)]
+        return tuple(asks[::-1] + bids)
+
+    def advance(self, bars=1):
+        """Avanza el reloj sintetico (las barras siguientes pasan a ser visibles)"""
+        for symbol in self.cursor:
+            self.cursor[symbol] = min(self.cursor[symbol] + bars, len(self.m1[symbol]))
+
+    def positions_get(self, *args, **kwargs):
+        return ()
+
+    def positions_total(self):
+        return 0
+
+    def history_deals_get(self, *args, **kwargs):
+        return ()
+
+    def orders_get(self, *args, **kwargs):
+        return ()
+
+    def order_send(self, request):
+        return None
+
+
+def install_synthetic(symbols, start, count, seed=None, warmup=None):
+    """Sustituye el terminal por datos sinteticos (pruebas de carga y de estres)"""
+    from core.terminal_recorder import _swap_module
+    terminal = SyntheticTerminal(symbols, start, count, seed=seed, warmup=warmup)
+    _swap_module(terminal)
+    return terminal
@@ -0,0 +1,211 @@
+# analysis/tick_backtester.py - BACKTEST POR TICKS CON SPREAD Y SLIPPAGE
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class TickBacktester:
+    """Backtester dirigido por eventos sobre ticks estilo ``copy_ticks_range``.
+
+    Los ticks llegan en bloques grandes de NumPy (campos ``time_msc``, ``bid``
+    y ``ask``). Las barras se agregan por bloque con ``reduceat`` y la
+    estrategia se llama al cierre de cada barra con ``generate_signals(df,
+    symbol)``, la misma interfaz que usa en vivo. Las entradas se llenan en el
+    primer tick de la barra siguiente (ask para compras, bid para ventas, mas
+    slippage) y SL/TP se disparan en orden de ticks contra el lado correcto
+    del libro, buscando el primer tick de salida de forma vectorizada.
+    """
+
+    def __init__(self, strategy, symbol, bar_seconds=300, lookback=None, volume=0.01,
+                 contract_size=100000, point=0.00001, slippage_points=0,
+                 commission_per_lot=0.0, initial_balance=10000.0):
+        self.strategy = strategy
+        self.symbol = symbol
+        self.bar_ms = bar_seconds * 1000
+        # Mismo numero de barras que recibe la estrategia en vivo
+        self.lookback = lookback or getattr(strategy, 'lookback', 100)
+        self.volume = volume
+        self.contract_size = contract_size
+        self.slippage = slippage_points * point
+        self.point = point
+        self.commission_per_lot = commission_per_lot
+        self.initial_balance = initial_balance
+        self.logger = logging.getLogger('TickBacktester')
+
+        # Historial de barras: buffer de 2*lookback que se compacta al llenarse
+        size = 2 * self.lookback
+        self.bars = {name: np.zeros(size) for name in ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread')}
+        self.bar_count = 0
+
+        self.carry = None       # ticks de la barra aun abierta
+        self.position = None    # dict con side, entry, sl, tp, entry_time
+        self.pending = None     # señal a ejecutar en el siguiente tick
+        self.trades = []
+        self.balance = initial_balance
+        self.ticks_processed = 0
+
+    def push_bar(self, values):
+        """Añade una barra cerrada al historial"""
+        size = 2 * self.lookback
+        if self.bar_count == size:
+            for array in self.bars.values():
+                array[:self.lookback] = array[self.lookback:]
+            self.bar_count = self.lookback
+        for name, value in values.items():
+            self.bars[name][self.bar_count] = value
+        self.bar_count += 1
+
+    def bar_frame(self):
+        """DataFrame con las ultimas ``lookback`` barras"""
+        start = max(0, self.bar_count - self.lookback)
+        frame = pd.DataFrame({name: array[start:self.bar_count] for name, array in self.bars.items()})
+        frame['time'] = frame['time'].astype('int64')
+        return frame
+
+    def open_position(self, signal, tick_index, ticks):
+        """Llena una señal pendiente en el tick indicado"""
+        side = signal.side.label
+        bid, ask = ticks['bid'][tick_index], ticks['ask'][tick_index]
+        price = ask + self.slippage if side == 'buy' else bid - self.slippage
+
+        stop_loss, take_profit = signal.stop_loss, signal.take_profit
+        # Mismas validaciones que MT5Connector.execute_order
+        if side == 'buy' and (stop_loss >= price or (take_profit and take_profit <= price)):
+            return
+        if side == 'sell' and (stop_loss <= price or (take_profit and take_profit >= price)):
+            return
+
+        self.position = {
+            'side': side,
+            'entry': float(price),
+            'sl': stop_loss,
+            'tp': take_profit,
+            'entry_time': int(ticks['time_msc'][tick_index]),
+            'spread': float((ask - bid) / self.point),
+        }
+
+    def find_exit(self, ticks, start, stop):
+        """Primer tick de [start, stop) que dispara SL o TP (vectorizado)"""
+        position = self.position
+        if position['side'] == 'buy':
+            prices = ticks['bid'][start:stop]
+            stop_hit = prices <= position['sl']
+            target_hit = prices >= position['tp'] if position['tp'] else np.zeros(len(prices), bool)
+        else:
+            prices = ticks['ask'][start:stop]
+            stop_hit = prices >= position['sl']
+            target_hit = prices <= position['tp'] if position['tp'] else np.zeros(len(prices), bool)
+
+        hit = stop_hit | target_hit
+        if not hit.any():
+            return None
+        offset = int(np.argmax(hit))
+        return start + offset, 'sl' if stop_hit[offset] else 'tp'
+
+    def close_position(self, ticks, tick_index, reason):
+        """Cierra la posicion en el tick indicado"""
+        position = self.position
+        if position['side'] == 'buy':
+            market = ticks['bid'][tick_index]
+            # El TP es una orden limite; el SL se llena a mercado con slippage
+            price = position['tp'] if reason == 'tp' else market - self.slippage
+            direction = 1
+        else:
+            market = ticks['ask'][tick_index]
+            price = position['tp'] if reason == 'tp' else market + self.slippage
+            direction = -1
+
+        pnl = float((price - position['entry']) * direction * self.volume * self.contract_size)
+        pnl -= self.commission_per_lot * self.volume * 2
+        self.balance += pnl
+        self.trades.append({
+            'side': position['side'],
+            'entry_time': position['entry_time'],
+            'exit_time': int(ticks['time_msc'][tick_index]),
+            'entry': position['entry'],
+            'exit': float(price),
+            'reason': reason,
+            'spread_points': position['spread'],
+            'pnl': pnl,
+        })
+        self.position = None
+
+    def process_chunk(self, chunk):
+        """Procesa un bloque de ticks; la ultima barra queda abierta"""
+        ticks = chunk if self.carry is None else np.concatenate((self.carry, chunk))
+        if len(ticks) == 0:
+            return
+
+        bar_id = ticks['time_msc'] // self.bar_ms
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bar_id)) + 1))
+        ends = np.append(starts[1:], len(ticks))
+        complete = len(starts) - 1
+
+        # OHLC (sobre bid) de todas las barras del bloque de una vez
+        bid = ticks['bid']
+        highs = np.maximum.reduceat(bid, starts)
+        lows = np.minimum.reduceat(bid, starts)
+        spreads = (ticks['ask'][ends - 1] - bid[ends - 1]) / self.point
+
+        limit = ends[complete - 1] if complete else 0
+        exit_at = None
+        searched = False
+        for k in range(complete):
+            start, end = starts[k], ends[k]
+
+            if self.pending is not None and self.position is None:
+                self.open_position(self.pending, start, ticks)
+                self.pending = None
+                if self.position is not None:
+                    # Una sola busqueda hasta el final de las barras completas
+                    exit_at = self.find_exit(ticks, start + 1, limit)
+                    searched = True
+
+            if self.position is not None:
+                if not searched:
+                    # Posicion heredada del bloque anterior
+                    exit_at = self.find_exit(ticks, start, limit)
+                    searched = True
+                if exit_at is not None and exit_at[0] < end:
+                    self.close_position(ticks, *exit_at)
+                    exit_at = None
+                    searched = False
+
+            self.push_bar({
+                'time': bar_id[start] * self.bar_ms // 1000,
+                'open': bid[start],
+                'high': highs[k],
+                'low': lows[k],
+                'close': bid[end - 1],
+                'tick_volume': end - start,
+                'spread': spreads[k],
+            })
+
+            if self.position is None and self.bar_count >= self.lookback:
+                signals = self.strategy.generate_signals(self.bar_frame(), self.symbol)
+                if signals:
+                    self.pending = signals[0]
+
+        self.ticks_processed += int(starts[-1]) if complete else 0
+        self.carry = ticks[starts[-1]:]
+
+    def run(self, tick_chunks):
+        """Ejecuta el backtest sobre un iterable de bloques de ticks"""
+        started = time.perf_counter()
+        for chunk in tick_chunks:
+            self.process_chunk(chunk)
+        elapsed = time.perf_counter() - started
+
+        pnls = np.array([t['pnl'] for t in self.trades])
+        return {
+            'trades': len(self.trades),
+            'total_pnl': float(pnls.sum()) if len(pnls) else 0.0,
+            'win_rate': float((pnls > 0).mean()) if len(pnls) else 0.0,
+            'final_balance': self.balance,
+            'equity_curve': self.initial_balance + np.cumsum(pnls),
+            'ticks': self.ticks_processed,
+            'ticks_per_second': self.ticks_processed / elapsed if elapsed > 0 else 0.0,
+            'seconds': elapsed,
+        }
@@ -0,0 +1,76 @@
+# analysis/vector_signals.py - SEÑALES DE LAS ESTRATEGIAS SOBRE LA SERIE COMPLETA
+import numpy as np
+import pandas as pd
+
+# Mismas reglas que strategies/*, pero evaluadas en una sola pasada sobre
+# todo el historico (sin bucle por barra). Devuelven un array int8 con
+# +1 compra, -1 venta y 0 sin señal en cada barra.
+
+
+def ema(close, span):
+    """EMA (ewm con adjust=True, como en ForexScalper)"""
+    return pd.Series(close).ewm(span=span).mean().to_numpy()
+
+
+def sma(close, period):
+    """Media simple; NaN hasta completar el periodo"""
+    return pd.Series(close).rolling(period).mean().to_numpy()
+
+
+def rsi(close, period=14):
+    """RSI con medias simples de ganancias y perdidas"""
+    delta = np.diff(close, prepend=np.nan)
+    gain = pd.Series(np.where(delta > 0, delta, 0.0)).rolling(period).mean().to_numpy()
+    loss = pd.Series(np.where(delta < 0, -delta, 0.0)).rolling(period).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def atr(high, low, close, period=14):
+    """Average True Range"""
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return pd.Series(true_range).rolling(period).mean().to_numpy()
+
+
+def scalper_signals(close, fast=8, slow=21, rsi_period=14):
+    """Cruce de EMAs filtrado por RSI (ForexScalper)"""
+    ema_fast = ema(close, fast)
+    ema_slow = ema(close, slow)
+    rsi_values = rsi(close, rsi_period)
+
+    buy = (ema_fast > ema_slow) & (rsi_values < 65) & (rsi_values > 40)
+    sell = (ema_fast < ema_slow) & (rsi_values > 35) & (rsi_values < 60)
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def turtle_signals(high, low, close, channel=20):
+    """Ruptura del canal de la barra previa (TurtleStrategy)"""
+    highest = pd.Series(high).rolling(channel).max().shift(1).to_numpy()
+    lowest = pd.Series(low).rolling(channel).min().shift(1).to_numpy()
+
+    buy = close > highest
+    sell = ~buy & (close < lowest)
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def gold_signals(close, fast=50, slow=200):
+    """Tendencia por cruce de medias simples (GoldTrendStrategy)"""
+    sma_fast = sma(close, fast)
+    sma_slow = sma(close, slow)
+
+    valid = ~np.isnan(sma_slow)
+    buy = valid & (sma_fast > sma_slow)
+    sell = valid & ~(sma_fast > sma_slow)
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def strategy_signals(strategy, high, low, close, params):
+    """Despacha por nombre de estrategia"""
+    if strategy == 'scalper':
+        return scalper_signals(close, **params)
+    if strategy == 'turtle':
+        return turtle_signals(high, low, close, **params)
+    if strategy == 'gold_trend':
+        return gold_signals(close, **params)
+    raise ValueError(f"Estrategia desconocida: {strategy}")
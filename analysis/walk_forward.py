@@ -0,0 +1,203 @@
+# analysis/walk_forward.py - WALK-FORWARD PARALELO CON OPTIMIZACION POR FOLD
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis.vector_signals import strategy_signals
+from analysis.result_cache import ResultCache
+
+# Rejillas de parametros por estrategia ('hold' = barras que se mantiene la señal)
+DEFAULT_GRIDS = {
+    'scalper': {'fast': [5, 8, 13], 'slow': [21, 34, 55], 'hold': [1]},
+    'turtle': {'channel': [10, 20, 55], 'hold': [5, 10, 20]},
+    'gold_trend': {'fast': [20, 50], 'slow': [100, 200], 'hold': [1]},
+}
+
+
+def expand_grid(grid):
+    """Producto cartesiano de una rejilla {param: [valores]}"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def bar_returns(strategy, high, low, close, params, cost):
+    """Retornos por barra de la estrategia (vectorizado)"""
+    params = dict(params)
+    hold = params.pop('hold', 1)
+    signals = strategy_signals(strategy, high, low, close, params).astype(float)
+
+    # La señal se mantiene 'hold' barras y se opera al cierre de la barra
+    position = signals
+    if hold > 1:
+        position = pd.Series(np.where(signals != 0, signals, np.nan)).ffill(limit=hold - 1).fillna(0).to_numpy()
+    position = np.concatenate(([0.0], position[:-1]))
+
+    market = np.diff(close, prepend=close[0]) / np.concatenate(([close[0]], close[:-1]))
+    turnover = np.abs(np.diff(position, prepend=0.0))
+    return position * market - turnover * cost
+
+
+def score_returns(returns):
+    """Ratio retorno/volatilidad por barra (0 si no hay actividad)"""
+    std = returns.std()
+    if std == 0 or np.isnan(std):
+        return 0.0
+    return float(returns.mean() / std * np.sqrt(len(returns)))
+
+
+def run_fold(job):
+    """Optimiza en la ventana de entrenamiento y puntua en la de test.
+
+    Funcion de modulo para poder enviarla a los procesos del pool.
+    """
+    high, low, close = job['high'], job['low'], job['close']
+    warmup, train, test = job['warmup'], job['train'], job['test']
+    train_slice = slice(warmup, warmup + train)
+    test_slice = slice(warmup + train, warmup + train + test)
+
+    best_params, best_score = None, -np.inf
+    for params in expand_grid(job['grid']):
+        # Indicadores causales: calcular sobre todo el tramo no mira al futuro
+        returns = bar_returns(job['strategy'], high, low, close, params, job['cost'])
+        score = score_returns(returns[train_slice])
+        if score > best_score:
+            best_params, best_score = params, score
+
+    returns = bar_returns(job['strategy'], high, low, close, best_params, job['cost'])
+    return {
+        'strategy': job['strategy'],
+        'symbol': job['symbol'],
+        'fold': job['fold'],
+        'params': best_params,
+        'train_score': best_score,
+        'test_score': score_returns(returns[test_slice]),
+        'test_time': job['time'][test_slice],
+        'test_returns': returns[test_slice],
+    }
+
+
+class WalkForwardAnalyzer:
+    """Walk-forward con ventanas moviles de entrenamiento y test.
+
+    Cada fold de cada simbolo y estrategia es un trabajo independiente que se
+    reparte en un pool de procesos; los resultados de test se concatenan en
+    curvas de equity fuera de muestra.
+    """
+
+    def __init__(self, train_bars=2000, test_bars=500, warmup_bars=250,
+                 cost=0.0001, grids=None, max_workers=None, cache=None):
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.warmup_bars = warmup_bars
+        self.cost = cost
+        self.grids = grids or DEFAULT_GRIDS
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache = cache
+        self.logger = logging.getLogger('WalkForwardAnalyzer')
+
+    def build_jobs(self, strategy, symbol, data):
+        """Divide la serie en folds consecutivos (paso = ventana de test)"""
+        time_values = data['time'].to_numpy()
+        high = data['high'].to_numpy(dtype=float)
+        low = data['low'].to_numpy(dtype=float)
+        close = data['close'].to_numpy(dtype=float)
+
+        jobs = []
+        span = self.train_bars + self.test_bars
+        start = 0
+        fold = 0
+        while start + self.warmup_bars + span <= len(close):
+            end = start + self.warmup_bars + span
+            jobs.append({
+                'strategy': strategy,
+                'symbol': symbol,
+                'fold': fold,
+                'grid': self.grids[strategy],
+                'cost': self.cost,
+                'warmup': self.warmup_bars,
+                'train': self.train_bars,
+                'test': self.test_bars,
+                'time': time_values[start:end],
+                'high': high[start:end],
+                'low': low[start:end],
+                'close': close[start:end],
+            })
+            start += self.test_bars
+            fold += 1
+        return jobs
+
+    def run(self, datasets):
+        """Ejecuta el walk-forward.
+
+        ``datasets`` es una lista de (estrategia, simbolo, DataFrame OHLC).
+        Devuelve {(estrategia, simbolo): resumen con curva fuera de muestra}.
+        """
+        jobs = []
+        for strategy, symbol, data in datasets:
+            jobs.extend(self.build_jobs(strategy, symbol, data))
+
+        if not jobs:
+            return {}
+
+        # Solo se recalculan los folds cuya combinacion (parametros, datos) cambio
+        folds, pending, keys = [], [], []
+        for job in jobs:
+            key = self.job_key(job) if self.cache else None
+            found, fold = self.cache.get(key) if self.cache else (False, None)
+            if found:
+                folds.append(fold)
+            else:
+                pending.append(job)
+                keys.append(key)
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                chunksize = max(1, len(pending) // (self.max_workers * 4))
+                computed = list(pool.map(run_fold, pending, chunksize=chunksize))
+            for key, fold in zip(keys, computed):
+                if self.cache:
+                    self.cache.put(key, fold)
+            folds.extend(computed)
+
+        return self.combine(folds)
+
+    def job_key(self, job):
+        """Clave de cache de un fold"""
+        params = {
+            'grid': job['grid'],
+            'cost': job['cost'],
+            'windows': [job['warmup'], job['train'], job['test']],
+            'fold': job['fold'],
+        }
+        digest = ResultCache.data_digest(job['high'], job['low'], job['close'])
+        return ResultCache.make_key('walk_forward_fold', job['strategy'], params,
+                                    (job['time'][0], job['time'][-1]), digest)
+
+    def combine(self, folds, initial_equity=10000.0):
+        """Une los folds de test en curvas de equity por estrategia y simbolo"""
+        grouped = {}
+        for fold in folds:
+            grouped.setdefault((fold['strategy'], fold['symbol']), []).append(fold)
+
+        results = {}
+        for key, items in grouped.items():
+            items.sort(key=lambda f: f['fold'])
+            returns = np.concatenate([f['test_returns'] for f in items])
+            equity = initial_equity * np.cumprod(1 + returns)
+            peak = np.maximum.accumulate(equity)
+
+            results[key] = {
+                'folds': len(items),
+                'params': [f['params'] for f in items],
+                'time': np.concatenate([f['test_time'] for f in items]),
+                'equity': equity,
+                'total_return_pct': (equity[-1] / initial_equity - 1) * 100,
+                'max_drawdown_pct': float(((peak - equity) / peak).max() * 100),
+                'oos_score': score_returns(returns),
+                'avg_train_score': float(np.mean([f['train_score'] for f in items])),
+            }
+        return results
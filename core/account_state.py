@@ -0,0 +1,70 @@
+# core/account_state.py - SNAPSHOT VERSIONADO DE LA CUENTA COMPARTIDO POR EL CICLO
+import logging
+import threading
+import time
+from datetime import date
+
+
+class AccountState:
+    """Snapshot unico de ``account_info`` para todos los componentes.
+
+    Se refresca al inicio de cada ciclo, tras un fill (``invalidate``) o al
+    caducar el TTL; el resto de lecturas dentro del ciclo no llaman al
+    terminal y ven los mismos datos. Cada refresco incrementa ``version``.
+    Tambien mantiene el maximo intradia de equity (high-water mark) para medir
+    drawdowns que empiezan desde un pico de beneficio.
+    """
+
+    def __init__(self, connector, ttl=5.0):
+        self.connector = connector
+        self.ttl = ttl
+        self.logger = logging.getLogger('AccountState')
+
+        self.version = 0
+        self.snapshot = None
+        self.fetched_at = 0.0
+        self.high_water_mark = None
+        self.hwm_date = None
+
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Devuelve el snapshot, consultando el terminal solo si hace falta"""
+        with self._lock:
+            if not force and self.snapshot and time.monotonic() - self.fetched_at < self.ttl:
+                return self.snapshot
+
+            info = self.connector.get_account_info()
+            if not info:
+                return None
+
+            self.version += 1
+            self.fetched_at = time.monotonic()
+            self.update_high_water_mark(info['equity'])
+            self.snapshot = dict(info, version=self.version, timestamp=time.time(),
+                                 high_water_mark=self.high_water_mark)
+            return self.snapshot
+
+    def get(self):
+        """Snapshot vigente (refresca si el TTL caduco)"""
+        return self.refresh(force=False)
+
+    def invalidate(self):
+        """Fuerza refresco en la proxima lectura (p. ej. tras un fill)"""
+        self.fetched_at = 0.0
+
+    def update_high_water_mark(self, equity):
+        """Maximo intradia de equity; se reinicia al cambiar de dia"""
+        today = date.today()
+        if self.hwm_date != today or self.high_water_mark is None:
+            self.high_water_mark = equity
+            self.hwm_date = today
+        elif equity > self.high_water_mark:
+            self.high_water_mark = equity
+
+    def drawdown_from_peak(self):
+        """Drawdown actual (%) medido desde el maximo intradia de equity"""
+        snapshot = self.get()
+        if not snapshot or not self.high_water_mark:
+            return None
+        return (self.high_water_mark - snapshot['equity']) / self.high_water_mark * 100
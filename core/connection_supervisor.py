@@ -0,0 +1,183 @@
+# core/connection_supervisor.py - SUPERVISOR DE CONEXION CON CIRCUIT BREAKER
+import MetaTrader5 as mt5
+import threading
+import random
+import logging
+import time
+from collections import deque
+from core.event_log import events, CONNECTION
+
+
+class ConnectionSupervisor:
+    """Vigila la conexion con el terminal en un hilo de fondo.
+
+    Envia un heartbeat periodico, mide latencia y tasa de errores de las
+    llamadas registradas y abre el circuit breaker cuando la conexion se
+    degrada. Con el breaker abierto no se permiten ordenes nuevas y el
+    re-login se intenta en segundo plano con backoff exponencial con jitter,
+    sin bloquear el ciclo de trading.
+    """
+
+    CLOSED = 'closed'        # Operacion normal
+    OPEN = 'open'            # Conexion caida: ordenes pausadas, reconectando
+    HALF_OPEN = 'half_open'  # Reconectado: esperando heartbeat de confirmacion
+
+    def __init__(self, connector, heartbeat_interval=5.0, window=20, min_calls=5,
+                 error_rate_threshold=0.5, max_latency=3.0,
+                 base_backoff=1.0, max_backoff=60.0):
+        self.connector = connector
+        self.heartbeat_interval = heartbeat_interval
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.max_latency = max_latency
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.logger = logging.getLogger('ConnectionSupervisor')
+
+        self.state = self.CLOSED
+        self.calls = deque(maxlen=window)  # (ok, latencia) de las ultimas llamadas
+        self.avg_latency = 0.0
+        self.reconnect_attempts = 0
+        self.next_reconnect_at = 0.0
+        self.tripped_at = None
+        self.last_recovery_seconds = None
+        self.recoveries = 0  # reconexiones completadas (las suscripciones del terminal se pierden)
+        self.trip_count = 0
+        self.trip_reason = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        connector.supervisor = self
+
+    def start(self):
+        """Arranca el hilo supervisor"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mt5-supervisor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo supervisor"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat_interval + 1)
+
+    def allow_orders(self):
+        """Indica si se pueden enviar ordenes nuevas"""
+        return self.state == self.CLOSED
+
+    def record_call(self, name, latency, ok):
+        """Registra el resultado de una llamada al terminal"""
+        with self._lock:
+            self.calls.append((ok, latency))
+            # Media movil exponencial de la latencia
+            self.avg_latency = latency if self.avg_latency == 0 else 0.8 * self.avg_latency + 0.2 * latency
+
+        if self.state == self.CLOSED and self.error_rate() >= self.error_rate_threshold \
+                and len(self.calls) >= self.min_calls:
+            self.trip(f"tasa de errores {self.error_rate():.0%} ({name})")
+
+    def error_rate(self):
+        """Proporcion de llamadas fallidas en la ventana"""
+        with self._lock:
+            if not self.calls:
+                return 0.0
+            return sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+
+    def trip(self, reason):
+        """Abre el circuit breaker y programa la reconexion"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return
+            # Un fallo durante la confirmacion no reinicia el reloj de recuperacion
+            if self.state == self.CLOSED:
+                self.trip_count += 1
+                self.tripped_at = time.monotonic()
+                self.reconnect_attempts = 0
+                self.next_reconnect_at = 0.0
+            else:
+                self.next_reconnect_at = time.monotonic() + self.backoff_delay()
+            self.state = self.OPEN
+            self.trip_reason = reason
+            self.connector.connected = False
+
+        print(f"⚡ CIRCUIT BREAKER ABIERTO: {reason} - ordenes pausadas")
+        self.logger.warning(f"Circuit breaker abierto: {reason}")
+        events.emit(CONNECTION, level=logging.WARNING, state=self.OPEN, reason=reason)
+
+    def heartbeat(self):
+        """Comprueba que el terminal responde y sigue conectado"""
+        started = time.perf_counter()
+        try:
+            info = mt5.terminal_info()
+            ok = info is not None and info.connected
+        except Exception:
+            ok = False
+        latency = time.perf_counter() - started
+
+        with self._lock:
+            self.calls.append((ok, latency))
+
+        if not ok:
+            self.trip("heartbeat sin respuesta")
+        elif latency > self.max_latency and self.state == self.CLOSED:
+            self.trip(f"latencia de heartbeat {latency:.2f}s")
+        return ok
+
+    def backoff_delay(self):
+        """Espera antes del siguiente intento (exponencial con jitter)"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** self.reconnect_attempts))
+        return delay * random.uniform(0.5, 1.5)
+
+    def attempt_reconnect(self):
+        """Un intento de re-login sin esperas internas"""
+        self.reconnect_attempts += 1
+        try:
+            mt5.shutdown()
+        except Exception:
+            pass
+
+        if self.connector.connect(max_retries=1, retry_delay=0):
+            with self._lock:
+                self.state = self.HALF_OPEN
+                self.calls.clear()
+            return True
+
+        self.next_reconnect_at = time.monotonic() + self.backoff_delay()
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.state == self.OPEN:
+                    if time.monotonic() >= self.next_reconnect_at:
+                        self.attempt_reconnect()
+                elif self.heartbeat() and self.state == self.HALF_OPEN:
+                    with self._lock:
+                        self.state = self.CLOSED
+                        self.last_recovery_seconds = time.monotonic() - self.tripped_at
+                        self.recoveries += 1
+                    print(f"✅ CONEXION RECUPERADA en {self.last_recovery_seconds:.1f}s - ordenes reanudadas")
+                    events.emit(CONNECTION, state=self.CLOSED,
+                                recovery_seconds=round(self.last_recovery_seconds, 3))
+            except Exception as e:
+                self.logger.error(f"Error en supervisor: {e}")
+
+            # Fuera de operacion normal se revisa mas a menudo para recuperar antes
+            wait = self.heartbeat_interval if self.state == self.CLOSED else 0.5
+            self._stop.wait(wait)
+
+    def status(self):
+        """Resumen del estado de la conexion"""
+        return {
+            'state': self.state,
+            'error_rate': self.error_rate(),
+            'avg_latency_ms': self.avg_latency * 1000,
+            'trip_count': self.trip_count,
+            'trip_reason': self.trip_reason,
+            'reconnect_attempts': self.reconnect_attempts,
+            'last_recovery_seconds': self.last_recovery_seconds
+        }
@@ -0,0 +1,63 @@
+# core/data_feeder.py - DESCARGA PLANIFICADA DE DATOS PARA TODAS LAS ESTRATEGIAS
+import logging
+import time
+
+import MetaTrader5 as mt5
+import pandas as pd
+
+
+class DataFeeder:
+    """Agrupa los requisitos de datos de las estrategias y los descarga una vez.
+
+    El plan es la union de los (simbolo, timeframe) declarados con el mayor
+    numero de barras pedido por cualquier estrategia, de modo que dos
+    estrategias sobre el mismo simbolo comparten una sola llamada a
+    ``copy_rates_from_pos`` y cada una recibe las ultimas barras que pidio.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('DataFeeder')
+        self.last_plan = {}
+        self.last_fetch_seconds = 0.0
+
+    @staticmethod
+    def plan(strategies):
+        """(simbolo, timeframe) -> barras a descargar"""
+        plan = {}
+        for strategy in strategies:
+            for symbol, timeframe, count in strategy.requirements():
+                key = (symbol, timeframe)
+                plan[key] = max(plan.get(key, 0), count)
+        return plan
+
+    def prefetch(self, strategies):
+        """Valida las estrategias y descarga los datos del plan"""
+        strategies = list(strategies)
+        for strategy in strategies:
+            strategy.validate()
+
+        started = time.perf_counter()
+        self.last_plan = self.plan(strategies)
+        data = {}
+        for (symbol, timeframe), count in self.last_plan.items():
+            try:
+                rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+            except Exception as e:
+                self.logger.error(f"Error descargando {symbol}: {e}")
+                continue
+            if rates is None or len(rates) == 0:
+                continue
+            if len(rates) < count:
+                self.logger.warning(f"{symbol}: {len(rates)} de {count} barras disponibles")
+            data[(symbol, timeframe)] = pd.DataFrame(rates)
+        self.last_fetch_seconds = time.perf_counter() - started
+        return data
+
+    @staticmethod
+    def open_symbols():
+        """Simbolos con posicion abierta (una sola consulta al terminal)"""
+        try:
+            positions = mt5.positions_get()
+            return {p.symbol for p in positions} if positions else set()
+        except Exception:
+            return set()
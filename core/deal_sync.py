@@ -0,0 +1,138 @@
+# core/deal_sync.py - SINCRONIZACION INCREMENTAL DEL HISTORIAL DE DEALS CON EL TRACKER
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import MetaTrader5 as mt5
+
+from core.trade_types import Side
+
+# Magic number por estrategia; MAGIC_BASE queda para ordenes sin estrategia y cierres
+MAGIC_BASE = 234000
+STRATEGY_MAGICS = {'scalper': MAGIC_BASE + 1, 'gold_trend': MAGIC_BASE + 2, 'turtle': MAGIC_BASE + 3}
+COMMENT_PREFIX = 'Nextia-'
+
+# Tipos y entradas de deal de MT5 (DEAL_TYPE_* / DEAL_ENTRY_*)
+DEAL_TYPE_BUY, DEAL_TYPE_SELL = 0, 1
+DEAL_ENTRY_IN, DEAL_ENTRY_OUT, DEAL_ENTRY_INOUT, DEAL_ENTRY_OUT_BY = 0, 1, 2, 3
+
+
+def magic_for(strategy):
+    return STRATEGY_MAGICS.get(strategy, MAGIC_BASE)
+
+
+def comment_for(strategy):
+    return f"{COMMENT_PREFIX}{strategy}"[:31] if strategy else "NextiaBot-Pro"
+
+
+def strategy_for(magic, comment):
+    """Estrategia de un deal de entrada; None si no es una orden del bot"""
+    for name, value in STRATEGY_MAGICS.items():
+        if magic == value:
+            return name
+    if comment and comment.startswith(COMMENT_PREFIX):
+        return comment[len(COMMENT_PREFIX):]
+    if magic == MAGIC_BASE:
+        return 'nextia'
+    return None
+
+
+class DealSync:
+    """Lee los deals nuevos de ``history_deals_get`` desde un cursor persistido.
+
+    El cursor es el tiempo del ultimo deal procesado mas los tickets vistos en
+    ese segundo, asi que cada consulta solo trae lo nuevo y ningun deal se
+    cuenta dos veces (tampoco tras reiniciar). Los deals de entrada asocian
+    el ``position_id`` a la estrategia (magic o comentario); cada deal de
+    salida, total o parcial, se pasa al ``PerformanceTracker`` como un trade
+    con su P&L realizado (profit + comision + swap + fee).
+    """
+
+    def __init__(self, tracker, state_path='data/deal_sync.json', initial_lookback=86400):
+        self.tracker = tracker
+        self.state_path = state_path
+        self.logger = logging.getLogger('DealSync')
+
+        state = self.load_state()
+        self.cursor = state.get('cursor', int(time.time()) - initial_lookback)
+        self.seen = set(state.get('seen', []))              # tickets con time == cursor
+        self.positions = state.get('positions', {})         # position_id -> [estrategia, volumen abierto]
+        self.last_fetched = 0
+        self.realized = []  # trades de la ultima sincronizacion
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'cursor': self.cursor, 'seen': sorted(self.seen), 'positions': self.positions}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def fetch(self):
+        """Deals desde el cursor (incluido) hasta mañana: cubre el desfase horario del servidor"""
+        date_from = datetime.fromtimestamp(self.cursor, tz=timezone.utc)
+        date_to = datetime.fromtimestamp(time.time() + 86400, tz=timezone.utc)
+        deals = mt5.history_deals_get(date_from, date_to)
+        if deals is None:
+            self.logger.warning(f"history_deals_get sin respuesta ({mt5.last_error()})")
+            return None
+        return sorted(deals, key=lambda deal: (deal.time_msc, deal.ticket))
+
+    def sync(self):
+        """Procesa los deals nuevos; devuelve la lista de trades realizados"""
+        deals = self.fetch()
+        self.realized = []
+        if not deals:
+            return self.realized
+        self.last_fetched = len(deals)
+
+        for deal in deals:
+            if deal.time < self.cursor or (deal.time == self.cursor and deal.ticket in self.seen):
+                continue
+            if deal.time > self.cursor:
+                self.cursor = deal.time
+                self.seen = set()
+            self.seen.add(deal.ticket)
+            self.apply(deal)
+
+        self.save_state()
+        return self.realized
+
+    def apply(self, deal):
+        if deal.type not in (DEAL_TYPE_BUY, DEAL_TYPE_SELL):
+            return  # balance, credito, comisiones sueltas...
+        key = str(deal.position_id)
+
+        if deal.entry == DEAL_ENTRY_IN:
+            strategy = strategy_for(deal.magic, deal.comment)
+            if strategy:
+                self.positions[key] = [strategy, deal.volume]
+            return
+
+        position = self.positions.get(key)
+        if position is None:
+            return  # posicion ajena al bot o abierta antes del cursor inicial
+        strategy = position[0]
+        pnl = deal.profit + deal.commission + deal.swap + getattr(deal, 'fee', 0.0)
+        # El deal de salida va en sentido contrario a la posicion
+        side = Side.SELL if deal.type == DEAL_TYPE_BUY else Side.BUY
+        trade = {'symbol': deal.symbol, 'type': side, 'pnl': pnl, 'volume': deal.volume,
+                 'position_id': deal.position_id, 'deal': deal.ticket}
+        self.tracker.update_strategy_metrics(strategy, trade)
+        self.realized.append(dict(trade, strategy=strategy))
+
+        if deal.entry == DEAL_ENTRY_INOUT:
+            # Reversal: el exceso abre una posicion en el otro sentido
+            position[1] = max(deal.volume - position[1], 0.0)
+        else:
+            position[1] = round(position[1] - deal.volume, 8)
+        if position[1] <= 0:
+            del self.positions[key]
@@ -0,0 +1,208 @@
+# core/equity_recorder.py - SERIE TEMPORAL DE EQUITY CON NIVELES DE RESOLUCION Y LTTB
+import logging
+import threading
+import time
+
+import numpy as np
+
+FIELDS = ('equity', 'balance', 'margin', 'profit')
+
+
+class Ring:
+    """Buffer circular de un array estructurado con capacidad fija"""
+
+    def __init__(self, dtype, capacity):
+        self.rows = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def append(self, row):
+        self.rows[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self):
+        """Filas de la mas antigua a la mas nueva (copia)"""
+        if self.count < self.capacity:
+            return self.rows[:self.count].copy()
+        return np.concatenate((self.rows[self.head:], self.rows[:self.head]))
+
+    def oldest_time(self):
+        if not self.count:
+            return None
+        return float(self.rows['time'][self.head if self.count == self.capacity else 0])
+
+
+class Tier:
+    """Nivel agregado: un cubo por ``seconds`` con min/max/ultimo de cada campo"""
+
+    def __init__(self, seconds, capacity, fields):
+        self.seconds = seconds
+        self.fields = fields
+        dtype = [('time', 'f8')] + [(f"{field}_{agg}", 'f8') for field in fields for agg in ('min', 'max', 'last')]
+        self.ring = Ring(dtype, capacity)
+        self.bucket = None   # inicio del cubo abierto
+        self.current = None  # dict con los agregados del cubo abierto
+
+    def add(self, timestamp, values):
+        bucket = timestamp - timestamp % self.seconds
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+            self.current = {}
+            for field in self.fields:
+                value = values[field]
+                self.current[f"{field}_min"] = value
+                self.current[f"{field}_max"] = value
+                self.current[f"{field}_last"] = value
+            return
+        current = self.current
+        for field in self.fields:
+            value = values[field]
+            if value < current[f"{field}_min"]:
+                current[f"{field}_min"] = value
+            if value > current[f"{field}_max"]:
+                current[f"{field}_max"] = value
+            current[f"{field}_last"] = value
+
+    def flush(self):
+        if self.bucket is None:
+            return
+        row = [self.bucket] + [self.current[name] for name in self.ring.rows.dtype.names[1:]]
+        self.ring.append(tuple(row))
+        self.bucket = None
+
+    def series(self):
+        """Cubos cerrados y el cubo abierto, en orden temporal"""
+        rows = self.ring.ordered()
+        if self.bucket is not None:
+            open_row = np.zeros(1, dtype=rows.dtype)
+            open_row['time'] = self.bucket
+            for name, value in self.current.items():
+                open_row[name] = value
+            rows = np.concatenate((rows, open_row))
+        return rows
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: ``threshold`` puntos que conservan la forma"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Punto medio del cubo siguiente (o el ultimo punto)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+class EquityRecorder:
+    """Muestreo de equity, balance, margen y P&L abierto con memoria constante.
+
+    Las muestras crudas van a un buffer circular y, a la vez, a niveles de
+    1 s, 1 min y 1 h con min/max/ultimo por cubo, cada uno de tamaño fijo.
+    ``query`` elige el nivel mas fino que cubre la ventana pedida y reduce
+    la serie con LTTB a ``max_points`` para graficar rapido cualquier rango.
+    """
+
+    TIERS = ((1, 3600), (60, 1440), (3600, 24 * 365))  # (segundos por cubo, cubos)
+
+    def __init__(self, raw_capacity=4096, fields=FIELDS, tiers=TIERS):
+        self.fields = fields
+        self.raw = Ring([('time', 'f8')] + [(field, 'f8') for field in fields], raw_capacity)
+        self.tiers = [Tier(seconds, capacity, fields) for seconds, capacity in tiers]
+        self.logger = logging.getLogger('EquityRecorder')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def from_account(info):
+        """Muestra a partir de ``MT5Connector.get_account_info``"""
+        return {
+            'equity': info['equity'],
+            'balance': info['balance'],
+            'margin': info['margin'],
+            'profit': info['equity'] - info['balance'],
+        }
+
+    def record(self, values, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.raw.append((timestamp,) + tuple(values[field] for field in self.fields))
+            for tier in self.tiers:
+                tier.add(timestamp, values)
+
+    @staticmethod
+    def covers(ring, start):
+        """True si el buffer conserva todo desde ``start`` (o desde el principio)"""
+        if ring.count < ring.capacity:
+            return True  # aun no ha descartado nada
+        return start is not None and ring.oldest_time() <= start
+
+    def query(self, start=None, end=None, field='equity', max_points=500, aggregate='last'):
+        """(tiempos, valores) de ``field`` en [start, end] reducidos con LTTB.
+
+        En los niveles agregados ``aggregate`` elige 'min', 'max' o 'last'.
+        """
+        end = time.time() if end is None else end
+        with self._lock:
+            if self.covers(self.raw, start):
+                rows, column = self.raw.ordered(), field
+            else:
+                tier = next((tier for tier in self.tiers if self.covers(tier.ring, start)), self.tiers[-1])
+                rows, column = tier.series(), f"{field}_{aggregate}"
+
+        mask = rows['time'] <= end
+        if start is not None:
+            mask &= rows['time'] >= start
+        times, values = rows['time'][mask], rows[column][mask]
+        return lttb(times, values, max_points)
+
+    def summary(self, window=3600, field='equity'):
+        """Min/max/ultimo de la ultima ventana (desde el nivel de 1 min)"""
+        now = time.time()
+        with self._lock:
+            rows = self.tiers[1].series()
+        rows = rows[rows['time'] >= now - window]
+        if not len(rows):
+            return None
+        return {
+            'min': float(rows[f"{field}_min"].min()),
+            'max': float(rows[f"{field}_max"].max()),
+            'last': float(rows[f"{field}_last"][-1]),
+        }
+
+    def start(self, sampler, interval=1.0):
+        """Muestrea en segundo plano; ``sampler`` devuelve un dict con los campos"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(sampler, interval),
+                                        name='equity-recorder', daemon=True)
+        self._thread.start()
+
+    def _run(self, sampler, interval):
+        while not self._stop.wait(interval):
+            try:
+                values = sampler()
+                if values:
+                    self.record(values)
+            except Exception as e:
+                self.logger.error(f"Error muestreando equity: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
@@ -0,0 +1,193 @@
+# core/equity_watchdog.py - VIGILANCIA DE EQUITY EN SEGUNDO PLANO CON CIERRE INMEDIATO
+import logging
+import threading
+import time
+
+import MetaTrader5 as mt5
+
+from core.event_log import events, PROTECTION
+from core.execution_analytics import QuantileSketch
+
+
+class EquityWatchdog:
+    """Comprueba drawdown y corte del viernes varias veces por segundo.
+
+    El ciclo de trading solo mira el drawdown cada ~2 minutos; este hilo
+    consulta ``account_info`` cada ``interval`` segundos y, en cuanto se
+    supera el limite de ``RiskManager`` o llega el corte del viernes, bloquea
+    las ordenes nuevas (``allow_orders``) y cierra todas las posiciones sin
+    esperar al ciclo. El bloqueo se levanta solo cuando la condicion deja de
+    cumplirse (nuevo dia o lunes). Si durante el bloqueo quedan posiciones
+    (cierre rechazado u orden en vuelo) el cierre se reintenta con backoff
+    exponencial, o enseguida si cambia el numero de posiciones. Mide cuanto
+    tarda en reaccionar: desde la muestra que detecta el limite hasta la
+    decision y hasta el cierre.
+
+    Es el unico muestreador de ``account_info`` en segundo plano: con
+    ``feed`` pasa una muestra cada ``interval`` segundos al ``EquityRecorder``
+    en lugar de que este consulte el terminal por su cuenta.
+    """
+
+    def __init__(self, risk_manager, connector, account_state=None, interval=0.25,
+                 retry_backoff=2.0, max_retry_backoff=60.0):
+        self.risk_manager = risk_manager
+        self.connector = connector
+        self.account_state = account_state
+        self.interval = interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.logger = logging.getLogger('EquityWatchdog')
+
+        self.polls = 0
+        self.poll_latency = QuantileSketch.log(0.1, 10000.0, 200)  # ms por consulta
+        self.reactions = []   # una entrada por activacion
+        self.last_ok_at = None
+        self.last_drawdown = None
+        self.flatten_retries = 0
+        self.next_flatten_at = 0.0
+        self.flattened_count = None  # posiciones abiertas tras el ultimo cierre
+        self.recorder = None
+        self.record_interval = 1.0
+        self._last_record = 0.0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        connector.watchdog = self
+
+    @property
+    def halt_reason(self):
+        return self.risk_manager.halt_reason
+
+    def allow_orders(self):
+        """Indica si se pueden enviar ordenes nuevas"""
+        return self.risk_manager.halt_reason is None
+
+    def feed(self, recorder, interval=1.0):
+        """Envia las muestras al registro de equity (como mucho una por ``interval``)"""
+        self.recorder = recorder
+        self.record_interval = interval
+
+    def start(self):
+        """Arranca el hilo de vigilancia"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='equity-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Error en watchdog de equity: {e}")
+
+    def sample(self):
+        """account_info con el maximo intradia actualizado con cada muestra"""
+        info = self.connector.get_account_info()
+        if not info:
+            return None
+        if self.account_state:
+            with self.account_state._lock:
+                self.account_state.update_high_water_mark(info['equity'])
+                info['high_water_mark'] = self.account_state.high_water_mark
+        if self.recorder:
+            now = time.time()
+            if now - self._last_record >= self.record_interval:
+                self._last_record = now
+                self.recorder.record(self.recorder.from_account(info), timestamp=now)
+        return info
+
+    def check(self, info):
+        """Motivo de bloqueo para una muestra, o None si todo esta en orden"""
+        if self.risk_manager.es_cierre_mercado():
+            return 'friday_close'
+        self.last_drawdown = self.risk_manager.calcular_drawdown(info)
+        if self.last_drawdown is not None and self.last_drawdown > self.risk_manager.max_drawdown_percent:
+            return 'max_drawdown'
+        return None
+
+    def poll(self):
+        """Una comprobacion; devuelve el motivo de bloqueo vigente"""
+        sampled_at = time.perf_counter()
+        info = self.sample()
+        received_at = time.perf_counter()
+        self.polls += 1
+        self.poll_latency.add((received_at - sampled_at) * 1000)
+        if not info:
+            return self.halt_reason  # sin datos: no se cambia el estado
+
+        reason = self.check(info)
+        if reason is None:
+            if self.halt_reason:
+                self.logger.info(f"Bloqueo levantado ({self.halt_reason})")
+                self.risk_manager.halt_reason = None
+            self.last_ok_at = sampled_at
+            return None
+
+        if self.halt_reason is None:
+            self.halt(reason, info, sampled_at, received_at)
+        elif info.get('margin'):
+            self.retry_flatten()
+        else:
+            self.flatten_retries = 0
+        return reason
+
+    def retry_flatten(self):
+        """Vuelve a cerrar posiciones que siguen abiertas durante el bloqueo"""
+        count = mt5.positions_total()
+        now = time.monotonic()
+        if count == self.flattened_count and now < self.next_flatten_at:
+            return False
+        self.risk_manager.cerrar_todas_posiciones()
+        self.flattened_count = mt5.positions_total()
+        delay = min(self.max_retry_backoff, self.retry_backoff * 2 ** self.flatten_retries)
+        self.flatten_retries += 1
+        self.next_flatten_at = now + delay
+        if self.flattened_count:
+            self.logger.warning(f"Quedan {self.flattened_count} posiciones; reintento en {delay:.0f}s")
+        return True
+
+    def halt(self, reason, info, sampled_at, received_at):
+        """Bloquea ordenes, cierra todo y registra la latencia de reaccion"""
+        self.risk_manager.halt_reason = reason
+        decided_at = time.perf_counter()
+        self.risk_manager.cerrar_todas_posiciones()
+        closed_at = time.perf_counter()
+        self.flattened_count = mt5.positions_total()
+        self.flatten_retries = 0
+        self.next_flatten_at = time.monotonic() + self.retry_backoff
+
+        reaction = {
+            'reason': reason,
+            'timestamp': time.time(),
+            'equity': info['equity'],
+            'drawdown_pct': round(self.last_drawdown, 2) if self.last_drawdown is not None else None,
+            # Muestra -> decision de bloquear y muestra -> cierre terminado
+            'detect_ms': round((decided_at - sampled_at) * 1000, 2),
+            'flatten_ms': round((closed_at - sampled_at) * 1000, 2),
+            # Cota del tiempo que el limite pudo estar superado antes de verlo
+            'blind_ms': round((received_at - self.last_ok_at) * 1000, 2) if self.last_ok_at else None,
+        }
+        self.reactions.append(reaction)
+        events.emit(PROTECTION, level=logging.ERROR, source='watchdog', **reaction)
+        return reaction
+
+    def status(self):
+        """Resumen para logs y el informe final"""
+        return {
+            'interval': self.interval,
+            'halt_reason': self.halt_reason,
+            'polls': self.polls,
+            'poll_ms_p50': self.poll_latency.quantile(0.5),
+            'poll_ms_p99': self.poll_latency.quantile(0.99),
+            'last_drawdown_pct': self.last_drawdown,
+            'activations': len(self.reactions),
+            'last_reaction': self.reactions[-1] if self.reactions else None,
+        }
@@ -0,0 +1,130 @@
+# core/event_log.py - REGISTRO ESTRUCTURADO DE EVENTOS (NDJSON ASINCRONO)
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from core.memory_guard import trim_oldest
+
+# Tipos de evento
+CYCLE = 'cycle'
+SIGNAL = 'signal'
+ORDER = 'order'
+FILL = 'fill'
+REJECT = 'reject'
+PROTECTION = 'protection'
+CONNECTION = 'connection'
+MEMORY = 'memory'
+
+# Niveles (mismos valores que logging)
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+
+def parse_level(value, default=INFO):
+    """Nivel numerico a partir de un nombre ('info', 'WARNING') o un entero"""
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).strip().upper())
+    return level if isinstance(level, int) else default
+
+
+class EventLog:
+    """Log de eventos tipados escrito por un hilo de fondo.
+
+    ``emit`` solo filtra por nivel y hace ``deque.append`` (atomico bajo el
+    GIL; solo los eventos muestreados toman un lock), asi que el ciclo de trading nunca espera por disco o
+    consola. El hilo escritor vacia la cola periodicamente en registros JSON
+    compactos, uno por linea. Los mensajes repetitivos pueden muestrearse con
+    ``sample_key``: como mucho uno por intervalo, con el numero de eventos
+    suprimidos en el siguiente registro.
+    """
+
+    def __init__(self, level=INFO, flush_interval=0.2, sample_interval=30.0, max_queue=100000):
+        self.level = level
+        self.flush_interval = flush_interval
+        self.sample_interval = sample_interval
+        self.queue = deque(maxlen=max_queue)
+        self.dropped = 0
+        self.running = False
+
+        self._sampled = {}  # (evento, clave) -> [ultimo_emitido, suprimidos]
+        self._sampled_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self.logger = logging.getLogger('EventLog')
+
+    def start(self, path='events.ndjson', level=None):
+        """Abre el fichero de salida y arranca el hilo escritor"""
+        if self.running:
+            return
+        if level is not None:
+            self.level = parse_level(level)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._stop.clear()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Vacia la cola pendiente y cierra el fichero"""
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._drain()
+        self._file.close()
+
+    def emit(self, event, level=INFO, sample_key=None, **fields):
+        """Encola un evento (no bloquea)"""
+        if not self.running or level < self.level:
+            return
+
+        now = time.time()
+        if sample_key is not None:
+            key = (event, sample_key)
+            with self._sampled_lock:
+                state = self._sampled.get(key)
+                if state and now - state[0] < self.sample_interval:
+                    state[1] += 1
+                    return
+                if state and state[1]:
+                    fields['suppressed'] = state[1]
+                self._sampled[key] = [now, 0]
+
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append((now, event, level, fields))
+
+    def trim_sampled(self, cap):
+        """Olvida las claves de muestreo mas antiguas por encima de ``cap``"""
+        with self._sampled_lock:
+            return trim_oldest(self._sampled, cap)
+
+    def _drain(self):
+        lines = []
+        queue = self.queue
+        while queue:
+            ts, event, level, fields = queue.popleft()
+            record = {'ts': round(ts, 6), 'ev': event, 'lvl': logging.getLevelName(level)}
+            record.update(fields)
+            lines.append(json.dumps(record, separators=(',', ':'), default=str))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._drain()
+            except Exception as e:
+                self.logger.error(f"Error escribiendo eventos: {e}")
+
+
+# Instancia compartida por todos los modulos; inactiva hasta start()
+events = EventLog()
@@ -0,0 +1,177 @@
+# core/execution_analytics.py - CALIDAD DE EJECUCION: SLIPPAGE, LATENCIA Y RECHAZOS
+import json
+import logging
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class QuantileSketch:
+    """Histograma de cubetas fijas para percentiles en streaming.
+
+    Memoria constante por grupo; el error de un percentil es como mucho el
+    ancho de la cubeta. Los valores fuera de rango caen en las cubetas
+    extremas y min/max se guardan exactos.
+    """
+
+    __slots__ = ('edges', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    @classmethod
+    def linear(cls, low, high, bins):
+        return cls(np.linspace(low, high, bins + 1))
+
+    @classmethod
+    def log(cls, low, high, bins):
+        return cls(np.geomspace(low, high, bins + 1))
+
+    def add(self, value):
+        self.counts[np.searchsorted(self.edges, value, side='right')] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Percentil aproximado (interpolado dentro de la cubeta)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, target, side='left'))
+        low = self.edges[i - 1] if i > 0 else self.min
+        high = self.edges[i] if i < len(self.edges) else self.max
+        below = cumulative[i - 1] if i > 0 else 0
+        fraction = (target - below) / self.counts[i] if self.counts[i] else 0.0
+        value = low + (high - low) * fraction
+        return float(min(max(value, self.min), self.max))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class ExecutionStats:
+    """Resumen de un grupo (un simbolo, una estrategia o una hora)"""
+
+    __slots__ = ('orders', 'fills', 'rejects', 'slippage', 'fill_latency', 'decision_latency', 'cost')
+
+    def __init__(self):
+        self.orders = 0
+        self.fills = 0
+        self.rejects = Counter()
+        self.slippage = QuantileSketch.linear(-100.0, 100.0, 400)     # puntos (positivo = en contra)
+        self.fill_latency = QuantileSketch.log(1.0, 60000.0, 200)     # ms de envio a respuesta
+        self.decision_latency = QuantileSketch.log(1.0, 600000.0, 200)  # ms de señal a envio
+        self.cost = 0.0
+
+    def summary(self, quantiles):
+        data = {
+            'orders': self.orders,
+            'fill_rate': self.fills / self.orders if self.orders else None,
+            'reject_rate': sum(self.rejects.values()) / self.orders if self.orders else None,
+            'rejects': dict(self.rejects),
+            'slippage_mean': self.slippage.mean,
+            'slippage_cost': self.cost,
+        }
+        for q in quantiles:
+            label = f"p{int(q * 100)}"
+            data[f'slippage_{label}'] = self.slippage.quantile(q)
+            data[f'fill_ms_{label}'] = self.fill_latency.quantile(q)
+            data[f'decision_ms_{label}'] = self.decision_latency.quantile(q)
+        return data
+
+
+class ExecutionAnalytics:
+    """Registro de calidad de ejecucion por orden con resumenes en streaming.
+
+    Cada orden guarda las marcas de tiempo de señal, envio y respuesta, el
+    precio pedido y el llenado y el retcode. El slippage se mide en puntos
+    con signo (positivo = peor precio que el pedido) y su coste en la divisa
+    de la cuenta. Los resumenes se mantienen por simbolo, por estrategia y
+    por hora del dia (UTC) con memoria constante; el detalle por orden se
+    conserva en un buffer acotado para exportarlo.
+    """
+
+    GROUPS = ('symbol', 'strategy', 'hour')
+
+    def __init__(self, max_records=10000, quantiles=(0.5, 0.9, 0.99)):
+        self.quantiles = quantiles
+        self.records = deque(maxlen=max_records)
+        self.groups = {group: {} for group in self.GROUPS}
+        self.logger = logging.getLogger('ExecutionAnalytics')
+
+    def record(self, symbol, side, volume, requested, filled, retcode, send_time, fill_time,
+               signal_time=None, strategy=None, point=None, contract_size=None, retries=0, done=False):
+        """Registra una orden enviada; ``filled`` es None si no hubo llenado"""
+        slippage = None
+        cost = 0.0
+        if done and filled and requested and point:
+            direction = 1 if side == 'buy' else -1
+            slippage = (filled - requested) * direction / point
+            if contract_size:
+                cost = (filled - requested) * direction * volume * contract_size
+
+        record = {
+            'symbol': symbol,
+            'strategy': strategy,
+            'side': side,
+            'volume': volume,
+            'signal_time': signal_time,
+            'send_time': send_time,
+            'fill_time': fill_time,
+            'requested': requested,
+            'filled': filled,
+            'retcode': retcode,
+            'retries': retries,
+            'slippage_points': slippage,
+        }
+        self.records.append(record)
+
+        keys = {'symbol': symbol, 'strategy': strategy or 'manual', 'hour': time.gmtime(send_time).tm_hour}
+        for group, key in keys.items():
+            stats = self.groups[group].get(key)
+            if stats is None:
+                stats = self.groups[group][key] = ExecutionStats()
+            stats.orders += 1
+            stats.fill_latency.add(max((fill_time - send_time) * 1000, 0.0))
+            if signal_time:
+                stats.decision_latency.add(max((send_time - signal_time) * 1000, 0.0))
+            if done:
+                stats.fills += 1
+                if slippage is not None:
+                    stats.slippage.add(slippage)
+                    stats.cost += cost
+            else:
+                stats.rejects[retcode if retcode is not None else 'sin_respuesta'] += 1
+        return record
+
+    def summary(self, by='symbol', key=None):
+        """Resumen de un grupo (``symbol``, ``strategy`` u ``hour``), o de una clave concreta"""
+        groups = self.groups[by]
+        if key is not None:
+            return groups[key].summary(self.quantiles) if key in groups else None
+        return {name: stats.summary(self.quantiles) for name, stats in sorted(groups.items(), key=lambda kv: str(kv[0]))}
+
+    def report(self):
+        """Todos los resumenes"""
+        return {group: self.summary(group) for group in self.GROUPS}
+
+    def save(self, path, include_records=False):
+        """Guarda los resumenes (y opcionalmente el detalle) en JSON"""
+        data = self.report()
+        if include_records:
+            data['records'] = list(self.records)
+        try:
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
+        except OSError as e:
+            self.logger.error(f"Error guardando analitica de ejecucion: {e}")
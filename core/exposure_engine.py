@@ -0,0 +1,205 @@
+# core/exposure_engine.py - EXPOSICION POR DIVISA Y VaR PRE-TRADE EN MEMORIA
+import MetaTrader5 as mt5
+import numpy as np
+import logging
+import math
+
+
+class ExposureEngine:
+    """Exposicion neta por divisa y covarianza movil de retornos por simbolo.
+
+    Todo el estado vive en memoria: la covarianza se actualiza de forma
+    incremental (EWMA) con cada vector de precios y se cachea Sigma*w, de
+    modo que el chequeo pre-trade solo hace aritmetica escalar (VaR marginal
+    en O(1)) sin llamadas al terminal. Las matrices crecen al registrar mas
+    simbolos de los previstos (modo escaner). Un simbolo sin historial de
+    retornos usa una volatilidad por defecto en lugar de contar como riesgo
+    cero, y uno sin precio conocido no se puede valorar: el chequeo
+    pre-trade lo rechaza.
+    """
+
+    def __init__(self, max_currency_exposure=50000.0, max_var_pct=2.0, z_score=2.33,
+                 decay=0.94, horizon_steps=720, capacity=64, default_daily_vol=0.01):
+        self.max_currency_exposure = max_currency_exposure  # USD por divisa
+        self.max_var_pct = max_var_pct                      # VaR maximo en % de equity
+        self.z_score = z_score                              # 2.33 = 99%
+        self.decay = decay
+        # Pasos de actualizacion por horizonte de VaR (720 ciclos de 2 min = 1 dia)
+        self.horizon_scale = math.sqrt(horizon_steps)
+        # Varianza por paso para simbolos sin covarianza estimada todavia
+        self.default_variance = (default_daily_vol / self.horizon_scale) ** 2
+        self.logger = logging.getLogger('ExposureEngine')
+
+        self.index = {}         # simbolo -> fila en las matrices
+        self.meta = {}          # simbolo -> (base, cotizada, tamano contrato)
+        self.positions = np.zeros(capacity)        # nocional USD con signo
+        self.last_price = np.full(capacity, np.nan)
+        self.cov = np.zeros((capacity, capacity))
+        self.currency = {}      # divisa -> nocional USD con signo
+        self.equity = 0.0
+
+        self._sigma_w = np.zeros(capacity)
+        self._variance = 0.0
+
+    def register_symbol(self, symbol, contract_size=None):
+        """Da de alta un simbolo (puede consultar el terminal; fuera del camino caliente)"""
+        if symbol in self.index:
+            return self.index[symbol]
+        if len(self.index) >= len(self.positions):
+            self._grow(2 * len(self.positions))
+
+        if contract_size is None:
+            try:
+                info = mt5.symbol_info(symbol)
+                contract_size = info.trade_contract_size if info else None
+            except Exception:
+                contract_size = None
+        if not contract_size:
+            contract_size = 100.0 if symbol.startswith('XAU') else 100000.0
+
+        i = self.index[symbol] = len(self.index)
+        self.meta[symbol] = (symbol[:3], symbol[3:6], contract_size)
+        # Precio inicial: sin el, el primer chequeo pre-trade no podria valorar el nocional
+        try:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick and tick.bid and tick.ask:
+                self.last_price[i] = (tick.bid + tick.ask) / 2
+        except Exception:
+            pass
+        return i
+
+    def _grow(self, capacity):
+        """Duplica la capacidad conservando posiciones, precios y covarianza"""
+        n = len(self.positions)
+        positions, last_price = np.zeros(capacity), np.full(capacity, np.nan)
+        cov, sigma_w = np.zeros((capacity, capacity)), np.zeros(capacity)
+        positions[:n], last_price[:n], cov[:n, :n], sigma_w[:n] = \
+            self.positions, self.last_price, self.cov, self._sigma_w
+        self.positions, self.last_price, self.cov, self._sigma_w = positions, last_price, cov, sigma_w
+
+    def set_equity(self, equity):
+        self.equity = equity
+
+    def usd_notional(self, symbol, volume):
+        """Nocional en USD de un volumen en lotes (solo estado en memoria).
+
+        NaN si la base no es USD y el simbolo no tiene precio todavia.
+        """
+        base, quote, contract_size = self.meta.get(
+            symbol, (symbol[:3], symbol[3:6], 100.0 if symbol.startswith('XAU') else 100000.0)
+        )
+        units = volume * contract_size
+        if base == 'USD':
+            return units
+
+        i = self.index.get(symbol)
+        price = self.last_price[i] if i is not None else np.nan
+        if np.isnan(price):
+            return np.nan
+        value = units * price
+        if quote == 'USD':
+            return value
+
+        # Cruce: convertir la divisa cotizada con su par contra USD si lo hay
+        for pair, invert in ((quote + 'USD', False), ('USD' + quote, True)):
+            j = self.index.get(pair)
+            if j is not None and not np.isnan(self.last_price[j]):
+                return value / self.last_price[j] if invert else value * self.last_price[j]
+        return value
+
+    def update_prices(self, prices):
+        """Actualiza la covarianza EWMA con un nuevo vector de precios {simbolo: precio}.
+
+        Solo entran los simbolos con precio en este paso y precio anterior;
+        los que no tienen tick conservan su fila (un retorno 0 sesgaria la
+        covarianza a la baja).
+        """
+        observed, returns = [], []
+        for symbol, price in prices.items():
+            i = self.index.get(symbol)
+            if i is None or not price:
+                continue
+            previous = self.last_price[i]
+            if not np.isnan(previous):
+                observed.append(i)
+                returns.append(math.log(price / previous))
+            self.last_price[i] = price
+
+        if observed:
+            rows = np.ix_(observed, observed)
+            returns = np.array(returns)
+            self.cov[rows] = self.decay * self.cov[rows] + (1 - self.decay) * np.outer(returns, returns)
+        self._refresh_cache()
+
+    def _refresh_cache(self):
+        n = len(self.index)
+        w = self.positions[:n]
+        self._sigma_w[:n] = self.cov[:n, :n] @ w
+        self._variance = float(w @ self._sigma_w[:n])
+
+    def apply_trade(self, symbol, side, volume, price=None):
+        """Suma una operacion al estado (tras un fill, con su precio si se conoce)"""
+        i = self.register_symbol(symbol)
+        if price and np.isnan(self.last_price[i]):
+            self.last_price[i] = price
+        notional = float(self.usd_notional(symbol, volume)) * (1 if side == 'buy' else -1)
+        if math.isnan(notional):
+            self.logger.warning(f"{symbol}: sin precio, operacion fuera de la exposicion")
+            return
+        base, quote, _ = self.meta[symbol]
+
+        self.positions[i] += notional
+        self.currency[base] = self.currency.get(base, 0.0) + notional
+        self.currency[quote] = self.currency.get(quote, 0.0) - notional
+        self._refresh_cache()
+
+    def sync_positions(self, positions):
+        """Reconstruye la exposicion desde las posiciones del terminal"""
+        self.positions[:] = 0.0
+        self.currency = {}
+        for position in positions:
+            side = 'buy' if position.type == mt5.ORDER_TYPE_BUY else 'sell'
+            self.apply_trade(position.symbol, side, position.volume,
+                             price=position.price_current or position.price_open)
+        self._refresh_cache()
+
+    def var(self):
+        """VaR actual de la cartera en USD"""
+        return self.z_score * self.horizon_scale * math.sqrt(max(self._variance, 0.0))
+
+    def check_trade(self, symbol, side, volume):
+        """Chequeo pre-trade: limites por divisa y VaR marginal.
+
+        Devuelve (permitido, detalle). Solo usa estado en memoria.
+        """
+        sign = 1 if side == 'buy' else -1
+        delta = float(self.usd_notional(symbol, volume)) * sign
+        if math.isnan(delta):
+            return False, {'reason': 'no_price', 'symbol': symbol}
+        base, quote = symbol[:3], symbol[3:6]
+
+        # 1. Limite de exposicion neta por divisa (solo si la aumenta)
+        for currency, change in ((base, delta), (quote, -delta)):
+            current = self.currency.get(currency, 0.0)
+            new = current + change
+            if abs(new) > self.max_currency_exposure and abs(new) > abs(current):
+                return False, {'reason': 'currency_cap', 'currency': currency, 'exposure': new}
+
+        # 2. VaR marginal: w'Sw + 2*d*(Sw)_i + d^2*S_ii
+        var_before = self.var()
+        i = self.index.get(symbol)
+        # Sin covarianza estimada (simbolo nuevo o sin registrar): volatilidad por defecto
+        own_variance = self.cov[i, i] if i is not None else 0.0
+        if own_variance <= 0:
+            own_variance = self.default_variance
+        cross = self._sigma_w[i] if i is not None else 0.0
+
+        variance = self._variance + 2 * delta * cross + delta * delta * own_variance
+        var_after = self.z_score * self.horizon_scale * math.sqrt(max(variance, 0.0))
+        marginal = var_after - var_before
+
+        limit = self.equity * self.max_var_pct / 100
+        if self.equity > 0 and marginal > 0 and var_after > limit:
+            return False, {'reason': 'var_cap', 'var': var_after, 'limit': limit, 'marginal_var': marginal}
+
+        return True, {'var': var_after, 'marginal_var': marginal}
@@ -0,0 +1,298 @@
+# core/history_backfill.py - DESCARGA MASIVA Y REANUDABLE DE HISTORICO A UN ALMACEN LOCAL
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import MetaTrader5 as mt5
+import numpy as np
+
+TIMEFRAMES = {
+    'M1': (mt5.TIMEFRAME_M1, 60),
+    'M5': (mt5.TIMEFRAME_M5, 300),
+    'M15': (mt5.TIMEFRAME_M15, 900),
+    'H1': (mt5.TIMEFRAME_H1, 3600),
+    'H4': (mt5.TIMEFRAME_H4, 14400),
+    'D1': (mt5.TIMEFRAME_D1, 86400),
+}
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+
+class BarStore:
+    """Almacen local de barras: un ``.npy`` por simbolo, timeframe y mes.
+
+    Escribir fusiona con lo existente (sin duplicados, ordenado por tiempo) y
+    reemplaza el fichero de forma atomica, asi que repetir una descarga o
+    rellenar un hueco nunca duplica barras.
+    """
+
+    def __init__(self, directory='data/bars'):
+        self.directory = directory
+
+    def partition_path(self, symbol, timeframe, month):
+        return os.path.join(self.directory, symbol, timeframe, f"{month}.npy")
+
+    def write(self, symbol, timeframe, rates):
+        """Fusiona barras en sus particiones mensuales; devuelve barras nuevas"""
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        if len(rates) == 0:
+            return 0
+        months = rates['time'].astype('datetime64[s]').astype('datetime64[M]')
+        added = 0
+        for month in np.unique(months):
+            chunk = rates[months == month]
+            path = self.partition_path(symbol, timeframe, str(month))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existing = np.load(path) if os.path.exists(path) else np.empty(0, RATES_DTYPE)
+
+            merged = np.concatenate((existing, chunk))
+            # Ante duplicados gana la barra descargada mas recientemente
+            _, last = np.unique(merged['time'][::-1], return_index=True)
+            merged = merged[::-1][last]
+            added += len(merged) - len(existing)
+
+            tmp_path = path + '.tmp.npy'
+            np.save(tmp_path, merged)
+            os.replace(tmp_path, path)
+        return added
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        """Barras en [start, end] (epoch en segundos) de las particiones necesarias"""
+        folder = os.path.join(self.directory, symbol, timeframe)
+        if not os.path.isdir(folder):
+            return np.empty(0, RATES_DTYPE)
+        first = str(np.datetime64(int(start), 's').astype('datetime64[M]')) if start is not None else None
+        last = str(np.datetime64(int(end), 's').astype('datetime64[M]')) if end is not None else None
+
+        parts = []
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith('.npy') or name.endswith('.tmp.npy'):
+                continue
+            month = name[:-4]
+            if (first and month < first) or (last and month > last):
+                continue
+            parts.append(np.load(os.path.join(folder, name)))
+        if not parts:
+            return np.empty(0, RATES_DTYPE)
+        bars = np.concatenate(parts)
+        mask = np.ones(len(bars), bool)
+        if start is not None:
+            mask &= bars['time'] >= start
+        if end is not None:
+            mask &= bars['time'] <= end
+        return bars[mask]
+
+
+class RateLimiter:
+    """Token bucket compartido entre hilos para no saturar el terminal"""
+
+    def __init__(self, rate=10.0, burst=5):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HistoryBackfill:
+    """Descarga rangos largos con ``copy_rates_range`` en bloques acotados.
+
+    Cada (simbolo, timeframe) avanza por bloques de ``chunk_bars`` barras y
+    guarda el progreso en un checkpoint JSON tras cada bloque, de modo que
+    una ejecucion interrumpida continua donde quedo. Los bloques fallidos y
+    los huecos internos mayores que ``gap_seconds`` se vuelven a pedir en una
+    pasada de relleno; si el terminal sigue sin datos el hueco se da por
+    bueno (mercado cerrado) y no se reintenta. Varios simbolos se descargan
+    en paralelo con un limite comun de llamadas por segundo.
+    """
+
+    def __init__(self, store=None, checkpoint_path=None, chunk_bars=20000, workers=4,
+                 calls_per_second=10.0, gap_seconds=4 * 86400, max_attempts=3):
+        self.store = store or BarStore()
+        self.checkpoint_path = checkpoint_path or os.path.join(self.store.directory, 'checkpoint.json')
+        self.chunk_bars = chunk_bars
+        self.workers = workers
+        self.limiter = RateLimiter(calls_per_second)
+        self.gap_seconds = gap_seconds
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger('HistoryBackfill')
+
+        self._lock = threading.Lock()
+        self.checkpoint = self.load_checkpoint()
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_checkpoint(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+            tmp_path = self.checkpoint_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.checkpoint, f, indent=1)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def fetch(self, symbol, timeframe, start, end):
+        """Un bloque [start, end) en epoch; None si el terminal fallo"""
+        mt5_timeframe = TIMEFRAMES[timeframe][0]
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            try:
+                rates = mt5.copy_rates_range(symbol, mt5_timeframe,
+                                             datetime.fromtimestamp(start, tz=timezone.utc),
+                                             datetime.fromtimestamp(end - 1, tz=timezone.utc))
+            except Exception as e:
+                self.logger.warning(f"{symbol} {timeframe}: {e}")
+                rates = None
+            if rates is not None:
+                return rates
+            time.sleep(0.5 * 2 ** attempt)
+        self.logger.error(f"{symbol} {timeframe}: sin datos para {start}-{end} ({mt5.last_error()})")
+        return None
+
+    def backfill(self, symbol, timeframe, start, end):
+        """Descarga [start, end) de un simbolo reanudando desde el checkpoint"""
+        key = f"{symbol}/{timeframe}"
+        with self._lock:
+            state = self.checkpoint.get(key)
+            if state is None:
+                # Cobertura descargada: [start, next)
+                state = self.checkpoint[key] = {'start': start, 'next': start,
+                                                'failed': [], 'confirmed_gaps': []}
+
+        # Solo lo que falta: antes del inicio cubierto y despues del ultimo bloque
+        ranges = []
+        if start < state['start']:
+            ranges.append((start, min(state['start'], end), False))
+        if end > state['next']:
+            ranges.append((max(start, state['next']), end, True))
+
+        added = 0
+        for range_start, range_end, advances in ranges:
+            added += self.download(symbol, timeframe, state, range_start, range_end, advances)
+        state['start'] = min(state['start'], start)
+        self.save_checkpoint()
+
+        added += self.fill_gaps(symbol, timeframe, state)
+        return added
+
+    def download(self, symbol, timeframe, state, start, end, advances):
+        """Recorre [start, end) en bloques guardando el checkpoint tras cada uno"""
+        step = self.chunk_bars * TIMEFRAMES[timeframe][1]
+        added = 0
+        cursor = start
+        while cursor < end:
+            chunk_end = min(cursor + step, end)
+            rates = self.fetch(symbol, timeframe, cursor, chunk_end)
+            if rates is None:
+                state['failed'].append([cursor, chunk_end])
+            else:
+                added += self.store.write(symbol, timeframe, rates)
+            cursor = chunk_end
+            if advances:
+                state['next'] = cursor
+            self.save_checkpoint()
+        return added
+
+    def find_gaps(self, symbol, timeframe, state):
+        """Huecos internos del almacen mayores que ``gap_seconds``"""
+        times = self.store.read(symbol, timeframe, state['start'], state['next'])['time']
+        if len(times) < 2:
+            return []
+        bar_seconds = TIMEFRAMES[timeframe][1]
+        gaps = np.flatnonzero(np.diff(times) > self.gap_seconds)
+        confirmed = {tuple(gap) for gap in state['confirmed_gaps']}
+        return [[int(times[i]) + bar_seconds, int(times[i + 1])] for i in gaps
+                if (int(times[i]) + bar_seconds, int(times[i + 1])) not in confirmed]
+
+    def fill_gaps(self, symbol, timeframe, state):
+        """Reintenta bloques fallidos y huecos; confirma los que siguen vacios"""
+        added = 0
+        pending = state['failed'] + self.find_gaps(symbol, timeframe, state)
+        state['failed'] = []
+        for gap_start, gap_end in pending:
+            rates = self.fetch(symbol, timeframe, gap_start, gap_end)
+            if rates is None:
+                state['failed'].append([gap_start, gap_end])
+            elif len(rates) == 0:
+                state['confirmed_gaps'].append([gap_start, gap_end])
+            else:
+                added += self.store.write(symbol, timeframe, rates)
+        if pending:
+            self.save_checkpoint()
+        return added
+
+    def run(self, symbols, timeframes, start, end):
+        """Backfill de todas las combinaciones en paralelo; barras nuevas por clave"""
+        start, end = int(start), int(end)
+        for symbol in symbols:
+            mt5.symbol_select(symbol, True)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.backfill, symbol, timeframe, start, end): f"{symbol}/{timeframe}"
+                       for symbol in symbols for timeframe in timeframes}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                    self.logger.info(f"{key}: {results[key]} barras nuevas")
+                except Exception as e:
+                    self.logger.error(f"{key}: {e}")
+                    results[key] = None
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Descarga historico de MT5 al almacen local')
+    parser.add_argument('--symbols', default='EURUSD,GBPUSD,USDJPY,XAUUSD')
+    parser.add_argument('--timeframes', default='M5,H1')
+    parser.add_argument('--days', type=int, default=365 * 3)
+    parser.add_argument('--store', default='data/bars')
+    parser.add_argument('--chunk-bars', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=10.0, help='llamadas por segundo al terminal')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%H:%M:%S')
+    from core.mt5_connector import MT5Connector
+    if not MT5Connector().connected:
+        print("ERROR: No se pudo conectar a MT5")
+        return
+
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=args.days)
+    backfill = HistoryBackfill(BarStore(args.store), chunk_bars=args.chunk_bars,
+                               workers=args.workers, calls_per_second=args.rate)
+    started = time.perf_counter()
+    results = backfill.run(args.symbols.split(','), args.timeframes.split(','),
+                           start.timestamp(), end.timestamp())
+    print(f"✅ Backfill completado en {time.perf_counter() - started:.1f}s: "
+          f"{sum(v or 0 for v in results.values())} barras nuevas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# core/market_depth.py - LIBRO DE ORDENES (DOM) EN MEMORIA Y COSTE DE BARRIDO PRE-TRADE
+import gzip
+import logging
+import pickle
+import time
+from collections import deque
+
+import MetaTrader5 as mt5
+import numpy as np
+
+# Tipos de entrada de market_book_get (BOOK_TYPE_*)
+BOOK_SELL, BOOK_BUY, BOOK_SELL_MARKET, BOOK_BUY_MARKET = 1, 2, 3, 4
+
+
+class OrderBook:
+    """Libro de un simbolo en arrays de niveles de precio (mejor nivel primero).
+
+    Cada snapshot de ``market_book_get`` se compara nivel a nivel con el
+    estado actual y solo se reescriben los lados que cambian; al cambiar se
+    recalculan los acumulados de volumen y nocional, asi que el mejor precio
+    es O(1) y el coste de barrer un volumen es una busqueda en un array de
+    ``depth`` niveles, sin recorrer entradas ni reservar memoria.
+    """
+
+    def __init__(self, symbol, depth=20):
+        self.symbol = symbol
+        self.depth = depth
+        # Lado 0 = bids (compras, precio descendente), 1 = asks (ventas, ascendente)
+        self.prices = np.full((2, depth), np.nan)
+        self.volumes = np.zeros((2, depth))
+        self.levels = np.zeros(2, dtype=np.int64)
+        self.cum_volume = np.zeros((2, depth))
+        self.cum_notional = np.zeros((2, depth))
+
+        self.updated_at = 0.0
+        self.updates = 0
+        self.changed_levels = 0
+
+    def apply(self, entries):
+        """Aplica un snapshot; devuelve cuantos niveles cambiaron"""
+        if not entries:
+            return 0
+        book = np.array([(entry.type, entry.price, getattr(entry, 'volume_dbl', entry.volume))
+                         for entry in entries], dtype=float)
+        kinds, prices, volumes = book[:, 0], book[:, 1], book[:, 2]
+
+        changed = 0
+        for side, kind_mask, order in ((0, (kinds == BOOK_BUY) | (kinds == BOOK_BUY_MARKET), -1),
+                                       (1, (kinds == BOOK_SELL) | (kinds == BOOK_SELL_MARKET), 1)):
+            side_prices, side_volumes = prices[kind_mask], volumes[kind_mask]
+            ranking = np.argsort(order * side_prices, kind='stable')[:self.depth]
+            side_prices, side_volumes = side_prices[ranking], side_volumes[ranking]
+            count = len(side_prices)
+
+            current = slice(0, count)
+            diff = int(np.count_nonzero((self.prices[side, current] != side_prices)
+                                        | (self.volumes[side, current] != side_volumes)))
+            diff += max(0, int(self.levels[side]) - count)  # niveles que desaparecen
+            if not diff:
+                continue
+
+            changed += diff
+            self.prices[side, :count] = side_prices
+            self.volumes[side, :count] = side_volumes
+            self.prices[side, count:] = np.nan
+            self.volumes[side, count:] = 0.0
+            self.levels[side] = count
+            np.cumsum(self.volumes[side], out=self.cum_volume[side])
+            np.cumsum(np.nan_to_num(self.prices[side]) * self.volumes[side], out=self.cum_notional[side])
+
+        self.updated_at = time.monotonic()
+        self.updates += 1
+        self.changed_levels += changed
+        return changed
+
+    def top(self):
+        """(bid, volumen bid, ask, volumen ask) del mejor nivel"""
+        return (float(self.prices[0, 0]), float(self.volumes[0, 0]),
+                float(self.prices[1, 0]), float(self.volumes[1, 0]))
+
+    def sweep(self, side, volume):
+        """Precio medio de barrer ``volume`` lotes contra el libro.
+
+        ``side`` es el lado de la orden: una compra consume asks y una venta
+        bids. Devuelve el precio medio, el peor nivel tocado, la distancia al
+        mejor precio y el volumen que el libro visible no cubre.
+        """
+        book_side = 1 if side == 'buy' else 0
+        levels = int(self.levels[book_side])
+        if not levels:
+            return None
+        cum_volume = self.cum_volume[book_side, :levels]
+        cum_notional = self.cum_notional[book_side, :levels]
+        prices = self.prices[book_side, :levels]
+
+        filled = min(volume, float(cum_volume[-1]))
+        i = int(np.searchsorted(cum_volume, filled, side='left'))
+        i = min(i, levels - 1)
+        before_volume = cum_volume[i - 1] if i else 0.0
+        before_notional = cum_notional[i - 1] if i else 0.0
+        notional = before_notional + (filled - before_volume) * prices[i]
+
+        average = notional / filled if filled else float(prices[0])
+        return {
+            'average': float(average),
+            'worst': float(prices[i]),
+            'best': float(prices[0]),
+            'impact': float(abs(average - prices[0])),
+            'levels': i + 1,
+            'unfilled': float(volume - filled),
+        }
+
+
+class MarketDepth:
+    """Suscripcion al DOM de varios simbolos y chequeo pre-trade de liquidez.
+
+    ``source`` es la funcion que devuelve el snapshot (por defecto
+    ``market_book_get``); con ``RecordedBookFeed`` se usa un libro grabado.
+    Un simbolo sin suscripcion (terminal caido al arrancar o broker sin
+    profundidad) se reintenta cada ``retry_interval`` segundos desde
+    ``refresh``; mientras tanto el chequeo lo deja pasar. Tras una reconexion
+    del ``supervisor`` se vuelven a suscribir todos, porque el terminal
+    olvida las suscripciones.
+    """
+
+    def __init__(self, symbols, depth=20, max_impact_points=30.0, max_age=2.0, source=None,
+                 retry_interval=30.0, supervisor=None):
+        self.depth = depth
+        self.max_impact_points = max_impact_points
+        self.max_age = max_age
+        self.source = source
+        self.retry_interval = retry_interval
+        self.supervisor = supervisor
+        self.books = {}
+        self.missing = {}  # simbolo -> instante del proximo intento de suscripcion
+        self.rejected = 0
+        self.logger = logging.getLogger('MarketDepth')
+        self._recoveries = supervisor.recoveries if supervisor else 0
+        for symbol in symbols:
+            self.subscribe(symbol)
+
+    def subscribe(self, symbol):
+        if self.source is None and not mt5.market_book_add(symbol):
+            if symbol not in self.missing:
+                self.logger.warning(f"{symbol}: sin profundidad de mercado ({mt5.last_error()}); "
+                                    f"reintento cada {self.retry_interval:.0f}s")
+            self.missing[symbol] = time.monotonic() + self.retry_interval
+            return False
+        self.missing.pop(symbol, None)
+        self.books.setdefault(symbol, OrderBook(symbol, self.depth))
+        return True
+
+    def ensure_subscribed(self, symbol):
+        """Reintenta suscripciones pendientes y rehace todas tras una reconexion"""
+        if self.supervisor and self.supervisor.recoveries != self._recoveries:
+            self._recoveries = self.supervisor.recoveries
+            for name in [*self.books, *self.missing]:
+                self.subscribe(name)
+        elif symbol in self.missing and time.monotonic() >= self.missing[symbol]:
+            self.subscribe(symbol)
+
+    def refresh(self, symbol):
+        """Lee el snapshot del terminal y actualiza el libro"""
+        self.ensure_subscribed(symbol)
+        book = self.books.get(symbol)
+        if book is None:
+            return None
+        entries = (self.source or mt5.market_book_get)(symbol)
+        if entries:
+            book.apply(entries)
+        return book
+
+    def check(self, symbol, side, volume, point):
+        """(permitido, detalle) para una orden a mercado de ``volume`` lotes"""
+        book = self.refresh(symbol)
+        if book is None or time.monotonic() - book.updated_at > self.max_age:
+            return True, None  # sin libro fiable: no se bloquea
+        estimate = book.sweep(side, volume)
+        if estimate is None:
+            return True, None
+        estimate['impact_points'] = estimate['impact'] / point if point else 0.0
+
+        if estimate['unfilled'] > 0:
+            reason = f"liquidez insuficiente ({estimate['unfilled']:.2f} lotes sin cubrir)"
+        elif estimate['impact_points'] > self.max_impact_points:
+            reason = f"coste de barrido {estimate['impact_points']:.1f} pts"
+        else:
+            return True, estimate
+        self.rejected += 1
+        estimate['reason'] = reason
+        return False, estimate
+
+    def close(self):
+        if self.source is None:
+            for symbol in self.books:
+                mt5.market_book_release(symbol)
+        self.books.clear()
+
+
+class RecordedBookFeed:
+    """Sustituto de ``market_book_get`` a partir de una grabacion del terminal.
+
+    Lee las respuestas de ``market_book_get`` de un log de
+    ``terminal_recorder`` y las sirve en orden por simbolo, volviendo al
+    principio al agotarse, para probar el libro sin un broker con DOM.
+    """
+
+    def __init__(self, path):
+        from core.terminal_recorder import _thaw
+        self.snapshots = {}
+        with gzip.open(path, 'rb') as f:
+            pickle.load(f)  # cabecera
+            while True:
+                try:
+                    record = pickle.load(f)  # v1 y v2 terminan en (name, args, kwargs, result)
+                except EOFError:
+                    break
+                name, args, result = record[-4], record[-3], record[-1]
+                if name == 'market_book_get' and args and result:
+                    self.snapshots.setdefault(args[0], deque()).append(_thaw(result))
+
+    def __call__(self, symbol):
+        snapshots = self.snapshots.get(symbol)
+        if not snapshots:
+            return None
+        snapshots.rotate(-1)
+        return snapshots[-1]
@@ -0,0 +1,154 @@
+# core/memory_guard.py - CONTABILIDAD DE MEMORIA Y LIMITES PARA SESIONES LARGAS
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # En requirements.txt; sin psutil el RSS solo se lee de /proc (Linux)
+    psutil = None
+
+
+def deep_sizeof(obj, seen=None, depth=0, max_depth=6):
+    """Tamaño aproximado en bytes de un objeto y su contenido"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or depth > max_depth:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj)  # Incluye los datos si el array es propietario
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):  # DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen, depth + 1) + deep_sizeof(v, seen, depth + 1)
+                    for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen, depth + 1) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += deep_sizeof(vars(obj), seen, depth + 1)
+    return size
+
+
+def trim_oldest(container, cap):
+    """Expulsa los elementos mas antiguos de una lista o dict hasta ``cap``"""
+    excess = len(container) - cap
+    if excess <= 0:
+        return 0
+    if isinstance(container, list):
+        del container[:excess]
+    elif isinstance(container, dict):
+        for key in list(container)[:excess]:
+            del container[key]
+    elif isinstance(container, deque):
+        for _ in range(excess):
+            container.popleft()
+    return excess
+
+
+class MemoryGuard:
+    """Cuenta bytes por subsistema y aplica limites a buffers e historiales.
+
+    Cada subsistema se registra con una funcion que devuelve el objeto a
+    medir y, opcionalmente, un limite de elementos y una funcion de expulsion
+    o compactacion. ``check`` aplica los limites, mide y guarda la RSS; con el
+    trazado activo, ``snapshot_diff`` devuelve las lineas que mas crecieron
+    desde la ultima instantanea de tracemalloc.
+    """
+
+    def __init__(self, history=1000):
+        self.subsystems = {}
+        self.rss_history = deque(maxlen=history)
+        self.evictions = {}
+        self.last_snapshot = None
+        self.logger = logging.getLogger('MemoryGuard')
+
+    def register(self, name, getter, cap=None, evict=None):
+        """Registra un subsistema; ``evict(obj, cap)`` devuelve elementos expulsados"""
+        self.subsystems[name] = (getter, cap, evict or trim_oldest)
+
+    def enforce(self):
+        """Aplica los limites configurados"""
+        evicted = {}
+        for name, (getter, cap, evict) in self.subsystems.items():
+            if cap is None:
+                continue
+            try:
+                removed = evict(getter(), cap)
+            except Exception as e:
+                self.logger.error(f"Error aplicando limite a {name}: {e}")
+                continue
+            if removed:
+                evicted[name] = removed
+                self.evictions[name] = self.evictions.get(name, 0) + removed
+        return evicted
+
+    def report(self):
+        """Bytes por subsistema"""
+        sizes = {}
+        for name, (getter, _, _) in self.subsystems.items():
+            try:
+                sizes[name] = deep_sizeof(getter())
+            except Exception:
+                sizes[name] = None
+        return sizes
+
+    @staticmethod
+    def rss_bytes():
+        """Memoria residente del proceso (None si no se puede leer)"""
+        if psutil:
+            return psutil.Process().memory_info().rss
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def check(self):
+        """Aplica limites y devuelve el estado de memoria"""
+        evicted = self.enforce()
+        gc.collect()
+        rss = self.rss_bytes()
+        if rss:
+            self.rss_history.append(rss)
+        return {
+            'rss': rss,
+            'rss_growth': (self.rss_history[-1] - self.rss_history[0]) if len(self.rss_history) > 1 else 0,
+            'subsystems': self.report(),
+            'evicted': evicted,
+        }
+
+    def start_tracing(self, frames=10):
+        """Activa tracemalloc y toma la instantanea de referencia"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.last_snapshot = self.take_snapshot()
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self.last_snapshot = None
+
+    @staticmethod
+    def take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+    def snapshot_diff(self, top=15):
+        """Lineas con mayor crecimiento desde la instantanea anterior"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = self.take_snapshot()
+        previous, self.last_snapshot = self.last_snapshot, snapshot
+        if previous is None:
+            return []
+        return [str(stat) for stat in snapshot.compare_to(previous, 'lineno')[:top]]
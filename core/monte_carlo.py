@@ -0,0 +1,66 @@
+# core/monte_carlo.py - MONTE CARLO DE DRAWDOWN CON BLOCK BOOTSTRAP
+import numpy as np
+
+
+def block_bootstrap(pnl, n_paths, n_trades, block_size, rng):
+    """Remuestrea secuencias de trades por bloques circulares.
+
+    Copiar bloques consecutivos conserva la correlacion serial (rachas) que
+    un bootstrap trade a trade destruiria.
+    """
+    n_blocks = -(-n_trades // block_size)
+    starts = rng.integers(0, len(pnl), size=(n_paths, n_blocks), dtype=np.int32)
+    idx = (starts[:, :, None] + np.arange(block_size, dtype=np.int32)) % len(pnl)
+    return pnl[idx.reshape(n_paths, -1)[:, :n_trades]]
+
+
+def drawdown_stats(paths, initial_equity):
+    """Drawdown maximo (%) y mayor tiempo bajo el agua (trades) por camino"""
+    n_paths, n_trades = paths.shape
+    equity = np.empty((n_paths, n_trades + 1))
+    equity[:, 0] = initial_equity
+    np.cumsum(paths, axis=1, out=equity[:, 1:])
+    equity[:, 1:] += initial_equity
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_dd = ((peak - equity) / peak).max(axis=1) * 100
+
+    # Indice del ultimo maximo alcanzado; la distancia es el tiempo bajo el agua
+    steps = np.arange(n_trades + 1)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, steps, 0), axis=1)
+    recovery = (steps - last_peak).max(axis=1)
+    return max_dd, recovery
+
+
+def simulate_drawdowns(pnl, initial_equity, n_paths=100000, n_trades=1000,
+                       block_size=5, kill_limit_pct=10.0, chunk_size=10000, seed=None):
+    """Distribucion de drawdown maximo, tiempo de recuperacion y ruina.
+
+    ``pnl`` es el P&L por trade en moneda de la cuenta. Los caminos se
+    procesan en bloques de ``chunk_size`` para acotar la memoria.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if len(pnl) < 2:
+        return None
+
+    rng = np.random.default_rng(seed)
+    block_size = max(1, min(block_size, len(pnl)))
+    max_dd = np.empty(n_paths)
+    recovery = np.empty(n_paths, dtype=np.int64)
+
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        paths = block_bootstrap(pnl, stop - start, n_trades, block_size, rng)
+        max_dd[start:stop], recovery[start:stop] = drawdown_stats(paths, initial_equity)
+
+    percentiles = [50, 90, 95, 99]
+    return {
+        'paths': n_paths,
+        'trades_per_path': n_trades,
+        'block_size': block_size,
+        'max_drawdown_pct': dict(zip(percentiles, np.percentile(max_dd, percentiles).round(2).tolist())),
+        'recovery_trades': dict(zip(percentiles, np.percentile(recovery, percentiles).tolist())),
+        'kill_limit_pct': kill_limit_pct,
+        'prob_kill_limit': float((max_dd >= kill_limit_pct).mean()),
+        'max_drawdown_samples': max_dd,
+    }
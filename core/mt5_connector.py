@@ -5,23 +5,31 @@ import time
 import logging
 import os
 from dotenv import load_dotenv
+from core.order_executor import OrderExecutor
+from core.execution_analytics import ExecutionAnalytics
+from core.deal_sync import magic_for, comment_for
+from core.event_log import events, ORDER
 
 load_dotenv()
 
 class MT5Connector:
     def __init__(self):
         self.connected = False
+        self.supervisor = None  # ConnectionSupervisor opcional
+        self.watchdog = None    # EquityWatchdog opcional
+        self.depth = None       # MarketDepth opcional (chequeo de liquidez pre-trade)
+        self.executor = OrderExecutor(deviation=50)
+        self.analytics = ExecutionAnalytics()  # slippage, latencia y rechazos por orden
         self.logger = logging.getLogger('MT5Connector')
         self.connect()
 
-    def connect(self):
+    def connect(self, max_retries=3, retry_delay=2):
         """Conecta a MT5 con credenciales y reintentos"""
-        max_retries = 3
         for attempt in range(max_retries):
             try:
                 if not mt5.initialize():
                     print(f"Error inicializando MT5 (intento {attempt + 1})")
-                    time.sleep(2)
+                    time.sleep(retry_delay)
                     continue
 
                 # Credenciales desde .env
@@ -45,11 +53,11 @@ class MT5Connector:
                     return True
                 else:
                     print(f"Error en login MT5 (intento {attempt + 1})")
-                    time.sleep(2)
+                    time.sleep(retry_delay)
                     
             except Exception as e:
                 print(f"Error conectando MT5 (intento {attempt + 1}): {e}")
-                time.sleep(2)
+                time.sleep(retry_delay)
         
         print("No se pudo conectar a MT5 despues de varios intentos")
         return False
@@ -60,7 +68,9 @@ class MT5Connector:
             return None
             
         try:
+            started = time.perf_counter()
             account_info = mt5.account_info()
+            self.record_call('account_info', started, account_info is not None)
             if account_info:
                 return {
                     'balance': account_info.balance,
@@ -75,6 +85,11 @@ class MT5Connector:
             print(f"Error obteniendo info cuenta: {e}")
             return None
 
+    def record_call(self, name, started, ok):
+        """Informa latencia y resultado de una llamada al supervisor"""
+        if self.supervisor:
+            self.supervisor.record_call(name, time.perf_counter() - started, ok)
+
     def get_error_description(self, retcode):
         """Describe errores de MT5 de forma mas clara"""
         error_messages = {
@@ -107,10 +122,17 @@ class MT5Connector:
         }
         return error_messages.get(retcode, f"Error desconocido: {retcode}")
 
-    def execute_order(self, symbol, order_type, volume, stop_loss=0, take_profit=0):
+    def execute_order(self, symbol, order_type, volume, stop_loss=0, take_profit=0,
+                      strategy=None, signal_time=None):
         """Ejecuta orden de trading con manejo robusto de errores"""
         if not self.connected:
             return {'success': False, 'error': 'No conectado a MT5'}
+
+        if self.supervisor and not self.supervisor.allow_orders():
+            return {'success': False, 'error': 'Ordenes pausadas - conexion en recuperacion'}
+
+        if self.watchdog and not self.watchdog.allow_orders():
+            return {'success': False, 'error': f'Ordenes bloqueadas por el watchdog ({self.watchdog.halt_reason})'}
             
         try:
             # Obtener precio actual y info del simbolo
@@ -145,6 +167,12 @@ class MT5Connector:
                 elif order_type == 'sell' and take_profit >= price:
                     return {'success': False, 'error': 'Take Profit debe estar POR DEBAJO del precio actual para VENTAS'}
 
+            # Liquidez visible en el DOM: rechazar si barrer el volumen sale caro
+            if self.depth:
+                allowed, depth_detail = self.depth.check(symbol, order_type, volume, symbol_info.point)
+                if not allowed:
+                    return {'success': False, 'error': f"Libro de ordenes: {depth_detail['reason']}"}
+
             # Preparar orden con parametros optimizados
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -152,35 +180,53 @@ class MT5Connector:
                 "volume": round(volume, 2),  # Redondear a 2 decimales
                 "type": mt5.ORDER_TYPE_BUY if order_type == 'buy' else mt5.ORDER_TYPE_SELL,
                 "price": price,
-                "deviation": 50,  # Aumentado para evitar requotes
-                "magic": 234000,  # Magic number unico
-                "comment": "NextiaBot-Pro",
+                "magic": magic_for(strategy),  # Magic number por estrategia (DealSync)
+                "comment": comment_for(strategy),
                 "sl": stop_loss,
                 "tp": take_profit,
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,  # Mejor ejecucion
             }
 
-            # Enviar orden
-            result = mt5.order_send(request)
+            # Enviar orden (relleno autodetectado y reintento por recotizacion)
+            started = time.perf_counter()
+            send_time = time.time()
+            result, retries = self.executor.send(request)
+            self.record_call('order_send', started, result is not None)
+            done = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+            self.analytics.record(
+                symbol, order_type, volume, requested=price,
+                filled=result.price if done else None,
+                retcode=result.retcode if result is not None else None,
+                send_time=send_time, fill_time=time.time(), signal_time=signal_time,
+                strategy=strategy, point=symbol_info.point,
+                contract_size=symbol_info.trade_contract_size, retries=retries, done=done
+            )
+            if result is None:
+                return {'success': False, 'error': f'Sin respuesta del terminal para {symbol}'}
             
             if result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"Orden ejecutada: {symbol} {order_type} {volume} lots")
+                events.emit(ORDER, symbol=symbol, side=order_type, volume=volume,
+                            requested=price, price=result.price, retcode=result.retcode,
+                            retries=retries)
                 return {
                     'success': True,
                     'order_id': result.order,
                     'price': result.price,
                     'volume': result.volume,
                     'sl': stop_loss,
-                    'tp': take_profit
+                    'tp': take_profit,
+                    'retries': retries
                 }
             else:
                 error_description = self.get_error_description(result.retcode)
-                print(f"Error en orden {symbol}: {error_description}")
+                events.emit(ORDER, level=logging.WARNING, symbol=symbol, side=order_type,
+                            volume=volume, requested=price, retcode=result.retcode,
+                            retries=retries, error=error_description)
                 return {
                     'success': False,
                     'error': f"{error_description} (Codigo: {result.retcode})",
-                    'retcode': result.retcode
+                    'retcode': result.retcode,
+                    'retries': retries
                 }
                 
         except Exception as e:
@@ -229,10 +275,8 @@ class MT5Connector:
             # Determinar tipo de orden de cierre
             if position.type == mt5.ORDER_TYPE_BUY:
                 close_type = mt5.ORDER_TYPE_SELL
-                price = mt5.symbol_info_tick(symbol).bid
             else:
                 close_type = mt5.ORDER_TYPE_BUY
-                price = mt5.symbol_info_tick(symbol).ask
 
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -240,19 +284,19 @@ class MT5Connector:
                 "symbol": symbol,
                 "volume": volume,
                 "type": close_type,
-                "price": price,
                 "deviation": 20,
                 "magic": 234000,
                 "comment": "NextiaBot-Close",
                 "type_time": mt5.ORDER_TIME_GTC,
             }
 
-            result = mt5.order_send(request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
+            result, _ = self.executor.send(request)
+            if result and result.retcode == mt5.TRADE_RETCODE_DONE:
                 print(f"Posicion cerrada: {symbol} (Ticket: {ticket})")
                 return True
             else:
-                print(f"Error cerrando posicion {ticket}: {result.retcode}")
+                retcode = result.retcode if result else 'sin respuesta'
+                print(f"Error cerrando posicion {ticket}: {retcode}")
                 return False
                 
         except Exception as e:
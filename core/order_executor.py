@@ -0,0 +1,137 @@
+# core/order_executor.py - ENVIO DE ORDENES CON RELLENO AUTODETECTADO Y RECOTIZACION
+import MetaTrader5 as mt5
+import logging
+import time
+
+# Bits de symbol_info.filling_mode
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+
+class OrderExecutor:
+    """Capa de envio comun para aperturas y cierres a mercado.
+
+    Detecta los modos de relleno permitidos por simbolo a partir de
+    ``symbol_info.filling_mode`` y los cachea. Ante recotizacion o cambio de
+    precio vuelve a cotizar con un tick fresco dentro de un presupuesto de
+    reintentos, y registra latencia y reintentos para medir la tasa de relleno.
+    """
+
+    def __init__(self, max_retries=3, deviation=50):
+        self.max_retries = max_retries
+        self.deviation = deviation
+        self.logger = logging.getLogger('OrderExecutor')
+
+        self.filling_cache = {}
+        self.retry_retcodes = {
+            mt5.TRADE_RETCODE_REQUOTE,
+            mt5.TRADE_RETCODE_PRICE_CHANGED,
+            mt5.TRADE_RETCODE_PRICE_OFF
+        }
+        self.stats = {}
+
+    def filling_modes(self, symbol):
+        """Modos de relleno del simbolo en orden de preferencia (cacheados)"""
+        if symbol in self.filling_cache:
+            return self.filling_cache[symbol]
+
+        modes = []
+        info = mt5.symbol_info(symbol)
+        if info:
+            if info.filling_mode & SYMBOL_FILLING_IOC:
+                modes.append(mt5.ORDER_FILLING_IOC)
+            if info.filling_mode & SYMBOL_FILLING_FOK:
+                modes.append(mt5.ORDER_FILLING_FOK)
+        # RETURN siempre como ultimo recurso (ejecucion por bolsa/instantanea)
+        modes.append(mt5.ORDER_FILLING_RETURN)
+
+        self.filling_cache[symbol] = modes
+        return modes
+
+    def current_price(self, symbol, order_type):
+        """Precio fresco del lado correcto del libro"""
+        tick = mt5.symbol_info_tick(symbol)
+        if not tick:
+            return None
+        return tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+
+    def send(self, request):
+        """Envia una orden a mercado con reintentos acotados.
+
+        Devuelve (result, retries). ``result`` es el ultimo OrderSendResult o
+        None si el terminal no respondio.
+        """
+        symbol = request['symbol']
+        request = dict(request)
+        request.setdefault('deviation', self.deviation)
+
+        modes = list(self.filling_modes(symbol))
+        request['type_filling'] = modes[0]
+
+        if not request.get('price'):
+            request['price'] = self.current_price(symbol, request['type'])
+
+        retries = 0
+        started = time.perf_counter()
+        while True:
+            result = mt5.order_send(request)
+            if result is None or result.retcode == mt5.TRADE_RETCODE_DONE:
+                break
+
+            if result.retcode == mt5.TRADE_RETCODE_INVALID_FILL and len(modes) > 1:
+                # El broker no acepta este modo: probar el siguiente y recordarlo
+                modes.pop(0)
+                self.filling_cache[symbol] = modes
+                request['type_filling'] = modes[0]
+                self.record(symbol, 'filling_fallbacks')
+                continue
+
+            if result.retcode in self.retry_retcodes and retries < self.max_retries:
+                price = self.current_price(symbol, request['type'])
+                if price is None:
+                    break
+                retries += 1
+                request['price'] = price
+                continue
+
+            break
+
+        latency = time.perf_counter() - started
+        filled = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+        self.record(symbol, 'orders')
+        self.record(symbol, 'retries', retries)
+        self.record(symbol, 'latency_total', latency)
+        if filled:
+            self.record(symbol, 'filled')
+            if retries:
+                self.record(symbol, 'filled_after_retry')
+        return result, retries
+
+    def record(self, symbol, key, value=1):
+        """Acumula contadores por simbolo"""
+        stats = self.stats.setdefault(symbol, {
+            'orders': 0,
+            'filled': 0,
+            'filled_after_retry': 0,
+            'retries': 0,
+            'filling_fallbacks': 0,
+            'latency_total': 0.0
+        })
+        stats[key] += value
+
+    def fill_report(self):
+        """Tasa de relleno efectiva, reintentos y latencia media por simbolo"""
+        report = {}
+        for symbol, stats in self.stats.items():
+            orders = stats['orders']
+            if not orders:
+                continue
+            report[symbol] = {
+                'orders': orders,
+                'fill_rate': stats['filled'] / orders,
+                'saved_by_retry': stats['filled_after_retry'],
+                'avg_retries': stats['retries'] / orders,
+                'avg_latency_ms': stats['latency_total'] / orders * 1000,
+                'filling_fallbacks': stats['filling_fallbacks']
+            }
+        return report
@@ -1,20 +1,27 @@
 import MetaTrader5 as mt5
 import logging
 from datetime import datetime
+from core.order_executor import OrderExecutor
 
 class OrderManager:
-    def __init__(self, risk_per_trade=0.02):
+    def __init__(self, risk_per_trade=0.02, executor=None, account_state=None):
         self.risk_per_trade = risk_per_trade
+        self.account_state = account_state
+        self.executor = executor or OrderExecutor(deviation=20)
         self.logger = logging.getLogger()
     
     def calculate_position_size(self, symbol, stop_loss_pips):
         """Calcular tamaño de posición basado en riesgo"""
         try:
-            account_info = mt5.account_info()
-            if not account_info:
+            if self.account_state:
+                account_info = self.account_state.get()
+                balance = account_info['balance'] if account_info else None
+            else:
+                account_info = mt5.account_info()
+                balance = account_info.balance if account_info else None
+            if not balance:
                 return 0.01  # Tamaño mínimo
             
-            balance = account_info.balance
             risk_amount = balance * self.risk_per_trade
             
             # Obtener información del símbolo
@@ -47,32 +54,29 @@ class OrderManager:
             # Definir tipo de orden
             if order_type.upper() == "BUY":
                 order_type_mt5 = mt5.ORDER_TYPE_BUY
-                price = mt5.symbol_info_tick(symbol).ask
             else:
                 order_type_mt5 = mt5.ORDER_TYPE_SELL
-                price = mt5.symbol_info_tick(symbol).bid
             
-            # Preparar la orden
+            # Preparar la orden (precio y relleno los pone el executor)
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
                 "symbol": symbol,
                 "volume": volume,
                 "type": order_type_mt5,
-                "price": price,
                 "sl": stop_loss,
                 "tp": take_profit,
                 "deviation": 20,
                 "magic": 2025,  # Magic number para identificar nuestras órdenes
                 "comment": f"NEXTIA-{comment}",
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
             }
             
             # Enviar orden
-            result = mt5.order_send(request)
+            result, retries = self.executor.send(request)
             
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                self.logger.error(f"❌ Error orden {symbol}: {result.retcode}")
+            if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
+                retcode = result.retcode if result else 'sin respuesta'
+                self.logger.error(f"❌ Error orden {symbol}: {retcode} (reintentos: {retries})")
                 return False
             else:
                 self.logger.info(f"✅ Orden ejecutada: {order_type} {volume} {symbol} - SL: {stop_loss}, TP: {take_profit}")
@@ -96,10 +100,8 @@ class OrderManager:
             # Determinar tipo de orden de cierre
             if position.type == mt5.ORDER_TYPE_BUY:
                 close_type = mt5.ORDER_TYPE_SELL
-                price = mt5.symbol_info_tick(symbol).bid
             else:
                 close_type = mt5.ORDER_TYPE_BUY
-                price = mt5.symbol_info_tick(symbol).ask
             
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -107,15 +109,14 @@ class OrderManager:
                 "symbol": symbol,
                 "volume": volume,
                 "type": close_type,
-                "price": price,
                 "deviation": 20,
                 "magic": 2025,
                 "comment": "NEXTIA-CLOSE",
                 "type_time": mt5.ORDER_TIME_GTC,
             }
             
-            result = mt5.order_send(request)
-            return result.retcode == mt5.TRADE_RETCODE_DONE
+            result, _ = self.executor.send(request)
+            return bool(result) and result.retcode == mt5.TRADE_RETCODE_DONE
             
         except Exception as e:
             self.logger.error(f"❌ Error cerrando posición: {e}")
@@ -1,12 +1,17 @@
 # core/performance_tracker.py
 import pandas as pd
+import numpy as np
 import json
 from datetime import datetime, timedelta
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
+from core.monte_carlo import simulate_drawdowns
+from core.trade_types import TradeBatch
 
 class PerformanceTracker:
-    def __init__(self):
+    def __init__(self, max_trade_history: int = 5000):
+        # Historial por estrategia acotado; los agregados conservan todo
+        self.max_trade_history = max_trade_history
         self.metrics = {
             'daily_stats': {},
             'weekly_stats': {},
@@ -48,7 +53,8 @@ class PerformanceTracker:
                 'total_trades': 0,
                 'winning_trades': 0,
                 'total_pnl': 0.0,
-                'trade_history': []
+                'compacted_trades': 0,
+                'trade_history': TradeBatch()
             }
         
         strategy_metrics = self.metrics['strategy_performance'][strategy_name]
@@ -58,12 +64,30 @@ class PerformanceTracker:
         if trade_result['pnl'] > 0:
             strategy_metrics['winning_trades'] += 1
             
-        strategy_metrics['trade_history'].append({
-            'timestamp': datetime.now(),
-            'symbol': trade_result['symbol'],
-            'pnl': trade_result['pnl'],
-            'type': trade_result['type']
-        })
+        history = strategy_metrics['trade_history']
+        history.append(trade_result['symbol'], trade_result['type'], trade_result['pnl'])
+        strategy_metrics['compacted_trades'] += history.trim(self.max_trade_history)
+
+    def get_trade_pnls(self, strategy_name: Optional[str] = None) -> np.ndarray:
+        """P&L por trade de una estrategia (o de todas, en orden temporal)"""
+        performance = self.metrics['strategy_performance']
+        names = [strategy_name] if strategy_name else list(performance)
+
+        batches = [performance[name]['trade_history'] for name in names if name in performance]
+        if not batches:
+            return np.array([], dtype=float)
+        timestamps = np.concatenate([batch.column('timestamp') for batch in batches])
+        pnls = np.concatenate([batch.column('pnl') for batch in batches])
+        return pnls[np.argsort(timestamps, kind='stable')]
+
+    def simulate_drawdown_risk(self, strategy_name: Optional[str] = None, initial_equity: float = 10000.0,
+                               kill_limit_pct: float = 10.0, **kwargs) -> Optional[Dict]:
+        """Monte Carlo de drawdown sobre el historial de trades"""
+        pnls = self.get_trade_pnls(strategy_name)
+        if len(pnls) < 2:
+            self.logger.warning("Historial insuficiente para Monte Carlo")
+            return None
+        return simulate_drawdowns(pnls, initial_equity, kill_limit_pct=kill_limit_pct, **kwargs)
 
     def generate_daily_report(self) -> Dict:
         """Genera reporte diario de performance"""
@@ -82,6 +106,7 @@ class PerformanceTracker:
         """Guarda métricas en archivo JSON"""
         try:
             with open(filename, 'w') as f:
-                json.dump(self.metrics, f, indent=4, default=str)
+                json.dump(self.metrics, f, indent=4,
+                          default=lambda o: o.to_dict() if isinstance(o, TradeBatch) else str(o))
         except Exception as e:
             self.logger.error(f"Error guardando métricas: {e}")
\ No newline at end of file
@@ -2,10 +2,15 @@
 import MetaTrader5 as mt5
 from datetime import datetime, timedelta
 import logging
+import threading
+import time
+from collections import deque
+from core.event_log import events, PROTECTION, ORDER
 
 class RiskManager:
-    def __init__(self, mt5_connector):
+    def __init__(self, mt5_connector, account_state=None):
         self.mt5 = mt5_connector
+        self.account_state = account_state
         self.logger = logging.getLogger('RiskManager')
         
         # CONFIGURACIÓN DE PROTECCIÓN
@@ -13,9 +18,29 @@ class RiskManager:
         self.auto_close_hour = 15       # 3 PM México (4 PM NY)
         self.max_positions = 8          # Máximo 8 posiciones abiertas
 
+        # Bloqueo activado por el watchdog de equity (motivo) y cierre en curso
+        self.halt_reason = None
+        self._close_lock = threading.Lock()
+
+        # Neteo close-by de posiciones opuestas: ahorro por simbolo y ultimos pares
+        self.netting = {}
+        self.netting_pairs = deque(maxlen=500)
+
     def verificar_protecciones(self):
         """Verifica todas las protecciones en cada ciclo"""
         try:
+            # 0. Conexion degradada: pausar sin cerrar (no hay datos fiables)
+            supervisor = getattr(self.mt5, 'supervisor', None)
+            if supervisor and not supervisor.allow_orders():
+                events.emit(PROTECTION, sample_key='connection', reason='connection',
+                            state=supervisor.state)
+                return False
+
+            # 0b. Bloqueo del watchdog de equity: ya cerro posiciones
+            if self.halt_reason:
+                events.emit(PROTECTION, sample_key='halt', reason=self.halt_reason, source='watchdog')
+                return False
+
             # 1. Verificar horario de mercado
             if self.verificar_cierre_mercado():
                 self.cerrar_todas_posiciones()
@@ -36,43 +61,50 @@ class RiskManager:
             self.logger.error(f"Error en protecciones: {e}")
             return True
 
+    def es_cierre_mercado(self, ahora=None):
+        """True si ya paso el corte del viernes (sin avisos)"""
+        ahora = ahora or datetime.now()
+        # VIERNES después de las 3 PM México = CERRAR TODO
+        return ahora.weekday() == 4 and ahora.hour >= self.auto_close_hour
+
     def verificar_cierre_mercado(self):
         """Verifica si es hora de cerrar antes del fin de semana"""
-        ahora = datetime.now()
-        dia_semana = ahora.weekday()  # 0=Lunes, 4=Viernes
-        hora_actual = ahora.hour
-        
-        # VIERNES después de las 3 PM México = CERRAR TODO
-        if dia_semana == 4 and hora_actual >= self.auto_close_hour:
-            print("🛑 HORA DE CIERRE - Mercado próximo a cerrar")
+        if self.es_cierre_mercado():
+            events.emit(PROTECTION, sample_key='friday_close', reason='friday_close')
             return True
         return False
 
     def verificar_drawdown_maximo(self):
         """Verifica si el drawdown supera el límite permitido"""
         try:
-            account_info = self.mt5.get_account_info()
-            if not account_info:
-                return True
-                
-            balance = account_info['balance']
-            equity = account_info['equity']
-            
-            if balance <= 0:
+            if self.account_state:
+                account_info = self.account_state.get()
+            else:
+                account_info = self.mt5.get_account_info()
+            drawdown_percent = self.calcular_drawdown(account_info)
+            if drawdown_percent is None:
                 return True
-                
-            drawdown_percent = ((balance - equity) / balance) * 100
             
             if drawdown_percent > self.max_drawdown_percent:
-                print(f"🚨 DRAWDOWN MÁXIMO SUPERADO: {drawdown_percent:.1f}%")
+                events.emit(PROTECTION, level=logging.ERROR, reason='max_drawdown',
+                            drawdown_pct=round(drawdown_percent, 2), limit_pct=self.max_drawdown_percent)
                 return False
                 
             return True
             
         except Exception as e:
-            print(f"Error verificando drawdown: {e}")
+            self.logger.error(f"Error verificando drawdown: {e}")
             return True
 
+    def calcular_drawdown(self, account_info):
+        """Drawdown (%) de la equity respecto al balance o al maximo intradia"""
+        if not account_info or account_info['balance'] <= 0:
+            return None
+        balance = account_info['balance']
+        # Referencia: el mayor entre balance y maximo intradia de equity
+        reference = max(balance, account_info.get('high_water_mark') or balance)
+        return ((reference - account_info['equity']) / reference) * 100
+
     def verificar_max_posiciones(self):
         """Verifica no exceder el máximo de posiciones"""
         try:
@@ -80,39 +112,132 @@ class RiskManager:
             num_positions = len(positions) if positions else 0
             
             if num_positions >= self.max_positions:
-                print(f"⚠️ MÁXIMO DE POSICIONES: {num_positions}/{self.max_positions}")
+                events.emit(PROTECTION, level=logging.WARNING, sample_key='max_positions',
+                            reason='max_positions', positions=num_positions, limit=self.max_positions)
                 return False
                 
             return True
             
         except Exception as e:
-            print(f"Error verificando posiciones: {e}")
+            self.logger.error(f"Error verificando posiciones: {e}")
             return True
 
     def cerrar_todas_posiciones(self):
-        """Cierra todas las posiciones abiertas"""
+        """Cierra todas las posiciones abiertas (primero neteando las opuestas)"""
         try:
-            print("🔔 CERRANDO TODAS LAS POSICIONES...")
-            positions = mt5.positions_get()
-            
-            if not positions:
-                print("✅ No hay posiciones abiertas")
-                return True
+            # El ciclo y el watchdog pueden pedirlo a la vez: un solo cierre en curso
+            with self._close_lock:
+                positions = mt5.positions_get()
                 
-            closed_count = 0
-            for position in positions:
-                if self.cerrar_posicion(position.ticket):
-                    closed_count += 1
+                if not positions:
+                    return True
+
+                # Compras contra ventas del mismo simbolo sin pasar por mercado
+                remaining = self.netear_opuestas(positions)
                     
-            print(f"✅ {closed_count} posiciones cerradas")
-            return True
+                closed_count = 0
+                for position in positions:
+                    volume = remaining[position.ticket]
+                    if volume <= 0:
+                        closed_count += 1  # cerrada por completo con close-by
+                    elif self.cerrar_posicion(position.ticket, volume):
+                        closed_count += 1
+                        
+                events.emit(ORDER, level=logging.WARNING, kind='close_all', positions=len(positions),
+                            closed=closed_count)
+                return True
             
         except Exception as e:
-            print(f"❌ Error cerrando posiciones: {e}")
+            self.logger.error(f"Error cerrando posiciones: {e}")
+            return False
+
+    def netear_opuestas(self, positions):
+        """Empareja compras y ventas del mismo simbolo y las cierra con CLOSE_BY.
+
+        Cada par cierra el volumen menor de ambas sin orden a mercado (un
+        solo cruce en lugar de dos, sin pagar el spread); la parte sobrante de
+        la mayor queda abierta con el mismo ticket. Devuelve el volumen que
+        queda por cerrar de cada ticket, para cerrarlo a mercado (parcial).
+        """
+        remaining = {position.ticket: position.volume for position in positions}
+        by_symbol = {}
+        for position in positions:
+            sides = by_symbol.setdefault(position.symbol, ([], []))
+            sides[0 if position.type == mt5.ORDER_TYPE_BUY else 1].append(position.ticket)
+
+        for symbol, (buys, sells) in by_symbol.items():
+            if not buys or not sells:
+                continue
+            # Mayor volumen primero: menos pares para el mismo volumen neteado
+            buys.sort(key=lambda ticket: -remaining[ticket])
+            sells.sort(key=lambda ticket: -remaining[ticket])
+            i = j = 0
+            while i < len(buys) and j < len(sells):
+                buy, sell = buys[i], sells[j]
+                volume = round(min(remaining[buy], remaining[sell]), 2)
+                if not self.cerrar_por_opuesta(symbol, buy, sell, volume):
+                    break  # el resto de este simbolo se cierra a mercado
+                remaining[buy] = round(remaining[buy] - volume, 2)
+                remaining[sell] = round(remaining[sell] - volume, 2)
+                if remaining[buy] <= 0:
+                    i += 1
+                if remaining[sell] <= 0:
+                    j += 1
+        return remaining
+
+    def cerrar_por_opuesta(self, symbol, ticket, ticket_by, volume):
+        """Cierra ``ticket`` contra ``ticket_by`` y registra el ahorro del par"""
+        request = {
+            "action": mt5.TRADE_ACTION_CLOSE_BY,
+            "position": ticket,
+            "position_by": ticket_by,
+            "magic": 234000,
+            "comment": "Cierre por opuesta",
+        }
+        started = time.perf_counter()
+        result = mt5.order_send(request)
+        latency = time.perf_counter() - started
+        if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
+            retcode = result.retcode if result else 'sin respuesta'
+            events.emit(ORDER, level=logging.WARNING, kind='close_by_rejected', symbol=symbol,
+                        ticket=ticket, ticket_by=ticket_by, volume=volume, retcode=retcode)
             return False
 
-    def cerrar_posicion(self, ticket):
-        """Cierra una posición específica"""
+        # Ahorro: la orden a mercado de la otra pata y un spread sobre el volumen neteado
+        info = mt5.symbol_info(symbol)
+        spread_cost = 0.0
+        if info and info.trade_tick_size:
+            spread_cost = info.spread * info.point / info.trade_tick_size * info.trade_tick_value * volume
+        pair = {'symbol': symbol, 'ticket': ticket, 'ticket_by': ticket_by, 'volume': volume,
+                'orders_saved': 1, 'spread_saved': round(spread_cost, 2),
+                'latency_ms': round(latency * 1000, 2), 'timestamp': time.time()}
+        self.netting_pairs.append(pair)
+
+        stats = self.netting.setdefault(symbol, {'pairs': 0, 'orders_saved': 0, 'volume': 0.0,
+                                                 'spread_saved': 0.0, 'latency_total': 0.0})
+        stats['pairs'] += 1
+        stats['orders_saved'] += 1
+        stats['volume'] += volume
+        stats['spread_saved'] += spread_cost
+        stats['latency_total'] += latency
+        events.emit(ORDER, kind='close_by', **pair)
+        return True
+
+    def resumen_netting(self):
+        """Pares, ordenes y spread ahorrados por simbolo con close-by"""
+        return {
+            symbol: {
+                'pairs': stats['pairs'],
+                'orders_saved': stats['orders_saved'],
+                'volume': round(stats['volume'], 2),
+                'spread_saved': round(stats['spread_saved'], 2),
+                'avg_latency_ms': stats['latency_total'] / stats['pairs'] * 1000,
+            }
+            for symbol, stats in self.netting.items()
+        }
+
+    def cerrar_posicion(self, ticket, volume=None):
+        """Cierra una posición específica (o ``volume`` lotes de ella)"""
         try:
             position = mt5.positions_get(ticket=ticket)
             if not position:
@@ -120,7 +245,7 @@ class RiskManager:
                 
             position = position[0]
             symbol = position.symbol
-            volume = position.volume
+            volume = min(volume or position.volume, position.volume)
             position_type = position.type
             
             # Crear orden de cierre opuesta
@@ -137,21 +262,19 @@ class RiskManager:
                 "position": ticket,
                 "deviation": 20,
                 "magic": 234000,
-                "comment": "Cierre automático",
+                "comment": "Cierre automático" if volume >= position.volume else "Cierre parcial",
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
             }
             
-            result = mt5.order_send(request)
-            if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"✅ Posición {ticket} cerrada")
-                return True
-            else:
-                print(f"❌ Error cerrando posición {ticket}")
-                return False
+            result, _ = self.mt5.executor.send(request)
+            done = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+            events.emit(ORDER, level=logging.INFO if done else logging.WARNING, kind='close',
+                        symbol=symbol, ticket=ticket, volume=volume,
+                        retcode=result.retcode if result else None)
+            return done
                 
         except Exception as e:
-            print(f"Error cerrando posición {ticket}: {e}")
+            self.logger.error(f"Error cerrando posición {ticket}: {e}")
             return False
 
     def aplicar_trailing_stops(self):
@@ -173,7 +296,7 @@ class RiskManager:
                         self.modificar_stop_loss(position.ticket, nuevo_stop)
                         
         except Exception as e:
-            print(f"Error aplicando trailing stops: {e}")
+            self.logger.error(f"Error aplicando trailing stops: {e}")
 
     def calcular_trailing_stop(self, position):
         """Calcula nuevo stop loss para trailing"""
@@ -192,7 +315,7 @@ class RiskManager:
             return None
             
         except Exception as e:
-            print(f"Error calculando trailing: {e}")
+            self.logger.error(f"Error calculando trailing: {e}")
             return None
 
     def modificar_stop_loss(self, ticket, new_sl):
@@ -214,11 +337,11 @@ class RiskManager:
             
             result = mt5.order_send(request)
             if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"🔄 Trailing stop actualizado: {new_sl:.2f}")
+                events.emit(ORDER, sample_key=ticket, kind='trailing_stop', ticket=ticket, sl=new_sl)
                 return True
             else:
                 return False
                 
         except Exception as e:
-            print(f"Error modificando SL: {e}")
+            self.logger.error(f"Error modificando SL: {e}")
             return False
\ No newline at end of file
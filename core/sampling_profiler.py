@@ -0,0 +1,177 @@
+# core/sampling_profiler.py - PROFILER POR MUESTREO ACTIVABLE EN CALIENTE
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Profiler por muestreo de pila del hilo principal.
+
+    Un hilo de fondo lee ``sys._current_frames()`` cada ``interval`` segundos
+    durante una ventana y acumula pilas colapsadas (formato de flame graph:
+    ``raiz;...;hoja cuenta``) etiquetadas con el ciclo y la estrategia en
+    curso. El bot no se detiene ni se instrumenta: el coste es una lectura de
+    pila por muestra, asi que puede quedar instalado en horario de mercado.
+    Se activa con SIGUSR1 (POSIX) o con el socket de control local
+    (``profile [segundos]``, ``status``, ``stop``).
+    """
+
+    def __init__(self, interval=0.005, window=30.0, output_dir='profiles'):
+        self.interval = interval
+        self.window = window
+        self.output_dir = output_dir
+        self.logger = logging.getLogger('SamplingProfiler')
+
+        self.target_thread = threading.main_thread().ident
+        self.cycle = 0
+        self.strategy = None
+
+        self.samples = Counter()
+        self.sample_count = 0
+        self.last_output = None
+        self._labels = {}  # code -> etiqueta, evita formatear en cada muestra
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def tag(self, cycle=None, strategy=None):
+        """Etiqueta las muestras siguientes (asignaciones atomicas, sin lock)"""
+        if cycle is not None:
+            self.cycle = cycle
+        self.strategy = strategy
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, window=None):
+        """Inicia una ventana de muestreo; no hace nada si ya hay una activa"""
+        if self.active:
+            return False
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(window or self.window,),
+                                         name='sampling-profiler', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Profiler activo durante {window or self.window:.0f}s")
+        return True
+
+    def stop(self):
+        """Termina la ventana actual antes de tiempo (se escribe lo acumulado)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        """Toma una muestra de la pila del hilo objetivo"""
+        frame = sys._current_frames().get(self.target_thread)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self.label(frame.f_code))
+            frame = frame.f_back
+        stack.append(f"strategy_{self.strategy or 'none'}")
+        stack.append(f"cycle_{self.cycle}")
+        stack.reverse()
+        self.samples[';'.join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self, window):
+        deadline = time.monotonic() + window
+        while time.monotonic() < deadline and not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                self.logger.error(f"Error muestreando: {e}")
+                break
+        self.last_output = self.write()
+
+    def write(self):
+        """Escribe las pilas colapsadas acumuladas y devuelve la ruta"""
+        if not self.samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.logger.info(f"Profile escrito: {path} ({self.sample_count} muestras)")
+        return path
+
+    def status(self):
+        return {
+            'active': self.active,
+            'samples': self.sample_count,
+            'cycle': self.cycle,
+            'strategy': self.strategy,
+            'last_output': self.last_output,
+        }
+
+    # ---- Activacion ----
+
+    def install_signal(self, signum=None):
+        """Activa una ventana al recibir la señal (SIGUSR1 por defecto)"""
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None:  # Windows: solo socket de control
+            return False
+        signal.signal(signum, lambda *_: self.start())
+        return True
+
+    def serve(self, port, host='127.0.0.1'):
+        """Socket de control local: una orden por linea"""
+        self._server = socket.create_server((host, port))
+        threading.Thread(target=self._serve, name='profiler-control', daemon=True).start()
+        self.logger.info(f"Control del profiler en {host}:{port}")
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    command = conn.recv(256).decode().split()
+                    conn.sendall((self.handle(command) + '\n').encode())
+                except (OSError, UnicodeDecodeError) as e:
+                    self.logger.error(f"Error en control del profiler: {e}")
+
+    def handle(self, command):
+        """Ejecuta una orden de control y devuelve la respuesta"""
+        if not command:
+            return 'error: orden vacia'
+        if command[0] == 'profile':
+            try:
+                window = float(command[1]) if len(command) > 1 else None
+            except ValueError:
+                return 'error: ventana invalida'
+            return 'started' if self.start(window) else 'busy'
+        if command[0] == 'stop':
+            self.stop()
+            return f"stopped {self.last_output}"
+        if command[0] == 'status':
+            return ' '.join(f"{key}={value}" for key, value in self.status().items())
+        return f"error: orden desconocida {command[0]}"
+
+    def close(self):
+        self.stop()
+        if self._server:
+            self._server.close()
+
+
+# Instancia compartida por todo el bot
+profiler = SamplingProfiler()
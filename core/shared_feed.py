@@ -0,0 +1,287 @@
+# core/shared_feed.py - PROCESO DUEÑO DEL TERMINAL Y WORKERS DE ESTRATEGIA
+import importlib
+import logging
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import MetaTrader5 as mt5
+import numpy as np
+import pandas as pd
+
+from core.data_feeder import DataFeeder
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+POSITION_DTYPE = np.dtype([
+    ('ticket', '<i8'), ('symbol', '<U16'), ('type', '<i1'), ('volume', '<f8'),
+    ('price_open', '<f8'), ('sl', '<f8'), ('tp', '<f8'), ('magic', '<i8'),
+])
+
+HEADER = 2  # [secuencia (seqlock), filas escritas en total]
+
+
+class SharedRing:
+    """Buffer circular de un array estructurado en memoria compartida.
+
+    Un unico escritor y N lectores sin locks: el escritor deja la secuencia
+    impar mientras escribe y la vuelve par al terminar; el lector repite la
+    lectura si la secuencia cambio o era impar (seqlock). Los lectores
+    trabajan directamente sobre la memoria compartida, sin serializar datos.
+    """
+
+    def __init__(self, dtype, capacity, name=None):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        size = HEADER * 8 + self.dtype.itemsize * capacity
+        self.owner = name is None
+        # Los workers comparten el resource tracker del dueño, que es quien libera el segmento
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+
+        self.header = np.ndarray((HEADER,), dtype='<i8', buffer=self.shm.buf)
+        self.rows = np.ndarray((capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=HEADER * 8)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total(self):
+        return int(self.header[1])
+
+    def last(self):
+        """Ultima fila escrita (lectura del propio escritor)"""
+        return self.rows[(self.total - 1) % self.capacity] if self.total else None
+
+    def write(self, rows, replace_last=False, reset=False):
+        """Añade filas; ``replace_last`` sobrescribe la ultima, ``reset`` vacia antes"""
+        self.header[0] += 1
+        total = 0 if reset else self.total
+        if replace_last and total:
+            total -= 1
+        rows = rows[-self.capacity:]
+        positions = (total + np.arange(len(rows))) % self.capacity
+        self.rows[positions] = rows
+        self.header[1] = total + len(rows)
+        self.header[0] += 1
+
+    def latest(self, count=None, retries=100):
+        """Copia consistente de las ultimas ``count`` filas, de la mas antigua a la mas nueva"""
+        for _ in range(retries):
+            seq = int(self.header[0])
+            if seq % 2:
+                continue
+            total = self.total
+            n = min(count or total, total, self.capacity)
+            out = self.rows[(np.arange(total - n, total)) % self.capacity]
+            if int(self.header[0]) == seq:
+                return out
+        raise RuntimeError('Lectura inconsistente del buffer compartido')
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class TerminalFeed:
+    """Publica barras y posiciones del terminal en memoria compartida.
+
+    Vive en el unico proceso conectado a MT5. Los canales de barras salen del
+    mismo plan que ``DataFeeder`` (union de requisitos de las estrategias);
+    tras la carga inicial cada ciclo descarga solo las ultimas barras,
+    actualiza la barra en formacion y añade las nuevas.
+    """
+
+    def __init__(self, strategies, capacity=1024, refresh_bars=10, max_positions=256):
+        self.logger = logging.getLogger('TerminalFeed')
+        strategies = list(strategies)
+        for strategy in strategies:
+            strategy.validate()  # igual que DataFeeder.prefetch: fallar al arrancar
+        self.plan = DataFeeder.plan(strategies)
+        self.refresh_bars = refresh_bars
+        self.bars = {key: SharedRing(RATES_DTYPE, max(capacity, count)) for key, count in self.plan.items()}
+        self.positions = SharedRing(POSITION_DTYPE, max_positions)
+        self.last_publish_seconds = 0.0
+
+    def layout(self):
+        """Nombres y formas de los segmentos para que los workers se conecten"""
+        return {
+            'bars': {key: (ring.name, ring.capacity) for key, ring in self.bars.items()},
+            'positions': (self.positions.name, self.positions.capacity),
+        }
+
+    def publish_bars(self, key, ring):
+        symbol, timeframe = key
+        count = self.plan[key] if ring.total == 0 else self.refresh_bars
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if rates is None or len(rates) == 0:
+            return
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+
+        last = ring.last()
+        if last is None:
+            ring.write(rates)
+        elif rates['time'][0] > last['time']:
+            # Hueco mayor que la ventana de refresco: recarga completa
+            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, self.plan[key])
+            if rates is not None and len(rates):
+                ring.write(np.asarray(rates).astype(RATES_DTYPE, copy=False), reset=True)
+        else:
+            fresh = rates[rates['time'] >= last['time']]
+            ring.write(fresh, replace_last=bool(len(fresh)) and fresh['time'][0] == last['time'])
+
+    def publish(self):
+        """Publica el estado del terminal para el siguiente ciclo"""
+        started = time.perf_counter()
+        for key, ring in self.bars.items():
+            try:
+                self.publish_bars(key, ring)
+            except Exception as e:
+                self.logger.error(f"Error publicando {key[0]}: {e}")
+
+        positions = mt5.positions_get() or ()
+        rows = np.array([(p.ticket, p.symbol, p.type, p.volume, p.price_open, p.sl, p.tp, p.magic)
+                         for p in positions[:self.positions.capacity]], dtype=POSITION_DTYPE)
+        self.positions.write(rows, reset=True)
+        self.last_publish_seconds = time.perf_counter() - started
+
+    def close(self):
+        for ring in [*self.bars.values(), self.positions]:
+            ring.close()
+
+
+class FeedReader:
+    """Vista de un worker sobre los segmentos publicados por ``TerminalFeed``"""
+
+    def __init__(self, layout):
+        self.bars = {key: SharedRing(RATES_DTYPE, capacity, name=name)
+                     for key, (name, capacity) in layout['bars'].items()}
+        self.positions = SharedRing(POSITION_DTYPE, layout['positions'][1], name=layout['positions'][0])
+
+    def data(self, plan):
+        """Mismo formato que ``DataFeeder.prefetch``"""
+        return {key: pd.DataFrame(self.bars[key].latest(count)) for key, count in plan.items()
+                if key in self.bars and self.bars[key].total}
+
+    def open_symbols(self):
+        return set(self.positions.latest()['symbol'])
+
+    def close(self):
+        for ring in [*self.bars.values(), self.positions]:
+            ring.close()
+
+
+def _worker_main(worker_id, specs, layout, commands, results):
+    """Proceso worker: ejecuta sus estrategias sobre el feed compartido"""
+    strategies = {}
+    for name, module, qualname in specs:
+        strategies[name] = getattr(importlib.import_module(module), qualname)()
+    plan = DataFeeder.plan(strategies.values())
+    reader = FeedReader(layout)
+
+    try:
+        while True:
+            cycle = commands.get()
+            if cycle is None:
+                break
+            data = reader.data(plan)
+            open_symbols = reader.open_symbols()
+            output = {}
+            for name, strategy in strategies.items():
+                try:
+                    strategy.validate()  # mismo camino que DataFeeder.prefetch en proceso
+                    output[name] = strategy.on_data(data, open_symbols)
+                except Exception as e:
+                    output[name] = e.__class__.__name__ + ': ' + str(e)
+            results.put((cycle, worker_id, output))
+    finally:
+        reader.close()
+
+
+class StrategyWorkerPool:
+    """Reparte las estrategias entre procesos worker.
+
+    Cada ciclo el proceso dueño del terminal publica el feed y envia el numero
+    de ciclo a los workers; estos devuelven sus señales (intenciones de orden)
+    por una cola y el dueño las ejecuta. Los workers nunca se conectan a MT5.
+    Un worker muerto se relanza al inicio del ciclo; si muere durante el
+    ciclo sus estrategias se marcan con error sin esperar al timeout.
+    """
+
+    def __init__(self, strategies, layout, workers=None, timeout=30.0, poll_interval=0.5):
+        self.logger = logging.getLogger('StrategyWorkerPool')
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.layout = layout
+        self.order = list(strategies)
+        workers = max(1, min(workers or mp.cpu_count(), len(self.order)))
+
+        self.context = mp.get_context('spawn')  # igual en Windows, donde corre MT5
+        self.results = self.context.Queue()
+        self.specs = [[(name, type(strategy).__module__, type(strategy).__qualname__)
+                       for i, (name, strategy) in enumerate(strategies.items()) if i % workers == worker_id]
+                      for worker_id in range(workers)]
+        self.commands = [None] * workers
+        self.processes = [None] * workers
+        self.restarts = 0
+        for worker_id in range(workers):
+            self.spawn(worker_id)
+
+    def spawn(self, worker_id):
+        """Lanza (o relanza) un worker con una cola de ordenes nueva"""
+        commands = self.context.Queue()
+        process = self.context.Process(target=_worker_main, name=f'strategy-worker-{worker_id}',
+                                       args=(worker_id, self.specs[worker_id], self.layout, commands, self.results),
+                                       daemon=True)
+        process.start()
+        self.commands[worker_id] = commands
+        self.processes[worker_id] = process
+
+    def respawn_dead(self):
+        for worker_id, process in enumerate(self.processes):
+            if not process.is_alive():
+                self.logger.error(f"Worker {worker_id} muerto (exitcode {process.exitcode}); relanzando")
+                self.restarts += 1
+                self.spawn(worker_id)
+
+    def run_cycle(self, cycle):
+        """Señales de todas las estrategias para el ciclo, en el orden original"""
+        self.respawn_dead()
+        for commands in self.commands:
+            commands.put(cycle)
+
+        output, pending = {}, set(range(len(self.processes)))
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.error(f"Workers sin respuesta en el ciclo {cycle}: {sorted(pending)}")
+                break
+            try:
+                result_cycle, worker_id, signals = self.results.get(timeout=min(self.poll_interval, remaining))
+            except queue.Empty:
+                # Un worker muerto no va a responder: sus estrategias fallan ya
+                for worker_id in [w for w in pending if not self.processes[w].is_alive()]:
+                    pending.discard(worker_id)
+                    for name, _, _ in self.specs[worker_id]:
+                        output[name] = f"WorkerError: worker {worker_id} murio en el ciclo {cycle}"
+                continue
+            if result_cycle != cycle:
+                continue  # respuesta tardia de un ciclo anterior
+            pending.discard(worker_id)
+            output.update(signals)
+        return {name: output[name] for name in self.order if name in output}
+
+    def close(self):
+        for commands in self.commands:
+            commands.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,233 @@
+# core/terminal_recorder.py - GRABACION Y REPRODUCCION DE LLAMADAS A METATRADER5
+import gzip
+import logging
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+FORMAT_VERSION = 2  # v2: cada llamada lleva el nombre del hilo
+MAIN_THREAD = 'MainThread'
+# Funciones que solo se llaman al apagar: no cuentan para dar el replay por agotado
+SHUTDOWN_CALLS = frozenset({'market_book_release', 'shutdown'})
+
+
+def _freeze(value):
+    """Convierte los tipos de MT5 (namedtuple-like) en estructuras serializables"""
+    if hasattr(value, '_asdict'):
+        return ('__mt5__', type(value).__name__,
+                {k: _freeze(v) for k, v in value._asdict().items()})
+    if isinstance(value, tuple):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, list):
+        return [_freeze(v) for v in value]
+    return value
+
+
+_restored_types = {}
+
+
+def _thaw(value):
+    """Reconstruye objetos con acceso por atributo a partir de _freeze"""
+    if isinstance(value, tuple):
+        if len(value) == 3 and value[0] == '__mt5__':
+            name, fields = value[1], value[2]
+            key = (name, tuple(fields))
+            if key not in _restored_types:
+                _restored_types[key] = namedtuple(name, fields)
+            return _restored_types[key](**{k: _thaw(v) for k, v in fields.items()})
+        return tuple(_thaw(v) for v in value)
+    if isinstance(value, list):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class RecordingTerminal:
+    """Envuelve el modulo MetaTrader5 y graba cada llamada con su respuesta.
+
+    Las llamadas se encolan sin bloqueo y un hilo de fondo las serializa en
+    un log pickle comprimido con gzip. Las constantes pasan sin grabarse
+    (se guardan una vez en la cabecera). Cada llamada guarda el hilo que la
+    hizo para que el replay no mezcle las del ciclo con las de los hilos de
+    fondo (supervisor, watchdog, registro de equity).
+    """
+
+    def __init__(self, terminal, path):
+        self._terminal = terminal
+        self._path = path
+        self._queue = deque()
+        self._wrappers = {}
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._logger = logging.getLogger('TerminalRecorder')
+
+        self._file = gzip.open(path, 'wb', compresslevel=1)
+        constants = {name: getattr(terminal, name) for name in dir(terminal)
+                     if name.isupper() and isinstance(getattr(terminal, name), (int, float, str))}
+        pickle.dump({'version': FORMAT_VERSION, 'constants': constants, 'started': time.time()},
+                    self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._thread = threading.Thread(target=self._run, name='mt5-recorder', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        attr = getattr(self._terminal, name)
+        if not callable(attr):
+            return attr
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            wrapper = self._wrap(name, attr)
+            self._wrappers[name] = wrapper
+        return wrapper
+
+    def _wrap(self, name, function):
+        def recorded(*args, **kwargs):
+            result = function(*args, **kwargs)
+            thread = threading.current_thread().name
+            with self._seq_lock:
+                self._seq += 1
+                self._queue.append((self._seq, time.monotonic() - self._started, thread, name,
+                                    args, kwargs, result))
+            return result
+        recorded.__name__ = name
+        return recorded
+
+    def _drain(self):
+        while self._queue:
+            seq, offset, thread, name, args, kwargs, result = self._queue.popleft()
+            pickle.dump((seq, offset, thread, name, _freeze(args), kwargs, _freeze(result)),
+                        self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _run(self):
+        while not self._stop.wait(0.5):
+            try:
+                self._drain()
+            except Exception as e:
+                self._logger.error(f"Error grabando llamadas: {e}")
+
+    def close(self):
+        """Vacia la cola y cierra el log"""
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._drain()
+        self._file.close()
+
+
+class ReplayTerminal:
+    """Sustituto del modulo MetaTrader5 que reproduce un log grabado.
+
+    Cada funcion devuelve, en orden, las respuestas grabadas para esa funcion
+    en el hilo principal, sin esperas, por lo que un ciclo se reproduce mas
+    rapido que en vivo y siempre igual. Las llamadas de los hilos de fondo se
+    descartan: en replay esos hilos no se arrancan. Con ``strict`` se exige
+    que los argumentos coincidan con los grabados. ``consumed`` cuenta las
+    respuestas servidas; un ciclo que no consume ninguna marca el final.
+    """
+
+    def __init__(self, path, strict=False):
+        self._strict = strict
+        self._calls = {}
+        self._mismatches = 0
+        self.consumed = 0
+        self.skipped_calls = 0
+        self._logger = logging.getLogger('ReplayTerminal')
+
+        with gzip.open(path, 'rb') as f:
+            header = pickle.load(f)
+            version = header.get('version')
+            if version not in (1, FORMAT_VERSION):
+                raise ValueError(f"Version de log no soportada: {version}")
+            self._constants = header['constants']
+            while True:
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    break
+                if version == 1:
+                    # Sin hilo grabado: todo se atribuye al hilo principal
+                    seq, offset, name, args, kwargs, result = record
+                    thread = MAIN_THREAD
+                else:
+                    seq, offset, thread, name, args, kwargs, result = record
+                if thread != MAIN_THREAD:
+                    self.skipped_calls += 1
+                    continue
+                self._calls.setdefault(name, deque()).append((args, kwargs, result))
+
+        self.total_calls = sum(len(calls) for calls in self._calls.values())
+
+    @property
+    def exhausted(self):
+        """True cuando ya no quedan llamadas grabadas (salvo las del apagado)"""
+        return not self.remaining()
+
+    def remaining(self):
+        """Llamadas grabadas sin consumir por funcion, sin contar las del apagado"""
+        return {name: len(calls) for name, calls in self._calls.items()
+                if calls and name not in SHUTDOWN_CALLS}
+
+    def __getattr__(self, name):
+        if name in self._constants:
+            return self._constants[name]
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            if threading.current_thread().name != MAIN_THREAD:
+                return None  # no consumir las respuestas del ciclo desde otros hilos
+            calls = self._calls.get(name)
+            if not calls:
+                return None
+            recorded_args, recorded_kwargs, result = calls.popleft()
+            self.consumed += 1
+            if _freeze(args) != recorded_args or kwargs != recorded_kwargs:
+                self._mismatches += 1
+                if self._strict:
+                    raise RuntimeError(f"Replay divergente en {name}: {args} {kwargs}")
+            return _thaw(result)
+        replayed.__name__ = name
+        return replayed
+
+
+def _swap_module(replacement):
+    """Sustituye MetaTrader5 en sys.modules y en los modulos que ya lo importaron"""
+    original = sys.modules.get('MetaTrader5')
+    sys.modules['MetaTrader5'] = replacement
+    if original is None:
+        return
+    for module in list(sys.modules.values()):
+        if getattr(module, 'mt5', None) is original:
+            module.mt5 = replacement
+
+
+def install_recorder(path):
+    """Activa la grabacion de todas las llamadas al terminal"""
+    import MetaTrader5
+    recorder = RecordingTerminal(MetaTrader5, path)
+    _swap_module(recorder)
+    return recorder
+
+
+def install_replay(path, strict=False):
+    """Sustituye el terminal por la reproduccion de un log grabado"""
+    replay = ReplayTerminal(path, strict=strict)
+    _swap_module(replay)
+    return replay
+
+
+def install_from_env():
+    """Activa grabacion (NEXTIA_RECORD) o replay (NEXTIA_REPLAY) segun el entorno"""
+    if multiprocessing.parent_process() is not None:
+        return None  # Los workers de estrategia no usan el terminal
+    replay_path = os.environ.get('NEXTIA_REPLAY')
+    if replay_path:
+        return install_replay(replay_path)
+    record_path = os.environ.get('NEXTIA_RECORD')
+    if record_path:
+        return install_recorder(record_path)
+    return None
@@ -0,0 +1,162 @@
+# core/trade_types.py - TIPOS COMPACTOS DE SEÑAL, ORDEN, FILL E HISTORIAL COLUMNAR
+import time
+from enum import IntEnum
+
+import numpy as np
+
+
+class Side(IntEnum):
+    """Lado de la operacion (mismos valores que ORDER_TYPE_BUY / ORDER_TYPE_SELL)"""
+    BUY = 0
+    SELL = 1
+
+    @classmethod
+    def parse(cls, value):
+        """Acepta Side, 'buy'/'BUY'/'sell'/'SELL' o el entero de MT5"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            return cls[value.upper()]
+        return cls(int(value))
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+    @property
+    def sign(self):
+        return 1 if self is Side.BUY else -1
+
+
+class Signal:
+    """Señal de una estrategia (una por simbolo y ciclo)"""
+    __slots__ = ('symbol', 'side', 'stop_loss', 'take_profit', 'confidence', 'strategy', 'score', 'timestamp')
+
+    def __init__(self, symbol, side, stop_loss, take_profit=0.0, confidence=0.5, strategy=None, score=0.0,
+                 timestamp=None):
+        self.symbol = symbol
+        self.side = Side.parse(side)
+        self.stop_loss = float(stop_loss)
+        self.take_profit = float(take_profit)
+        self.confidence = float(confidence)
+        self.strategy = strategy
+        self.score = float(score)
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_dict(cls, data):
+        """Compatibilidad con señales en formato dict (clave 'action')"""
+        return cls(data['symbol'], data['action'], data.get('stop_loss', 0.0), data.get('take_profit', 0.0),
+                   data.get('confidence', 0.5), data.get('strategy'), data.get('score', 0.0),
+                   data.get('timestamp'))
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol, 'action': self.side.label, 'stop_loss': self.stop_loss,
+            'take_profit': self.take_profit, 'confidence': self.confidence,
+            'strategy': self.strategy, 'score': self.score, 'timestamp': self.timestamp,
+        }
+
+    def __repr__(self):
+        return (f"Signal({self.symbol} {self.side.label} sl={self.stop_loss:g} "
+                f"tp={self.take_profit:g} conf={self.confidence:g})")
+
+
+class Order:
+    """Orden a enviar al terminal"""
+    __slots__ = ('symbol', 'side', 'volume', 'stop_loss', 'take_profit', 'strategy')
+
+    def __init__(self, symbol, side, volume, stop_loss=0.0, take_profit=0.0, strategy=None):
+        self.symbol = symbol
+        self.side = Side.parse(side)
+        self.volume = float(volume)
+        self.stop_loss = float(stop_loss)
+        self.take_profit = float(take_profit)
+        self.strategy = strategy
+
+    @classmethod
+    def from_signal(cls, signal, volume):
+        return cls(signal.symbol, signal.side, volume, signal.stop_loss, signal.take_profit, signal.strategy)
+
+
+class Fill:
+    """Resultado de una orden ejecutada"""
+    __slots__ = ('order_id', 'symbol', 'side', 'volume', 'price', 'retries', 'strategy', 'timestamp')
+
+    def __init__(self, order_id, symbol, side, volume, price, retries=0, strategy=None, timestamp=None):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = Side.parse(side)
+        self.volume = float(volume)
+        self.price = float(price)
+        self.retries = retries
+        self.strategy = strategy
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_result(cls, order, result):
+        """Construye el fill a partir de una orden y el dict de ``execute_order``"""
+        return cls(result.get('order_id'), order.symbol, order.side, result.get('volume', order.volume),
+                   result.get('price', 0.0), result.get('retries', 0), order.strategy)
+
+
+class TradeBatch:
+    """Historial de trades en columnas NumPy (timestamp, simbolo, lado, pnl).
+
+    Los simbolos se guardan como indices en una tabla compartida, asi que un
+    trade ocupa 21 bytes en lugar de un dict con un ``datetime``. Las columnas
+    crecen duplicando capacidad y se recortan por el principio.
+    """
+
+    COLUMNS = (('timestamp', np.float64), ('symbol', np.int32), ('side', np.int8), ('pnl', np.float64))
+
+    def __init__(self, capacity=64):
+        self.columns = {name: np.empty(capacity, dtype) for name, dtype in self.COLUMNS}
+        self.symbols = []
+        self.symbol_index = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, symbol, side, pnl, timestamp=None):
+        if self.size == len(self.columns['pnl']):
+            for name, array in self.columns.items():
+                grown = np.empty(2 * len(array), array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.columns[name] = grown
+
+        code = self.symbol_index.get(symbol)
+        if code is None:
+            code = self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+        i = self.size
+        self.columns['timestamp'][i] = time.time() if timestamp is None else timestamp
+        self.columns['symbol'][i] = code
+        self.columns['side'][i] = Side.parse(side)
+        self.columns['pnl'][i] = pnl
+        self.size += 1
+
+    def column(self, name):
+        """Vista (sin copia) de una columna"""
+        return self.columns[name][:self.size]
+
+    def trim(self, cap):
+        """Elimina los trades mas antiguos por encima de ``cap``; devuelve cuantos"""
+        excess = self.size - cap
+        if excess <= 0:
+            return 0
+        for array in self.columns.values():
+            array[:cap] = array[excess:self.size]
+        self.size = cap
+        return excess
+
+    def to_dict(self):
+        """Formato columnar serializable (JSON) para el journal y el dashboard"""
+        return {
+            'timestamp': self.column('timestamp').tolist(),
+            'symbol': [self.symbols[code] for code in self.column('symbol')],
+            'side': [Side(int(side)).label for side in self.column('side')],
+            'pnl': self.column('pnl').tolist(),
+        }
@@ -0,0 +1,234 @@
+# core/universe_scanner.py - ESCANER DE UNIVERSO MULTI-SIMBOLO VECTORIZADO
+import MetaTrader5 as mt5
+import numpy as np
+import fnmatch
+import logging
+import time
+
+from core.trade_types import Signal
+
+
+class UniverseScanner:
+    """Evalua scalper y Turtle sobre cientos de simbolos en una sola pasada.
+
+    Los simbolos se descubren con ``mt5.symbols_get`` y los precios se apilan
+    en matrices (simbolos x barras) para evaluar las condiciones de cada
+    estrategia con operaciones 2-D de NumPy en vez de un DataFrame por simbolo.
+    """
+
+    def __init__(self, scalper, turtle, group="*", exclude=None,
+                 max_spread_points=30, max_symbols=300):
+        self.scalper = scalper
+        self.turtle = turtle
+        self.group = group
+        self.exclude = exclude or []
+        self.max_spread_points = max_spread_points
+        self.max_symbols = max_symbols
+        self.logger = logging.getLogger('UniverseScanner')
+
+        # Parametros de las estrategias (mismos valores que en analyze())
+        self.scalper_timeframe = mt5.TIMEFRAME_M5
+        self.scalper_bars = 100
+        self.turtle_timeframe = mt5.TIMEFRAME_H1
+        self.turtle_bars = 100
+
+        self.symbol_meta = {}
+        self.last_scan_seconds = 0.0
+
+    def discover_symbols(self):
+        """Descubre simbolos operables aplicando los filtros configurados"""
+        try:
+            infos = mt5.symbols_get(group=self.group)
+        except Exception as e:
+            self.logger.error(f"Error obteniendo simbolos: {e}")
+            return []
+
+        if not infos:
+            return []
+
+        symbols = []
+        for info in infos:
+            if info.trade_mode != mt5.SYMBOL_TRADE_MODE_FULL:
+                continue
+            if self.max_spread_points and info.spread > self.max_spread_points:
+                continue
+            if any(fnmatch.fnmatch(info.name, pattern) for pattern in self.exclude):
+                continue
+
+            self.symbol_meta[info.name] = {
+                'digits': info.digits,
+                'point': info.point,
+                'visible': info.visible
+            }
+            symbols.append(info.name)
+            if len(symbols) >= self.max_symbols:
+                break
+
+        return symbols
+
+    def fetch_matrix(self, symbols, timeframe, count):
+        """Descarga las barras de cada simbolo (una llamada por simbolo; MT5 no
+        tiene consulta multi-simbolo) y las apila en matrices (simbolos x barras)"""
+        names = []
+        rows = []
+
+        for symbol in symbols:
+            meta = self.symbol_meta.get(symbol)
+            if meta and not meta['visible']:
+                mt5.symbol_select(symbol, True)
+                meta['visible'] = True
+            try:
+                rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+            except Exception:
+                continue
+            # Solo simbolos con historial completo para poder apilar
+            if rates is None or len(rates) < count:
+                continue
+            names.append(symbol)
+            rows.append(rates)
+
+        if not rows:
+            return [], None
+
+        stacked = np.vstack(rows)
+        matrix = {
+            'open': stacked['open'],
+            'high': stacked['high'],
+            'low': stacked['low'],
+            'close': stacked['close']
+        }
+        return names, matrix
+
+    @staticmethod
+    def ema_last(close, span):
+        """EMA de la ultima barra por fila (equivale a ewm(span).mean() de pandas)"""
+        alpha = 2.0 / (span + 1.0)
+        weights = (1.0 - alpha) ** np.arange(close.shape[1] - 1, -1, -1)
+        return close @ weights / weights.sum()
+
+    @staticmethod
+    def rsi_last(close, period=14):
+        """RSI de media simple de la ultima barra por fila"""
+        delta = np.diff(close[:, -(period + 1):], axis=1)
+        gain = np.clip(delta, 0, None).mean(axis=1)
+        loss = np.clip(-delta, 0, None).mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+
+    @staticmethod
+    def atr_last(high, low, close, period=14):
+        """ATR de la ultima barra por fila"""
+        prev_close = close[:, -(period + 1):-1]
+        high = high[:, -period:]
+        low = low[:, -period:]
+        true_range = np.maximum(high - low,
+                                np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        return true_range.mean(axis=1)
+
+    def pip_size(self, symbol):
+        """Tamano de pip segun digitos del simbolo"""
+        meta = self.symbol_meta.get(symbol)
+        if not meta:
+            return None
+        if meta['digits'] in (3, 5):
+            return meta['point'] * 10
+        return meta['point']
+
+    def evaluate_scalper(self, names, matrix):
+        """Condiciones EMA 8/21 + RSI 14 del scalper sobre todas las filas"""
+        close = matrix['close']
+        ema_fast = self.ema_last(close, 8)
+        ema_slow = self.ema_last(close, 21)
+        rsi = self.rsi_last(close, 14)
+        atr = self.atr_last(matrix['high'], matrix['low'], close, 14)
+        last = close[:, -1]
+
+        buy = (ema_fast > ema_slow) & (rsi < 65) & (rsi > 40)
+        sell = (ema_fast < ema_slow) & (rsi > 35) & (rsi < 60)
+        # Separacion de EMAs en unidades de ATR: comparable entre simbolos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.abs(ema_fast - ema_slow) / atr
+
+        candidates = []
+        for i in np.flatnonzero((buy | sell) & (atr > 0)):
+            symbol = names[i]
+            action = 'buy' if buy[i] else 'sell'
+            stop_loss, take_profit = self.scalper.calculate_proper_stops(
+                symbol, float(last[i]), action, pip_size=self.pip_size(symbol)
+            )
+            candidates.append(Signal(symbol, action, stop_loss, take_profit, confidence=0.8,
+                                     strategy='scalper', score=score[i]))
+        return candidates
+
+    def evaluate_turtle(self, names, matrix):
+        """Condiciones de ruptura de canal 20 de Turtle sobre todas las filas"""
+        high = matrix['high']
+        low = matrix['low']
+        close = matrix['close']
+
+        atr = self.atr_last(high, low, close, 14)
+        # Canal de 20 barras evaluado en la barra previa
+        highest_20 = high[:, -21:-1].max(axis=1)
+        lowest_20 = low[:, -21:-1].min(axis=1)
+        last = close[:, -1]
+
+        buy = last > highest_20
+        sell = ~buy & (last < lowest_20)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where(buy, last - highest_20, lowest_20 - last) / atr
+
+        candidates = []
+        for i in np.flatnonzero((buy | sell) & (atr > 0)):
+            price = float(last[i])
+            if buy[i]:
+                action = 'buy'
+                stop_loss = price - atr[i] * 2
+                take_profit = price + atr[i] * 3
+            else:
+                action = 'sell'
+                stop_loss = price + atr[i] * 2
+                take_profit = price - atr[i] * 3
+            candidates.append(Signal(names[i], action, stop_loss, take_profit, confidence=0.8,
+                                     strategy='turtle', score=score[i]))
+        return candidates
+
+    def open_position_symbols(self):
+        """Simbolos con posicion abierta (una sola llamada al terminal)"""
+        try:
+            positions = mt5.positions_get()
+            return {p.symbol for p in positions} if positions else set()
+        except Exception:
+            return set()
+
+    def scan(self):
+        """Ejecuta el escaneo completo y devuelve candidatos ordenados por score"""
+        started = time.perf_counter()
+        symbols = self.discover_symbols()
+        if not symbols:
+            self.last_scan_seconds = time.perf_counter() - started
+            return []
+
+        candidates = []
+
+        names, matrix = self.fetch_matrix(symbols, self.scalper_timeframe, self.scalper_bars)
+        if names:
+            candidates.extend(self.evaluate_scalper(names, matrix))
+
+        names, matrix = self.fetch_matrix(symbols, self.turtle_timeframe, self.turtle_bars)
+        if names:
+            candidates.extend(self.evaluate_turtle(names, matrix))
+
+        # Ranking antes de aplicar el limite de trades por ciclo
+        candidates.sort(key=lambda c: c.score, reverse=True)
+
+        busy = self.open_position_symbols()
+        ranked = []
+        for candidate in candidates:
+            if candidate.symbol in busy:
+                continue
+            busy.add(candidate.symbol)  # Un candidato por simbolo
+            ranked.append(candidate)
+
+        self.last_scan_seconds = time.perf_counter() - started
+        return ranked
@@ -1,9 +1,28 @@
 # main.py - VERSIÓN CON SISTEMA DE PROTECCIÓN INTEGRADO
+import os
 import time
 import logging
 from datetime import datetime
+# Grabacion / replay del terminal: debe activarse antes de importar modulos que usan MT5
+from core.terminal_recorder import install_from_env, ReplayTerminal, RecordingTerminal
+terminal_hook = install_from_env()
 from core.mt5_connector import MT5Connector
 from core.risk_manager import RiskManager  # ✅ NUEVO IMPORT
+from core.connection_supervisor import ConnectionSupervisor
+from core.universe_scanner import UniverseScanner
+from core.exposure_engine import ExposureEngine
+from core.account_state import AccountState
+from core.equity_watchdog import EquityWatchdog
+from core.market_depth import MarketDepth, RecordedBookFeed
+from core.data_feeder import DataFeeder
+from core.deal_sync import DealSync
+from core.performance_tracker import PerformanceTracker
+from core.trade_types import Signal, Order, Fill
+from core.shared_feed import TerminalFeed, StrategyWorkerPool
+from core.memory_guard import MemoryGuard
+from core.equity_recorder import EquityRecorder
+from core.sampling_profiler import profiler
+from core.event_log import events, parse_level, CYCLE, SIGNAL, FILL, REJECT, MEMORY
 from strategies.forex_scalper import ForexScalper
 from strategies.gold_trend import GoldTrendStrategy as GoldTrend
 from strategies.turtle_strategy import TurtleStrategy
@@ -14,13 +33,30 @@ class NextiaTradingBot:
         self.logger = logging.getLogger('NextiaBot')
         
         self.print_welcome()
+        # Replay: sin hilos de fondo, solo el ciclo consume el log (determinista y sin esperas)
+        self.replaying = isinstance(terminal_hook, ReplayTerminal)
         self.mt5 = MT5Connector()
+        # Snapshot unico de la cuenta por ciclo (TTL corto, refresco tras fills)
+        self.account_state = AccountState(self.mt5, ttl=5.0)
         
+        # Supervisor de conexion: heartbeat, circuit breaker y reconexion
+        self.supervisor = ConnectionSupervisor(self.mt5)
         if not self.check_connection():
-            return
-            
+            # Terminal caido al arrancar: ordenes en pausa y re-login en segundo plano
+            self.supervisor.trip("sin conexion al iniciar")
+        if not self.replaying:
+            self.supervisor.start()
+
         # ✅ SISTEMA DE PROTECCIÓN (AGREGAR ESTO)
-        self.risk_manager = RiskManager(self.mt5)
+        self.risk_manager = RiskManager(self.mt5, account_state=self.account_state)
+
+        # Drawdown y corte del viernes vigilados fuera del ciclo (0 = desactivado)
+        self.watchdog = None
+        watchdog_interval = float(os.getenv('EQUITY_WATCHDOG_INTERVAL', '0.25'))
+        if watchdog_interval > 0 and not self.replaying:
+            self.watchdog = EquityWatchdog(self.risk_manager, self.mt5, self.account_state,
+                                           interval=watchdog_interval)
+            self.watchdog.start()
         
         # Estrategias profesionales
         self.strategies = {
@@ -28,6 +64,39 @@ class NextiaTradingBot:
             'gold_trend': GoldTrend(mt5_connector=self.mt5),
             'turtle': TurtleStrategy()
         }
+        # Una descarga planificada por ciclo con los requisitos de todas las estrategias
+        self.data_feeder = DataFeeder()
+
+        # Workers de estrategia en otros procesos; este proceso es el unico conectado a MT5
+        self.feed = None
+        self.workers = None
+        strategy_workers = int(os.getenv('STRATEGY_WORKERS', '0'))
+        if strategy_workers > 0:
+            self.feed = TerminalFeed(self.strategies.values())
+            self.workers = StrategyWorkerPool(self.strategies, self.feed.layout(), workers=strategy_workers)
+
+        # Libro de ordenes (DOM) para el chequeo de coste de barrido pre-trade
+        depth_symbols = [s for s in os.getenv('MARKET_DEPTH_SYMBOLS', 'XAUUSD,EURUSD,GBPUSD,USDJPY').split(',') if s]
+        depth_feed = os.getenv('MARKET_DEPTH_FEED')
+        if depth_symbols:
+            self.mt5.depth = MarketDepth(depth_symbols,
+                                         max_impact_points=float(os.getenv('MARKET_DEPTH_MAX_POINTS', '30')),
+                                         source=RecordedBookFeed(depth_feed) if depth_feed else None,
+                                         supervisor=self.supervisor)
+
+        # Exposicion por divisa y VaR para el chequeo pre-trade
+        self.exposure = ExposureEngine()
+        for symbol in ['EURUSD', 'GBPUSD', 'USDJPY', 'XAUUSD']:
+            self.exposure.register_symbol(symbol)
+
+        # Modo escaner: scalper y Turtle sobre todo el universo de simbolos
+        self.scanner_mode = os.getenv('SCANNER_MODE', '0') == '1'
+        self.scanner = UniverseScanner(
+            self.strategies['scalper'],
+            self.strategies['turtle'],
+            group=os.getenv('SCANNER_GROUP', '*'),
+            max_symbols=int(os.getenv('SCANNER_MAX_SYMBOLS', '300'))
+        )
         
         self.performance = {
             'total_trades': 0,
@@ -36,6 +105,38 @@ class NextiaTradingBot:
             'cycle_count': 0,
             'max_trades_per_cycle': 3
         }
+        # Estado del ciclo en curso: va al evento CYCLE y a la linea de resumen
+        self.cycle_info = {}
+
+        # P&L realizado por estrategia leido del historial de deals (solo deals nuevos por ciclo)
+        self.performance_tracker = PerformanceTracker(
+            max_trade_history=int(os.getenv('MAX_TRADE_HISTORY', '5000')))
+        self.deal_sync = DealSync(self.performance_tracker,
+                                  state_path=os.getenv('DEAL_SYNC_STATE', 'data/deal_sync.json'))
+
+        # Serie de equity/balance/margen/P&L abierto con memoria constante
+        self.equity_recorder = EquityRecorder()
+        equity_interval = float(os.getenv('EQUITY_SAMPLE_INTERVAL', '1.0'))
+        if self.watchdog:
+            # Un solo muestreador de account_info: el watchdog alimenta el registro
+            self.watchdog.feed(self.equity_recorder, interval=equity_interval)
+        elif not self.replaying:
+            self.equity_recorder.start(self.sample_equity, interval=equity_interval)
+
+        # Memoria por subsistema y limites de los diccionarios que crecen con el tiempo
+        self.memory_guard = MemoryGuard()
+        self.memory_check_every = int(os.getenv('MEMORY_CHECK_EVERY', '30'))  # 0 = desactivado
+        self.memory_guard.register('event_log', lambda: events, cap=int(os.getenv('MEMORY_CAP_EVENT_KEYS', '5000')),
+                                   evict=lambda log, cap: log.trim_sampled(cap))
+        self.memory_guard.register('executor', lambda: self.mt5.executor.stats)
+        self.memory_guard.register('scanner', lambda: self.scanner.symbol_meta,
+                                   cap=int(os.getenv('MEMORY_CAP_SCANNER_SYMBOLS', '2000')))
+        self.memory_guard.register('exposure', lambda: self.exposure)
+        self.memory_guard.register('supervisor', lambda: self.supervisor.calls)
+        self.memory_guard.register('equity_recorder', lambda: self.equity_recorder)
+        self.memory_guard.register('deal_sync', lambda: self.deal_sync.positions)
+        if os.getenv('MEMORY_TRACE', '0') == '1':
+            self.memory_guard.start_tracing()
 
     def setup_logging(self):
         """Configura logging profesional"""
@@ -44,6 +145,17 @@ class NextiaTradingBot:
             format='%(asctime)s - %(message)s',
             datefmt='%H:%M:%S'
         )
+        # Eventos estructurados (NDJSON) escritos en segundo plano
+        events.start(
+            path=os.getenv('EVENT_LOG_PATH', 'events.ndjson'),
+            level=parse_level(os.getenv('EVENT_LOG_LEVEL', 'INFO'))
+        )
+        # Profiler por muestreo: SIGUSR1 o socket local (p. ej. "profile 30")
+        profiler.window = float(os.getenv('PROFILER_WINDOW', '30'))
+        profiler.install_signal()
+        port = int(os.getenv('PROFILER_PORT', '0'))
+        if port:
+            profiler.serve(port)
 
     def print_welcome(self):
         """Mensaje de bienvenida profesional"""
@@ -58,7 +170,7 @@ class NextiaTradingBot:
     def check_connection(self):
         """Verifica conexión MT5"""
         print("Conectando a MT5...")
-        account_info = self.mt5.get_account_info()
+        account_info = self.account_state.refresh(force=True)
         
         if account_info:
             print("\n" + "="*50)
@@ -87,114 +199,216 @@ class NextiaTradingBot:
     def run_trading_cycle(self):
         """Ejecuta ciclo de trading con gestión mejorada"""
         self.performance['cycle_count'] += 1
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        print(f"\nCICLO {self.performance['cycle_count']} [{current_time}]")
-        print("-" * 40)
+        profiler.tag(cycle=self.performance['cycle_count'])
+        self.cycle_info = {'status': 'ok', 'positions': None, 'signals': {}, 'cycle_trades': 0}
+
+        # Un solo account_info por ciclo; el resto de componentes leen el snapshot
+        self.account_state.refresh(force=True)
+        self.sync_deals()
         
         # ✅ VERIFICAR PROTECCIONES CRÍTICAS (AGREGAR ESTO)
         if not self.risk_manager.verificar_protecciones():
-            print("🛑 TRADING DETENIDO - Protección activada")
+            self.cycle_info['status'] = 'detenido'
             return
             
         # ✅ APLICAR TRAILING STOPS (AGREGAR ESTO)
         self.risk_manager.aplicar_trailing_stops()
         
         open_positions = self.get_open_positions_count()
-        print(f"Posiciones abiertas: {open_positions}")
+        self.cycle_info['positions'] = open_positions
+
+        self.update_exposure()
         
         # ✅ SI HAY MUCHAS POSICIONES, ESPERAR (ESTE YA LO TIENES)
         if open_positions >= 5:
-            print("DEMASIADAS POSICIONES - ESPERANDO...")
+            self.cycle_info['status'] = 'max_posiciones'
             return
             
+        if self.scanner_mode:
+            self.run_scanner_cycle()
+            return
+
         trades_this_cycle = 0
         
-        # Ejecutar estrategias (TODO ESTO SE MANTIENE IGUAL)
-        for name, strategy in self.strategies.items():
+        try:
+            signals_by_strategy = self.collect_signals()
+        except ValueError as e:
+            self.logger.error(f"Error en requisitos de datos: {e}")
+            self.cycle_info['status'] = 'error_datos'
+            return
+
+        # Ejecutar las señales en el orden de las estrategias
+        for name, signals in signals_by_strategy.items():
             if trades_this_cycle >= self.performance['max_trades_per_cycle']:
                 break
                 
             try:
-                if name == 'gold_trend':
-                    signal = strategy.execute_trades()
-                    if signal:
-                        print(f"GOLD TREND: {signal['action']} {signal['symbol']}")
-                        if self.execute_signal(signal, name):
-                            trades_this_cycle += 1
-                    else:
-                        print(f"GOLD TREND: Sin senal")
-                else:
-                    signals = strategy.analyze()
-                    if signals:
-                        print(f"{name.upper()}: {len(signals)} senales")
-                        for signal in signals:
-                            if trades_this_cycle >= self.performance['max_trades_per_cycle']:
-                                break
-                            if self.execute_signal(signal, name):
-                                trades_this_cycle += 1
-                    else:
-                        print(f"{name.upper()}: Sin senales")
+                if isinstance(signals, str):
+                    raise RuntimeError(signals)  # error devuelto por un worker
+                self.cycle_info['signals'][name] = len(signals or ())
+                for signal in signals or ():
+                    if trades_this_cycle >= self.performance['max_trades_per_cycle']:
+                        break
+                    if self.execute_signal(signal, name):
+                        trades_this_cycle += 1
             except Exception as e:
-                print(f"ERROR en {name}: {e}")
+                self.cycle_info['signals'][name] = 'error'
+                self.logger.error(f"Error en {name}: {e}")
+        self.cycle_info['cycle_trades'] = trades_this_cycle
+
+    def collect_signals(self):
+        """Señales por estrategia, en proceso o desde los workers"""
+        if self.workers:
+            self.feed.publish()
+            return self.workers.run_cycle(self.performance['cycle_count'])
+
+        data = self.data_feeder.prefetch(self.strategies.values())
+        open_symbols = self.data_feeder.open_symbols()
+        signals_by_strategy = {}
+        for name, strategy in self.strategies.items():
+            profiler.tag(strategy=name)
+            try:
+                signals_by_strategy[name] = strategy.on_data(data, open_symbols)
+            except Exception as e:
+                signals_by_strategy[name] = f"{e.__class__.__name__}: {e}"
+        profiler.tag()
+        return signals_by_strategy
+
+    def run_scanner_cycle(self):
+        """Escanea el universo y ejecuta los mejores candidatos hasta el limite"""
+        profiler.tag(strategy='scanner')
+        candidates = self.scanner.scan()
+        self.cycle_info['signals']['scanner'] = len(candidates)
+        self.cycle_info['scan_seconds'] = round(self.scanner.last_scan_seconds, 3)
+
+        trades_this_cycle = 0
+        for candidate in candidates:
+            if trades_this_cycle >= self.performance['max_trades_per_cycle']:
+                break
+            if self.execute_signal(candidate, candidate.strategy):
+                trades_this_cycle += 1
+        self.cycle_info['cycle_trades'] = trades_this_cycle
+
+    def update_exposure(self):
+        """Refresca precios, equity y posiciones del motor de exposicion"""
+        try:
+            import MetaTrader5 as mt5
+            prices = {}
+            for symbol in self.exposure.index:
+                tick = mt5.symbol_info_tick(symbol)
+                if tick:
+                    prices[symbol] = (tick.bid + tick.ask) / 2
+            self.exposure.update_prices(prices)
+            self.exposure.sync_positions(self.mt5.get_open_positions())
+
+            account_info = self.account_state.get()
+            if account_info:
+                self.exposure.set_equity(account_info['equity'])
+        except Exception as e:
+            self.logger.error(f"Error actualizando exposicion: {e}")
 
     def execute_signal(self, signal, strategy_name):
         """Ejecuta señal de trading con verificación"""
         try:
-            if not signal or 'action' not in signal:
+            if not signal:
                 return False
-                
-            action = signal['action'].lower()
-            symbol = signal.get('symbol', 'EURUSD')
-            volume = 0.01  # Tamaño fijo para pruebas
+            if isinstance(signal, dict):
+                signal = Signal.from_dict(signal)
+            signal.strategy = strategy_name
+            order = Order.from_signal(signal, volume=0.01)  # Tamaño fijo para pruebas
+            symbol, action = order.symbol, order.side.label
             
             # ✅ VERIFICAR STOP LOSS VÁLIDO
-            stop_loss = signal.get('stop_loss', 0)
-            take_profit = signal.get('take_profit', 0)
-            
-            if stop_loss == 0:
-                print(f"ERROR: Stop Loss invalido para {symbol}")
+            if order.stop_loss == 0:
+                events.emit(REJECT, level=logging.WARNING, strategy=strategy_name, symbol=symbol,
+                            action=action, reason='invalid_sl')
+                return False
+
+            # Chequeo pre-trade de exposicion y VaR (solo memoria; alta del simbolo antes del envio)
+            self.exposure.register_symbol(symbol)
+            allowed, detail = self.exposure.check_trade(symbol, action, order.volume)
+            if not allowed:
+                events.emit(REJECT, level=logging.WARNING, strategy=strategy_name, symbol=symbol,
+                            action=action, **detail)
                 return False
             
-            print(f"EJECUTANDO: {action.upper()} {symbol} {volume} lots")
-            print(f"SL: {stop_loss:.5f} | TP: {take_profit:.5f}")
+            events.emit(SIGNAL, strategy=strategy_name, symbol=symbol, action=action,
+                        volume=order.volume, sl=order.stop_loss, tp=order.take_profit,
+                        confidence=signal.confidence)
             
             # Enviar orden
             result = self.mt5.execute_order(
                 symbol=symbol,
                 order_type=action,
-                volume=volume,
-                stop_loss=stop_loss,
-                take_profit=take_profit
+                volume=order.volume,
+                stop_loss=order.stop_loss,
+                take_profit=order.take_profit,
+                strategy=strategy_name,
+                signal_time=signal.timestamp
             )
             
             if result and result.get('success'):
+                fill = Fill.from_result(order, result)
                 self.performance['total_trades'] += 1
-                print(f"✅ ORDEN EXITOSA: {result.get('order_id')}")
+                self.exposure.apply_trade(symbol, action, fill.volume, price=fill.price)
+                self.account_state.invalidate()
+                events.emit(FILL, strategy=strategy_name, symbol=symbol, action=action,
+                            order=fill.order_id, price=fill.price,
+                            volume=fill.volume, retries=fill.retries)
                 return True
             else:
                 error_msg = result.get('error', 'Error desconocido')
-                print(f"❌ ERROR ORDEN: {error_msg}")
+                events.emit(REJECT, level=logging.WARNING, strategy=strategy_name, symbol=symbol,
+                            action=action, retcode=result.get('retcode'), error=error_msg)
                 return False
                 
         except Exception as e:
-            print(f"❌ Error ejecutando senal: {e}")
+            self.logger.error(f"Error ejecutando senal: {e}")
             return False
 
-    def print_performance(self):
-        """Muestra rendimiento del bot"""
-        if self.performance['total_trades'] > 0:
-            print(f"\n📊 RESUMEN: {self.performance['total_trades']} trades ejecutados")
-            
-            # ✅ MOSTRAR POSICIONES ABIERTAS
-            open_positions = self.get_open_positions_count()
-            account_info = self.mt5.get_account_info()
-            
-            if account_info:
-                profit = account_info['equity'] - account_info['balance']
-                profit_color = "🟢" if profit >= 0 else "🔴"
-                print(f"{profit_color} Profit Actual: ${profit:.2f}")
-                print(f"📈 Posiciones abiertas: {open_positions}")
+    def sync_deals(self):
+        """Pasa los cierres nuevos al tracker y actualiza los contadores del bot"""
+        try:
+            for trade in self.deal_sync.sync():
+                self.performance['total_pnl'] += trade['pnl']
+                if trade['pnl'] > 0:
+                    self.performance['winning_trades'] += 1
+                events.emit(FILL, kind='close', strategy=trade['strategy'], symbol=trade['symbol'],
+                            action=trade['type'].label, volume=trade['volume'], pnl=round(trade['pnl'], 2),
+                            position=trade['position_id'], deal=trade['deal'])
+        except Exception as e:
+            self.logger.error(f"Error sincronizando deals: {e}")
+
+    def sample_equity(self):
+        """Muestra de cuenta para el registro de equity (fuera del ciclo)"""
+        info = self.mt5.get_account_info()
+        return EquityRecorder.from_account(info) if info else None
+
+    def print_performance(self, seconds):
+        """Una linea de resumen por ciclo en consola; el detalle va al log de eventos"""
+        info = self.cycle_info
+        signals = sum(v for v in info.get('signals', {}).values() if isinstance(v, int))
+        positions = info.get('positions')
+        line = (f"CICLO {self.performance['cycle_count']} [{datetime.now().strftime('%H:%M:%S')}] "
+                f"{info.get('status', 'ok')} | pos {'-' if positions is None else positions} "
+                f"| senales {signals} | trades {info.get('cycle_trades', 0)}/{self.performance['total_trades']}")
+        account_info = self.account_state.get()
+        if account_info:
+            line += (f" | P&L abierto ${account_info['equity'] - account_info['balance']:.2f}"
+                     f" realizado ${self.performance['total_pnl']:.2f}")
+        print(f"{line} | {seconds:.2f}s")
+
+    def check_memory(self):
+        """Aplica limites de memoria y registra RSS y bytes por subsistema"""
+        status = self.memory_guard.check()
+        rss_mb = (status['rss'] or 0) / 1024 ** 2
+        growth_mb = status['rss_growth'] / 1024 ** 2
+        self.logger.info(f"Memoria: {rss_mb:.1f} MB (crecimiento {growth_mb:+.1f} MB)")
+        events.emit(MEMORY, cycle=self.performance['cycle_count'], rss=status['rss'],
+                    growth=status['rss_growth'], subsystems=status['subsystems'],
+                    evicted=status['evicted'])
+        for line in self.memory_guard.snapshot_diff(top=5):
+            self.logger.info(f"tracemalloc: {line}")
 
     def run(self):
         """Ejecuta el bot principal"""
@@ -206,14 +420,63 @@ class NextiaTradingBot:
         
         try:
             while True:
+                started = time.perf_counter()
+                consumed = terminal_hook.consumed if self.replaying else 0
                 self.run_trading_cycle()
-                self.print_performance()
+                seconds = time.perf_counter() - started
+                last_hour = self.equity_recorder.summary(window=3600) or {}
+                events.emit(CYCLE, cycle=self.performance['cycle_count'], seconds=round(seconds, 4),
+                            trades=self.performance['total_trades'], pnl=round(self.performance['total_pnl'], 2),
+                            equity_1h_min=last_hour.get('min'), equity_1h_max=last_hour.get('max'),
+                            **self.cycle_info)
+                self.print_performance(seconds)
+                if self.memory_check_every and self.performance['cycle_count'] % self.memory_check_every == 0:
+                    self.check_memory()
+                if self.replaying:
+                    # Replay: sin esperas, hasta agotar el log o un ciclo que no consume nada
+                    if terminal_hook.exhausted or terminal_hook.consumed == consumed:
+                        leftover = terminal_hook.remaining()
+                        if leftover:
+                            self.logger.warning(f"Replay: llamadas grabadas sin consumir {leftover}")
+                        print("⏹️ Replay completado")
+                        break
+                    continue
                 time.sleep(120)  # ✅ ESPERAR 2 MINUTOS ENTRE CICLOS
                 
         except KeyboardInterrupt:
             print("\n🛑 Bot detenido por el usuario")
         except Exception as e:
             print(f"❌ Error critico: {e}")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Detiene hilos y workers y guarda informes (tolera un arranque incompleto)"""
+        supervisor = getattr(self, 'supervisor', None)
+        if supervisor:
+            supervisor.stop()
+        mt5_connector = getattr(self, 'mt5', None)
+        if mt5_connector and mt5_connector.depth:
+            mt5_connector.depth.close()
+        watchdog = getattr(self, 'watchdog', None)
+        if watchdog:
+            watchdog.stop()
+            self.logger.info(f"Watchdog de equity: {watchdog.status()}")
+        events.stop()
+        profiler.close()
+        equity_recorder = getattr(self, 'equity_recorder', None)
+        if equity_recorder:
+            equity_recorder.stop()
+        risk_manager = getattr(self, 'risk_manager', None)
+        if risk_manager and risk_manager.netting:
+            self.logger.info(f"Neteo close-by: {risk_manager.resumen_netting()}")
+        if mt5_connector:
+            mt5_connector.analytics.save(os.getenv('EXECUTION_REPORT_PATH', 'execution_report.json'))
+        if getattr(self, 'workers', None):
+            self.workers.close()
+            self.feed.close()
+        if isinstance(terminal_hook, RecordingTerminal):
+            terminal_hook.close()
 
 if __name__ == "__main__":
     bot = NextiaTradingBot()
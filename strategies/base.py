@@ -0,0 +1,67 @@
+# strategies/base.py - INTERFAZ COMUN DE ESTRATEGIAS CON REQUISITOS DE DATOS
+import logging
+from abc import ABC, abstractmethod
+
+
+class BaseStrategy(ABC):
+    """Estrategia que declara por adelantado los datos que necesita.
+
+    Cada estrategia fija ``symbols``, ``timeframe`` y ``lookback`` (barras que
+    recibe) y ``min_bars`` (barras minimas para que sus indicadores sean
+    validos). El motor agrupa los requisitos de todas las estrategias, hace
+    una sola descarga por (simbolo, timeframe) y llama a ``on_data`` con los
+    datos ya preparados; la estrategia no accede al terminal para leer precios.
+    Las subclases implementan ``generate_signals``.
+    """
+
+    timeframe = None
+    lookback = 100
+    min_bars = 50
+    max_signals = None  # limite de señales por ciclo (None = sin limite)
+
+    def __init__(self, symbols=()):
+        self.symbols = list(symbols)  # por instancia: no compartir la lista entre estrategias
+
+    def requirements(self):
+        """Lista de (simbolo, timeframe, barras) que necesita la estrategia"""
+        return [(symbol, self.timeframe, self.lookback) for symbol in self.symbols]
+
+    def validate(self):
+        """Comprueba que el lookback declarado cubre los indicadores"""
+        if self.lookback < self.min_bars:
+            raise ValueError(
+                f"{self.name}: lookback {self.lookback} menor que las {self.min_bars} barras necesarias"
+            )
+
+    def skip_symbol(self, symbol, open_symbols):
+        """Permite a la estrategia omitir simbolos (p. ej. con posicion abierta)"""
+        return False
+
+    @abstractmethod
+    def generate_signals(self, df, symbol):
+        """Genera señales sobre datos ya preparados (vivo y backtest)"""
+
+    def on_data(self, data, open_symbols=()):
+        """Señales del ciclo a partir de los datos precargados por el motor"""
+        signals = []
+        for symbol in self.symbols:
+            if self.skip_symbol(symbol, open_symbols):
+                continue
+            df = data.get((symbol, self.timeframe))
+            if df is None:
+                continue
+            try:
+                # Copia de las ultimas barras: los datos se comparten entre estrategias
+                signals.extend(self.generate_signals(df.iloc[-self.lookback:].copy(), symbol))
+            except Exception as e:
+                # Un simbolo con error no para el ciclo, pero queda registrado
+                logging.getLogger('BaseStrategy').error(
+                    f"{self.__class__.__name__}: error generando señales para {symbol}: {e}"
+                )
+        return signals[:self.max_signals] if self.max_signals else signals
+
+    def analyze(self):
+        """Ciclo autonomo: descarga sus propios datos y genera señales"""
+        from core.data_feeder import DataFeeder
+        feeder = DataFeeder()
+        return self.on_data(feeder.prefetch([self]), feeder.open_symbols())
@@ -3,31 +3,24 @@ import pandas as pd
 import numpy as np
 import MetaTrader5 as mt5
 from datetime import datetime
+from strategies.base import BaseStrategy
+from core.trade_types import Signal
+
+class ForexScalper(BaseStrategy):
+    timeframe = mt5.TIMEFRAME_M5
+    lookback = 100
+    min_bars = 50
+    max_signals = 2  # ✅ MÁXIMO 2 SEÑALES POR CICLO
 
-class ForexScalper:
     def __init__(self):
-        self.symbols = ['EURUSD', 'GBPUSD', 'USDJPY']
+        super().__init__(['EURUSD', 'GBPUSD', 'USDJPY'])
         self.name = "Forex Scalper"
         self.max_trades_per_symbol = 1  # ✅ MÁXIMO 1 OPERACIÓN POR SÍMBOLO
         self.last_trade_time = {}
 
-    def get_data(self, symbol, timeframe=mt5.TIMEFRAME_M5, count=100):
-        """Obtiene datos de mercado"""
-        try:
-            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
-            if rates is None:
-                return None
-            return pd.DataFrame(rates)
-        except:
-            return None
-
-    def has_open_position(self, symbol):
-        """Verifica si ya hay posición abierta"""
-        try:
-            positions = mt5.positions_get(symbol=symbol)
-            return len(positions) > 0
-        except:
-            return False
+    def skip_symbol(self, symbol, open_symbols):
+        """✅ No operar símbolos con posición abierta"""
+        return symbol in open_symbols
 
     def calculate_indicators(self, df):
         """Calcula indicadores técnicos"""
@@ -47,8 +40,15 @@ class ForexScalper:
         except:
             return df
 
-    def calculate_proper_stops(self, symbol, current_price, action):
+    def calculate_proper_stops(self, symbol, current_price, action, pip_size=None):
         """Calcula stops adecuados para cada símbolo"""
+        # Universo amplio: mismas distancias en pips escaladas al símbolo
+        if pip_size:
+            sl_pips, tp_pips = (30, 45) if 'JPY' in symbol else (25, 35)
+            if action == 'buy':
+                return current_price - sl_pips * pip_size, current_price + tp_pips * pip_size
+            return current_price + sl_pips * pip_size, current_price - tp_pips * pip_size
+
         # Para JPY necesitamos stops más grandes
         if 'JPY' in symbol:
             if action == 'buy':
@@ -67,63 +67,35 @@ class ForexScalper:
                 
         return stop_loss, take_profit
 
-    def analyze(self):
-        """Analiza y genera señales con gestión de riesgo"""
-        signals = []
+    def generate_signals(self, df, symbol):
+        """Genera señales sobre datos ya preparados (vivo y backtest)"""
+        if df is None or len(df) < self.min_bars:
+            return []
+            
+        df = self.calculate_indicators(df)
+        current = df.iloc[-1]
         
-        for symbol in self.symbols:
-            # ✅ VERIFICAR SI YA HAY POSICIÓN ABIERTA
-            if self.has_open_position(symbol):
-                continue
-                
-            try:
-                df = self.get_data(symbol)
-                if df is None or len(df) < 50:
-                    continue
-                    
-                df = self.calculate_indicators(df)
-                current = df.iloc[-1]
-                
-                # ✅ SEÑAL MÁS ESTRICTA - SOLO LAS MEJORES
-                buy_condition = (
-                    current['ema_fast'] > current['ema_slow'] and 
-                    current['rsi'] < 65 and 
-                    current['rsi'] > 40  # ✅ EVITAR RSI MUY BAJO
-                )
-                
-                sell_condition = (
-                    current['ema_fast'] < current['ema_slow'] and 
-                    current['rsi'] > 35 and 
-                    current['rsi'] < 60  # ✅ EVITAR RSI MUY ALTO
-                )
-                
-                if buy_condition:
-                    stop_loss, take_profit = self.calculate_proper_stops(
-                        symbol, current['close'], 'buy'
-                    )
-                    
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                        'confidence': 0.8
-                    })
-                
-                elif sell_condition:
-                    stop_loss, take_profit = self.calculate_proper_stops(
-                        symbol, current['close'], 'sell'
-                    )
-                    
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                        'confidence': 0.8
-                    })
-                    
-            except Exception as e:
-                continue
-                
-        return signals[:2]  # ✅ MÁXIMO 2 SEÑALES POR CICLO
\ No newline at end of file
+        # ✅ SEÑAL MÁS ESTRICTA - SOLO LAS MEJORES
+        buy_condition = (
+            current['ema_fast'] > current['ema_slow'] and 
+            current['rsi'] < 65 and 
+            current['rsi'] > 40  # ✅ EVITAR RSI MUY BAJO
+        )
+        
+        sell_condition = (
+            current['ema_fast'] < current['ema_slow'] and 
+            current['rsi'] > 35 and 
+            current['rsi'] < 60  # ✅ EVITAR RSI MUY ALTO
+        )
+        
+        if buy_condition:
+            action = 'buy'
+        elif sell_condition:
+            action = 'sell'
+        else:
+            return []
+
+        stop_loss, take_profit = self.calculate_proper_stops(
+            symbol, current['close'], action
+        )
+        return [Signal(symbol, action, stop_loss, take_profit, confidence=0.8)]
\ No newline at end of file
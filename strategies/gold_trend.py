@@ -2,53 +2,44 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
+from strategies.base import BaseStrategy
+from core.trade_types import Signal
+
+class GoldTrendStrategy(BaseStrategy):
+    timeframe = mt5.TIMEFRAME_H1
+    lookback = 250  # sma_200 necesita 200 barras; margen para huecos del historial
+    min_bars = 200
+    max_signals = 1
 
-class GoldTrendStrategy:
     def __init__(self, mt5_connector=None):
         self.mt5 = mt5_connector
         self.symbol = "XAUUSD"
+        super().__init__([self.symbol])
         self.name = "Gold Trend"
 
-    def get_data(self, count=100):
-        """Obtiene datos de oro"""
-        try:
-            rates = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H1, 0, count)
-            if rates is None:
-                return None
-            return pd.DataFrame(rates)
-        except:
-            return None
+    def generate_signals(self, df, symbol=None):
+        """Genera señales sobre datos ya preparados (vivo y backtest)"""
+        if df is None or len(df) < self.min_bars:
+            return []
+        symbol = symbol or self.symbol
+        
+        # Medias móviles
+        df['sma_50'] = df['close'].rolling(50).mean()
+        df['sma_200'] = df['close'].rolling(200).mean()
+        
+        current = df.iloc[-1]
+        
+        # Señal basada en tendencia
+        if current['sma_50'] > current['sma_200']:
+            # 5 dólares de stop, 8 dólares de take profit
+            return [Signal(symbol, 'buy', current['close'] - 5.0, current['close'] + 8.0, confidence=0.75)]
+        else:
+            return [Signal(symbol, 'sell', current['close'] + 5.0, current['close'] - 8.0, confidence=0.75)]
 
     def execute_trades(self):
         """Ejecuta análisis de oro"""
         try:
-            df = self.get_data()
-            if df is None or len(df) < 50:
-                return None
-            
-            # Medias móviles
-            df['sma_50'] = df['close'].rolling(50).mean()
-            df['sma_200'] = df['close'].rolling(200).mean()
-            
-            current = df.iloc[-1]
-            
-            # Señal basada en tendencia
-            if current['sma_50'] > current['sma_200']:
-                return {
-                    'action': 'BUY',
-                    'symbol': self.symbol,
-                    'stop_loss': current['close'] - 5.0,  # 5 dólares de stop
-                    'take_profit': current['close'] + 8.0, # 8 dólares de take profit
-                    'confidence': 0.75
-                }
-            else:
-                return {
-                    'action': 'SELL',
-                    'symbol': self.symbol, 
-                    'stop_loss': current['close'] + 5.0,
-                    'take_profit': current['close'] - 8.0,
-                    'confidence': 0.75
-                }
-                
+            signals = self.analyze()
+            return signals[0] if signals else None
         except Exception as e:
             return None
\ No newline at end of file
@@ -2,22 +2,18 @@
 import pandas as pd
 import numpy as np
 import MetaTrader5 as mt5
+from strategies.base import BaseStrategy
+from core.trade_types import Signal
+
+class TurtleStrategy(BaseStrategy):
+    timeframe = mt5.TIMEFRAME_H1
+    lookback = 100
+    min_bars = 55
 
-class TurtleStrategy:
     def __init__(self):
-        self.symbols = ['EURUSD', 'GBPUSD', 'XAUUSD']
+        super().__init__(['EURUSD', 'GBPUSD', 'XAUUSD'])
         self.name = "Turtle Strategy"
 
-    def get_data(self, symbol, timeframe=mt5.TIMEFRAME_H1, count=100):
-        """Obtiene datos históricos"""
-        try:
-            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
-            if rates is None:
-                return None
-            return pd.DataFrame(rates)
-        except:
-            return None
-
     def calculate_atr(self, df, period=14):
         """Calcula Average True Range"""
         try:
@@ -34,47 +30,27 @@ class TurtleStrategy:
         except:
             return pd.Series([0] * len(df))
 
-    def analyze(self):
-        """Estrategia Turtle mejorada"""
-        signals = []
+    def generate_signals(self, df, symbol):
+        """Genera señales sobre datos ya preparados (vivo y backtest)"""
+        if df is None or len(df) < self.min_bars:
+            return []
         
-        for symbol in self.symbols:
-            try:
-                df = self.get_data(symbol)
-                if df is None or len(df) < 55:
-                    continue
-                
-                # Calcular indicadores
-                df['atr'] = self.calculate_atr(df)
-                df['highest_20'] = df['high'].rolling(20).max()
-                df['lowest_20'] = df['low'].rolling(20).min()
-                
-                current = df.iloc[-1]
-                prev = df.iloc[-2]
-                
-                # Señal COMPRA - Breakout
-                if current['close'] > prev['highest_20']:
-                    stop_loss = current['close'] - (current['atr'] * 2)
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'stop_loss': stop_loss,
-                        'take_profit': current['close'] + (current['atr'] * 3),
-                        'confidence': 0.8
-                    })
-                
-                # Señal VENTA - Breakdown
-                elif current['close'] < prev['lowest_20']:
-                    stop_loss = current['close'] + (current['atr'] * 2)
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'stop_loss': stop_loss,
-                        'take_profit': current['close'] - (current['atr'] * 3),
-                        'confidence': 0.8
-                    })
-                    
-            except Exception as e:
-                continue
-                
-        return signals
\ No newline at end of file
+        # Calcular indicadores
+        df['atr'] = self.calculate_atr(df)
+        df['highest_20'] = df['high'].rolling(20).max()
+        df['lowest_20'] = df['low'].rolling(20).min()
+        
+        current = df.iloc[-1]
+        prev = df.iloc[-2]
+        
+        # Señal COMPRA - Breakout
+        if current['close'] > prev['highest_20']:
+            stop_loss = current['close'] - (current['atr'] * 2)
+            return [Signal(symbol, 'buy', stop_loss, current['close'] + (current['atr'] * 3), confidence=0.8)]
+        
+        # Señal VENTA - Breakdown
+        if current['close'] < prev['lowest_20']:
+            stop_loss = current['close'] + (current['atr'] * 2)
+            return [Signal(symbol, 'sell', stop_loss, current['close'] - (current['atr'] * 3), confidence=0.8)]
+            
+        return []
\ No newline at end of file
@@ -0,0 +1,18 @@
+# tests/conftest.py - MODULO METATRADER5 MINIMO PARA PROBAR FUERA DE WINDOWS
+import sys
+import types
+
+try:
+    import MetaTrader5  # noqa: F401
+except ImportError:
+    # Solo constantes: cada prueba sustituye las funciones que usa con monkeypatch
+    mt5 = types.ModuleType('MetaTrader5')
+    mt5.ORDER_TYPE_BUY, mt5.ORDER_TYPE_SELL = 0, 1
+    mt5.ORDER_TIME_GTC = 0
+    mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_RETURN = 0, 1, 2
+    mt5.TRADE_ACTION_DEAL, mt5.TRADE_ACTION_SLTP, mt5.TRADE_ACTION_CLOSE_BY = 1, 6, 10
+    mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_REJECT, mt5.TRADE_RETCODE_DONE = 10004, 10006, 10009
+    mt5.TRADE_RETCODE_PRICE_CHANGED, mt5.TRADE_RETCODE_PRICE_OFF = 10020, 10021
+    mt5.TRADE_RETCODE_INVALID_FILL = 10030
+    mt5.last_error = lambda: (1, 'Success')
+    sys.modules['MetaTrader5'] = mt5
@@ -0,0 +1,113 @@
+# tests/test_deal_sync.py - CURSOR, PARCIALES, REVERSALS Y REINICIO DE DealSync
+import time
+from collections import namedtuple
+
+import MetaTrader5 as mt5
+import pytest
+
+from core.deal_sync import (DealSync, DEAL_TYPE_BUY, DEAL_TYPE_SELL, DEAL_ENTRY_IN, DEAL_ENTRY_OUT,
+                            DEAL_ENTRY_INOUT, STRATEGY_MAGICS, MAGIC_BASE)
+from core.performance_tracker import PerformanceTracker
+
+Deal = namedtuple('Deal', 'ticket time time_msc type entry magic position_id volume '
+                          'profit commission swap fee symbol comment')
+
+NOW = int(time.time()) - 3600
+
+
+class FakeHistory:
+    """history_deals_get sobre una lista de deals que la prueba va ampliando"""
+
+    def __init__(self):
+        self.deals = []
+
+    def add(self, second, deal_type, entry, position_id, volume, profit=0.0,
+            magic=MAGIC_BASE, comment=''):
+        deal = Deal(len(self.deals) + 1, NOW + second, (NOW + second) * 1000, deal_type, entry, magic,
+                    position_id, volume, profit, -0.5, 0.0, 0.0, 'EURUSD', comment)
+        self.deals.append(deal)
+        return deal
+
+    def __call__(self, date_from, date_to):
+        start, end = date_from.timestamp(), date_to.timestamp()
+        return tuple(deal for deal in self.deals if start <= deal.time <= end)
+
+
+@pytest.fixture
+def history(monkeypatch):
+    history = FakeHistory()
+    monkeypatch.setattr(mt5, 'history_deals_get', history, raising=False)
+    return history
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'deal_sync.json')
+
+
+def strategy_stats(tracker, strategy='scalper'):
+    stats = tracker.metrics['strategy_performance'][strategy]
+    return stats['total_trades'], round(stats['total_pnl'], 2)
+
+
+def test_same_second_deals_across_two_syncs(history, state_path):
+    tracker = PerformanceTracker()
+    sync = DealSync(tracker, state_path, initial_lookback=7200)
+    history.add(0, DEAL_TYPE_BUY, DEAL_ENTRY_IN, 10, 0.2, magic=STRATEGY_MAGICS['scalper'])
+    history.add(10, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 10, 0.1, profit=5.0)
+    assert [t['deal'] for t in sync.sync()] == [2]
+
+    # Otro deal en el mismo segundo que el cursor: solo se procesa el nuevo
+    history.add(10, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 10, 0.1, profit=3.0)
+    assert [t['deal'] for t in sync.sync()] == [3]
+    assert sync.sync() == []
+    assert strategy_stats(tracker) == (2, 7.0)  # 5 + 3 - 2 comisiones de 0.5
+
+
+def test_partial_close_keeps_remaining_volume(history, state_path):
+    tracker = PerformanceTracker()
+    sync = DealSync(tracker, state_path, initial_lookback=7200)
+    history.add(0, DEAL_TYPE_BUY, DEAL_ENTRY_IN, 20, 0.3, magic=STRATEGY_MAGICS['scalper'])
+    history.add(5, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 20, 0.1, profit=2.0)
+    trades = sync.sync()
+
+    assert len(trades) == 1 and trades[0]['volume'] == 0.1
+    assert sync.positions['20'] == ['scalper', 0.2]
+
+    history.add(8, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 20, 0.2, profit=4.0)
+    sync.sync()
+    assert '20' not in sync.positions
+    assert strategy_stats(tracker) == (2, 5.0)
+
+
+def test_inout_reversal_keeps_the_excess_open(history, state_path):
+    tracker = PerformanceTracker()
+    sync = DealSync(tracker, state_path, initial_lookback=7200)
+    history.add(0, DEAL_TYPE_BUY, DEAL_ENTRY_IN, 30, 0.1, magic=STRATEGY_MAGICS['scalper'])
+    # Venta de 0.3 sobre una compra de 0.1: cierra 0.1 y abre 0.2 corta en la misma posicion
+    history.add(5, DEAL_TYPE_SELL, DEAL_ENTRY_INOUT, 30, 0.3, profit=1.5)
+    trades = sync.sync()
+
+    assert len(trades) == 1 and trades[0]['pnl'] == pytest.approx(1.0)
+    assert sync.positions['30'] == ['scalper', pytest.approx(0.2)]
+
+    history.add(9, DEAL_TYPE_BUY, DEAL_ENTRY_OUT, 30, 0.2, profit=-1.0)
+    sync.sync()
+    assert '30' not in sync.positions
+    assert strategy_stats(tracker) == (2, -0.5)
+
+
+def test_reload_from_state_file_does_not_double_count(history, state_path):
+    tracker = PerformanceTracker()
+    history.add(0, DEAL_TYPE_BUY, DEAL_ENTRY_IN, 40, 0.2, magic=STRATEGY_MAGICS['scalper'])
+    history.add(5, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 40, 0.1, profit=2.0)
+    DealSync(tracker, state_path, initial_lookback=7200).sync()
+
+    # Reinicio: cursor, tickets vistos y posiciones abiertas salen del fichero
+    restarted = DealSync(tracker, state_path, initial_lookback=7200)
+    assert restarted.sync() == []
+    assert restarted.positions['40'] == ['scalper', 0.1]
+
+    history.add(5, DEAL_TYPE_SELL, DEAL_ENTRY_OUT, 40, 0.1, profit=1.0)
+    assert [t['deal'] for t in restarted.sync()] == [3]
+    assert strategy_stats(tracker) == (2, 2.0)
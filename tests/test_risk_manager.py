@@ -0,0 +1,77 @@
+# tests/test_risk_manager.py - NETEO CLOSE-BY Y CIERRE A MERCADO DEL RESTO
+from collections import namedtuple
+from types import SimpleNamespace
+
+import MetaTrader5 as mt5
+import pytest
+
+from core.risk_manager import RiskManager
+
+Position = namedtuple('Position', 'ticket symbol type volume')
+Result = namedtuple('Result', 'retcode')
+
+# Compras de 0.3 y 0.1 contra una venta de 0.2 en el mismo simbolo
+POSITIONS = (
+    Position(1, 'EURUSD', mt5.ORDER_TYPE_BUY, 0.3),
+    Position(2, 'EURUSD', mt5.ORDER_TYPE_BUY, 0.1),
+    Position(3, 'EURUSD', mt5.ORDER_TYPE_SELL, 0.2),
+)
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    """order_send / positions_get falsos; ``retcode`` decide la respuesta al close-by"""
+    state = SimpleNamespace(requests=[], retcode=mt5.TRADE_RETCODE_DONE)
+
+    def order_send(request):
+        state.requests.append(request)
+        return Result(state.retcode)
+
+    monkeypatch.setattr(mt5, 'order_send', order_send, raising=False)
+    monkeypatch.setattr(mt5, 'positions_get', lambda **kwargs: POSITIONS, raising=False)
+    monkeypatch.setattr(mt5, 'symbol_info', lambda symbol: None, raising=False)
+    return state
+
+
+@pytest.fixture
+def risk_manager(monkeypatch):
+    manager = RiskManager(SimpleNamespace(supervisor=None))
+    closes = []
+    monkeypatch.setattr(manager, 'cerrar_posicion',
+                        lambda ticket, volume=None: closes.append((ticket, volume)) or True)
+    manager.closes = closes
+    return manager
+
+
+def test_pairs_largest_buy_with_sell_and_leaves_the_rest(terminal, risk_manager):
+    remaining = risk_manager.netear_opuestas(POSITIONS)
+
+    assert [(r['position'], r['position_by']) for r in terminal.requests] == [(1, 3)]
+    assert terminal.requests[0]['action'] == mt5.TRADE_ACTION_CLOSE_BY
+    assert remaining == {1: 0.1, 2: 0.1, 3: 0.0}
+    assert risk_manager.resumen_netting()['EURUSD']['pairs'] == 1
+
+
+def test_remaining_volumes_are_closed_at_market(terminal, risk_manager):
+    assert risk_manager.cerrar_todas_posiciones()
+    # La venta quedo cerrada por el close-by; de las compras solo se cierra lo que sobra
+    assert risk_manager.closes == [(1, 0.1), (2, 0.1)]
+
+
+def test_rejected_close_by_falls_back_to_market_closes(terminal, risk_manager):
+    terminal.retcode = mt5.TRADE_RETCODE_REJECT
+    assert risk_manager.cerrar_todas_posiciones()
+
+    assert len(terminal.requests) == 1  # un rechazo corta el neteo del simbolo
+    assert risk_manager.closes == [(1, 0.3), (2, 0.1), (3, 0.2)]
+    assert risk_manager.netting == {}
+
+
+def test_cerrar_posicion_sends_partial_volume(terminal):
+    sent = []
+    executor = SimpleNamespace(send=lambda request: (sent.append(request) or Result(mt5.TRADE_RETCODE_DONE), 0))
+    manager = RiskManager(SimpleNamespace(supervisor=None, executor=executor))
+
+    assert manager.cerrar_posicion(1, 0.1)
+    assert sent[0]['position'] == 1 and sent[0]['volume'] == 0.1
+    assert sent[0]['type'] == mt5.ORDER_TYPE_SELL and sent[0]['comment'] == "Cierre parcial"